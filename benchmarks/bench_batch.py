@@ -0,0 +1,76 @@
+# Compare evaluating boards one at a time with checkers.engine against
+# checkers.batch's arrays: piece and king counts, mobility, whether a jump is
+# available and whether the game is over for each board.
+#
+#   python benchmarks/bench_batch.py [boards] [history-file]
+#
+# Boards come from an exported history file when one is given and from random
+# games otherwise.
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from checkers.batch import board_arrays, evaluate
+from checkers.engine import BLACK, INITIAL_BOARD, RED, apply_move, legal_moves, pieces, random_game
+from checkers.history import read_history
+
+def random_boards(count):
+    rng = random.Random(1)
+    boards = []
+    while len(boards) < count:
+        board = INITIAL_BOARD
+        for move in random_game(rng, rng.randrange(120)):
+            board = apply_move(board, *move)
+            boards.append(board)
+    return boards[:count]
+
+def scalar(boards):
+    result = []
+    for board in boards:
+        red = pieces(board, RED)
+        black = pieces(board, BLACK)
+        legal = legal_moves(board)
+        result.append((
+            len(red),
+            len(black),
+            sum(1 for _, _, k in red if k),
+            sum(1 for _, _, k in black if k),
+            len(legal),
+            any(abs(m[2] - m[0]) == 2 for m in legal),
+            not legal
+        ))
+    return result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    if len(sys.argv) > 2:
+        rows = read_history(sys.argv[2])[:count]
+        boards = [(r.next, r.king, r.red, r.black) for r in rows]
+        arrays = board_arrays(rows)
+    else:
+        boards = random_boards(count)
+        arrays = tuple(zip(*boards))
+
+    start = time.perf_counter()
+    expected = scalar(boards)
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = evaluate(*arrays)
+    batch_time = time.perf_counter() - start
+
+    got = list(zip(
+        result.red_pieces, result.black_pieces, result.red_kings, result.black_kings,
+        result.mobility, result.can_jump, result.terminal
+    ))
+    assert [tuple(int(x) for x in g) for g in got] == [tuple(int(x) for x in e) for e in expected]
+
+    print(f'{len(boards)} boards')
+    print(f'scalar: {scalar_time:.3f}s, {len(boards) / scalar_time:,.0f} boards/s')
+    print(f'batch:  {batch_time:.3f}s, {len(boards) / batch_time:,.0f} boards/s ({scalar_time / batch_time:.0f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# Time the leaderboard, checkers/leaderboard.py, over many games: absorbing
+# results and moves in batches as GameObserver does, and then the queries a
+# leaderboard page makes.
+#
+#   python benchmarks/bench_leaderboard.py [--games N] [--players N] [--batch N]
+#                                          [--moves-per-game N] [--queries N]
+#
+# Players are drawn unevenly, so a few play most of the games.  Reports games
+# absorbed per second, how long a batch takes early and late, which depends on
+# the batch and the number of players rather than on the games absorbed
+# before, and the latency of each query at the end.
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from checkers.engine import INITIAL_BOARD, apply_move
+from checkers.leaderboard import GameResult, Leaderboard, PlayedMove
+
+def make_parser():
+    parser = argparse.ArgumentParser(description='Time the leaderboard over many games.')
+    parser.add_argument('--games', type=int, default=1000000)
+    parser.add_argument('--players', type=int, default=50000)
+    parser.add_argument('--batch', type=int, default=1000, help='games finished per batch of blocks')
+    parser.add_argument('--moves-per-game', type=int, default=4, help='moves of each game counted')
+    parser.add_argument('--early', type=float, default=0.05, help='share of wins taken early')
+    parser.add_argument('--queries', type=int, default=1000, help='times each query is made')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser
+
+def opening_moves():
+    board = INITIAL_BOARD
+    moves = []
+    for move in [(0, 2, 1, 3), (3, 5, 2, 4), (1, 3, 3, 5), (4, 6, 2, 4)]:
+        after = apply_move(board, *move)
+        moves.append((board, after))
+        board = after
+    return moves
+
+def percentiles(seconds):
+    seconds = sorted(seconds)
+    pick = lambda p: seconds[min(len(seconds) - 1, int(p * len(seconds)))] * 1000
+    return f'p50 {pick(0.5):.3f}ms  p99 {pick(0.99):.3f}ms  max {seconds[-1] * 1000:.3f}ms'
+
+def absorb(args, leaderboard, pks, rng):
+    opening = opening_moves()
+    pick = lambda: pks[int(len(pks) * rng.random() ** 2)]
+
+    batch_seconds = []
+    height = 0
+    start = time.perf_counter()
+    for first in range(0, args.games, args.batch):
+        results = []
+        moves = []
+        for _ in range(min(args.batch, args.games - first)):
+            black, red = pick(), pick()
+            for i in range(args.moves_per_game):
+                before, after = opening[i % len(opening)]
+                moves.append(PlayedMove(black if before[0] else red, before, after))
+            winner, loser = (black, red) if rng.random() < 0.5 else (red, black)
+            results.append(GameResult(winner, loser, rng.random() < args.early, height))
+        height += 1
+
+        batch_start = time.perf_counter()
+        cursor = leaderboard.db.cursor()
+        leaderboard.absorb(cursor, moves, results, height)
+        cursor.close()
+        leaderboard.db.commit()
+        batch_seconds.append(time.perf_counter() - batch_start)
+
+    elapsed = time.perf_counter() - start
+    tenth = max(len(batch_seconds) // 10, 1)
+    print(f'absorb:  {args.games:,} games, {args.games * args.moves_per_game:,} moves in {elapsed:.2f}s, '
+          f'{args.games / sum(batch_seconds):,.0f} games/s')
+    print(f'  first batches  {percentiles(batch_seconds[:tenth])}')
+    print(f'  last batches   {percentiles(batch_seconds[-tenth:])}')
+
+def query(args, leaderboard, pks, rng):
+    queries = [
+        ('top 10', lambda: leaderboard.top(10)),
+        ('top 100, 20 games', lambda: leaderboard.top(100, min_games=20)),
+        ('player', lambda: leaderboard.player(rng.choice(pks))),
+        ('rank', lambda: leaderboard.rank(rng.choice(pks))),
+    ]
+    for name, run in queries:
+        seconds = []
+        for _ in range(args.queries):
+            start = time.perf_counter()
+            run()
+            seconds.append(time.perf_counter() - start)
+        print(f'{name:>18}: {percentiles(seconds)}')
+
+def main():
+    args = make_parser().parse_args()
+    rng = random.Random(args.seed)
+    pks = [rng.randbytes(48) for _ in range(args.players)]
+
+    with tempfile.TemporaryDirectory() as scratch:
+        db = sqlite3.connect(os.path.join(scratch, 'checkers.db'))
+        leaderboard = Leaderboard(db)
+        absorb(args, leaderboard, pks, rng)
+        query(args, leaderboard, pks, rng)
+
+        best = leaderboard.top(1)[0]
+        print(f'best: {best.pk.hex()[:16]} rating {best.rating:.0f}, {best.games} games, {best.win_rate:.0%} won')
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# Compare the two loops that used to print the most, the identity search in
+# select_identity_for_coin and the block scan in absorb_state, with logging off
+# against the old always-on output (everything formatted at DEBUG into a
+# throwaway stream, which costs what the print calls did).
+#
+#   python benchmarks/bench_logging.py
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from blspy import AugSchemeMPL
+
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.program import Program
+from chia.wallet.derive_keys import master_sk_to_wallet_sk
+from chia.wallet.lineage_proof import LineageProof
+from chia.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import puzzle_for_pk
+from chia.wallet.puzzles.singleton_top_layer import solution_for_singleton
+
+from cdv.util.load_clvm import load_clvm
+
+from checkers.driver import CheckersMover, INITIAL_BOARD, GAME_MOJO, make_move_sexp
+from wallet.live import CheckersRunnerWallet
+
+SEARCH_INDEX = 200
+BLOCKS = 20
+COINS_PER_BLOCK = 50
+
+MASTER_SK = AugSchemeMPL.key_gen(bytes([7] * 32))
+
+class FakeWalletRpc:
+    async def get_private_key(self, fingerprint):
+        return {'sk': bytes(MASTER_SK).hex()}
+
+class FakeRecords:
+    def set_self_hash(self, puzzle_hash):
+        pass
+
+class FakeRecord:
+    def __init__(self, coin):
+        self.coin = coin
+
+class FakeSpend:
+    def __init__(self, solution):
+        self.solution = solution
+
+class FakeBlockRecord:
+    header_hash = bytes(32)
+
+class FakeNetwork:
+    """
+    Blocks full of small coins, each created by a checkers move.
+    """
+    def __init__(self, launcher):
+        board = Program.to(INITIAL_BOARD)
+        inner = Program.to([[], [make_move_sexp(0, 2, 1, 3)], [("game", "checkers"), ("board", board), ("launcher", launcher)]])
+        self.solution = solution_for_singleton(LineageProof(launcher, None, GAME_MOJO), GAME_MOJO, inner)
+        self.additions = [
+            FakeRecord(Coin(i.to_bytes(32, 'big'), bytes(32), GAME_MOJO))
+            for i in range(COINS_PER_BLOCK)
+        ]
+
+    async def get_block_record_by_height(self, height):
+        return FakeBlockRecord()
+
+    async def get_additions_and_removals(self, header_hash):
+        return self.additions, []
+
+    async def get_puzzle_and_solution(self, coin_id, height):
+        return FakeSpend(str(self.solution))
+
+def make_wallet():
+    wallet = CheckersRunnerWallet('bench', 1)
+    wallet.wallet_rpc_client = FakeWalletRpc()
+    wallet.public_key_fingerprints = [1]
+    wallet.game_records = FakeRecords()
+    return wallet
+
+async def identity_search():
+    target = puzzle_for_pk(master_sk_to_wallet_sk(MASTER_SK, SEARCH_INDEX).get_g1())
+    coin = Coin(bytes(32), target.get_tree_hash(), GAME_MOJO)
+    # A new wallet each time so the key ring doesn't remember the answer.
+    await make_wallet().select_identity_for_coin(coin)
+
+async def block_sync(mover, network):
+    for height in range(BLOCKS):
+        await mover.absorb_state(height, network)
+
+def set_logging(verbose):
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if verbose:
+        root.addHandler(logging.StreamHandler(io.StringIO()))
+        root.setLevel(logging.DEBUG)
+    else:
+        root.setLevel(logging.WARNING)
+
+async def timeit(name, verbose, f, *args):
+    set_logging(verbose)
+    start = time.perf_counter()
+    await f(*args)
+    elapsed = time.perf_counter() - start
+    print(f'{name:16} {"verbose" if verbose else "quiet":8} {elapsed:.3f}s')
+    return elapsed
+
+async def main():
+    inner_puzzle_code = load_clvm("checkers.cl", "checkers.code", search_paths=["checkers/code"])
+    launcher = bytes([1] * 32)
+    mover = CheckersMover(inner_puzzle_code, make_wallet(), make_wallet(), launcher_name=launcher)
+    network = FakeNetwork(launcher)
+
+    for verbose in [True, False]:
+        await timeit('identity search', verbose, identity_search)
+        await timeit('block sync', verbose, block_sync, mover, network)
+
+if __name__ == '__main__':
+    asyncio.run(main())
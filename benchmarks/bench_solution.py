@@ -0,0 +1,76 @@
+# Compare the old take_new_coin path (deserialize the whole solution, wrap it
+# in a Program and walk it with as_python) against checkers.solution's walk
+# over the serialized bytes.
+#
+#   python benchmarks/bench_solution.py [corpus]
+#
+# The corpus is a file with one hex solution per line, for example the
+# solution field of get_puzzle_and_solution for every small coin in a range
+# of blocks.  Without one, a mix of checkers moves and standard spends is used.
+import io
+import os
+import sys
+import time
+from binascii import unhexlify
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from clvm import to_sexp_f
+from clvm.serialize import sexp_from_stream
+
+from chia.types.blockchain_format.program import Program
+
+from checkers.driver import CheckersMover, INITIAL_BOARD_PYTHON, make_move_sexp
+from checkers.solution import inspect_solution
+
+REPEAT = 20
+
+def synthetic_corpus():
+    corpus = []
+    for i in range(500):
+        launcher = i.to_bytes(32, 'big')
+        move = [
+            [],
+            [make_move_sexp(0, 2, 1, 3)],
+            [("game", "checkers"), ("board", INITIAL_BOARD_PYTHON), ("launcher", launcher)]
+        ]
+        corpus.append(bytes(Program.to([[launcher, [], 1], 1, move])))
+
+        # A standard coin spend: (() (q . conditions) ())
+        conditions = [[51, launcher, 1000 + i], [51, launcher, 1]]
+        corpus.append(bytes(Program.to([[], (1, conditions), []])))
+
+    return corpus
+
+def load_corpus(path):
+    with open(path) as f:
+        return [unhexlify(line.strip()) for line in f if line.strip()]
+
+def old_path(mover, blob):
+    solution = Program.to(sexp_from_stream(io.BytesIO(blob), to_sexp_f))
+    return mover.isolate_state_from_solution(solution)
+
+def new_path(mover, blob):
+    return inspect_solution(blob)
+
+def run(name, f, mover, corpus):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        results = [f(mover, blob) for blob in corpus]
+    elapsed = time.perf_counter() - start
+    per = 1000000 * elapsed / (REPEAT * len(corpus))
+    print(f'{name:10} {elapsed:.3f}s {per:.1f}us per solution')
+    return results
+
+def main():
+    corpus = load_corpus(sys.argv[1]) if len(sys.argv) > 1 else synthetic_corpus()
+    mover = CheckersMover(None, None, None)
+
+    old = run('old', old_path, mover, corpus)
+    new = run('streaming', new_path, mover, corpus)
+
+    differ = sum(1 for a, b in zip(old, new) if a != b)
+    print(f'{len(corpus)} solutions, {differ} decoded differently')
+
+if __name__ == '__main__':
+    main()
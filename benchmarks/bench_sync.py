@@ -0,0 +1,94 @@
+# Load test the sync pipeline, GameRecords.update_to_current_block and
+# CheckersMover.absorb_state, and the mempool watcher against a synthetic
+# chain of many concurrent games on support.fakenode's stand-in node.
+#
+#   python benchmarks/bench_sync.py [--games N] [--blocks N] [--moves-per-block N]
+#                                   [--tracked N] [--latency SECONDS] [--noise N]
+#
+# Each tracked game is followed by its own mover and GameRecords, all syncing
+# at once as separate processes following their games would.  Reports blocks
+# absorbed and moves scanned per second, and RPCs made per block.
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from support.fakenode import FakeFullNode, SyntheticChain
+
+def make_parser():
+    parser = argparse.ArgumentParser(description='Load test syncing against a synthetic chain.')
+    parser.add_argument('--games', type=int, default=2000, help='games played on the chain')
+    parser.add_argument('--blocks', type=int, default=200, help='blocks after the launches')
+    parser.add_argument('--moves-per-block', type=int, default=500)
+    parser.add_argument('--tracked', type=int, default=4, help='games followed, each by its own mover')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds each RPC takes')
+    parser.add_argument('--noise', type=int, default=50, help='ordinary spends per block')
+    return parser
+
+async def sync(args):
+    from checkers.driver import CheckersMover
+    from checkers.gamerecords import GameRecords
+    from checkers.mempool import MempoolWatcher
+
+    node = FakeFullNode()
+    chain = SyntheticChain(node, noise_per_block=args.noise)
+
+    start = time.perf_counter()
+    launchers = chain.launch(args.games)
+    launch_height = node.height
+    moves = chain.extend(args.blocks, args.moves_per_block)
+    print(f'chain: {args.games} games, {node.height} blocks, {moves} moves, built in {time.perf_counter() - start:.2f}s')
+
+    # Only the launcher is needed to follow a game.
+    movers = [CheckersMover(None, None, None, launcher_name=launcher) for launcher in launchers[:args.tracked]]
+    all_records = [GameRecords(1, 'fake', mover, node) for mover in movers]
+    for records in all_records:
+        records.set_current_block(launch_height - 1)
+
+    node.latency = args.latency
+    node.calls.clear()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(records.update_to_current_block(0) for records in all_records))
+    elapsed = time.perf_counter() - start
+
+    for mover, records in zip(movers, all_records):
+        game = chain.game(mover.launch_coin_name)
+        assert mover.current_coin_name == game.coin.name(), 'sync lost a game'
+        assert len(records.history_rows()) == game.ply
+        records.close()
+
+    blocks = (node.height - launch_height + 1) * len(movers)
+    calls = sum(node.calls.values())
+    print(f'sync:   {blocks} blocks in {elapsed:.2f}s, {blocks / elapsed:,.0f} blocks/s, '
+          f'{moves * len(movers) / elapsed:,.0f} moves/s scanned, {calls / blocks:.1f} RPCs per block')
+
+    # Our games' next moves and others', waiting for a block.
+    for game in chain.games[:args.tracked + args.moves_per_block]:
+        chain.move(game)
+    chain.add_noise()
+
+    watcher = MempoolWatcher(node)
+    for mover in movers:
+        watcher.track(mover)
+
+    start = time.perf_counter()
+    found = await watcher.poll()
+    elapsed = time.perf_counter() - start
+    print(f'mempool: {len(node.mempool)} bundles in {elapsed:.2f}s, {len(node.mempool) / elapsed:,.0f} bundles/s, '
+          f'{len(found)} of our moves pending')
+
+def main():
+    args = make_parser().parse_args()
+
+    # GameRecords keeps checkers.db in the working directory.
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        asyncio.run(sync(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+from typing import List, NamedTuple
+
+import numpy as np
+
+from checkers.engine import BLACK, DIRECTIONS, RED, Board, in_bounds, maskFor
+from checkers.history import HistoryRow
+
+# The counts checkers.engine gives for one board, for whole arrays of boards
+# at once.  Boards are given as arrays of the masks curried into the contract,
+# uint64 with bit 8x+y set for each occupied square, and the rules are the
+# engine's: men step or jump diagonally forward, kings either way, and a
+# player with no move has lost.
+#
+# A move in direction (dx, dy) is a shift of the mask by 8dx+dy.  Squares
+# whose target would be off the board are masked off before shifting so
+# nothing wraps around a column.
+
+ALL_SQUARES = np.uint64(0xffffffffffffffff)
+
+def from_mask(dx, dy, distance) -> np.uint64:
+    """
+    The squares a move of distance in direction (dx, dy) stays on the board from.
+    """
+    mask = 0
+    for x in range(8):
+        for y in range(8):
+            if in_bounds(x + distance * dx, y + distance * dy):
+                mask |= maskFor(x, y)
+    return np.uint64(mask)
+
+FROM_MASKS = {(dx, dy, d): from_mask(dx, dy, d) for dx, dy in DIRECTIONS for d in (1, 2)}
+
+def shift(masks, dx, dy, distance=1):
+    amount = distance * (8 * dx + dy)
+    if amount > 0:
+        return np.left_shift(masks, np.uint64(amount))
+    return np.right_shift(masks, np.uint64(-amount))
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(masks) -> np.ndarray:
+        return np.bitwise_count(masks).astype(np.int64)
+else:
+    BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+    def popcount(masks) -> np.ndarray:
+        as_bytes = np.ascontiguousarray(masks, dtype=np.uint64).view(np.uint8).reshape(-1, 8)
+        return BYTE_COUNTS[as_bytes].sum(axis=1)
+
+def forward_dy(color) -> int:
+    return 1 if color == BLACK else -1
+
+def mobility(king, red, black, color):
+    """
+    The number of moves color has on each board and whether any of them is a
+    jump.
+    """
+    own = black if color == BLACK else red
+    other = red if color == BLACK else black
+    empty = ~(red | black)
+
+    moves = np.zeros(len(own), dtype=np.int64)
+    can_jump = np.zeros(len(own), dtype=bool)
+
+    for dx, dy in DIRECTIONS:
+        # Kings go every way, men only forward.
+        movers = own if dy == forward_dy(color) else own & king
+
+        steps = shift(movers & FROM_MASKS[(dx, dy, 1)], dx, dy) & empty
+        jumps = shift(shift(movers & FROM_MASKS[(dx, dy, 2)], dx, dy) & other, dx, dy) & empty
+
+        moves += popcount(steps) + popcount(jumps)
+        can_jump |= jumps != 0
+
+    return moves, can_jump
+
+class BatchEvaluation(NamedTuple):
+    red_pieces: np.ndarray
+    black_pieces: np.ndarray
+    red_kings: np.ndarray
+    black_kings: np.ndarray
+    red_mobility: np.ndarray
+    black_mobility: np.ndarray
+    mobility: np.ndarray   # of the player to move
+    can_jump: np.ndarray   # the player to move has a jump
+    terminal: np.ndarray   # the player to move has lost
+
+def evaluate(next_color, king, red, black) -> BatchEvaluation:
+    """
+    Piece, king and move counts for each board given by the arrays next_color
+    (1 when black is to move), king, red and black.
+    """
+    next_color = np.asarray(next_color)
+    king = np.asarray(king, dtype=np.uint64)
+    red = np.asarray(red, dtype=np.uint64)
+    black = np.asarray(black, dtype=np.uint64)
+
+    red_mobility, red_jump = mobility(king, red, black, RED)
+    black_mobility, black_jump = mobility(king, red, black, BLACK)
+
+    black_to_move = next_color != 0
+    to_move = np.where(black_to_move, black_mobility, red_mobility)
+
+    return BatchEvaluation(
+        popcount(red),
+        popcount(black),
+        popcount(red & king),
+        popcount(black & king),
+        red_mobility,
+        black_mobility,
+        to_move,
+        np.where(black_to_move, black_jump, red_jump),
+        to_move == 0
+    )
+
+def terminal(boards: List[Board]) -> np.ndarray:
+    """
+    Whether the player to move has lost, for each board as curried into the
+    contract.
+    """
+    if not boards:
+        return np.zeros(0, dtype=bool)
+    next_color, king, red, black = zip(*boards)
+    return evaluate(next_color, king, red, black).terminal
+
+def board_arrays(rows: List[HistoryRow]):
+    """
+    (next_color, king, red, black) arrays of the boards after each move in
+    rows, such as GameRecords.history_rows or read_history give.
+    """
+    return (
+        np.fromiter((r.next for r in rows), dtype=np.uint8, count=len(rows)),
+        np.fromiter((r.king for r in rows), dtype=np.uint64, count=len(rows)),
+        np.fromiter((r.red for r in rows), dtype=np.uint64, count=len(rows)),
+        np.fromiter((r.black for r in rows), dtype=np.uint64, count=len(rows))
+    )
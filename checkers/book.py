@@ -0,0 +1,184 @@
+import hashlib
+import mmap
+import os
+import struct
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from checkers.engine import Board, INITIAL_BOARD, Move, apply_move, best_move, winner
+from checkers.history import HistoryRow
+
+# An opening book: for each early position seen in recorded games, the moves
+# played from it, how often and how often the player who made them went on to
+# win.
+#
+# The book file is a header and then fixed size entries sorted by position key
+# and move, so a lookup is a binary search over the memory mapped file and
+# nothing is read into memory up front.
+#
+#   magic version entries
+#   key     uint64, position_key of the board before the move
+#   move    uint32, as make_move_sexp gives it
+#   played  uint32
+#   won     uint32
+#
+# All integers are little endian.
+
+MAGIC = b'CKBOOK'
+VERSION = 1
+HEADER = struct.Struct('<6sBI')
+ENTRY = struct.Struct('<QIII')
+
+# Positions after this many moves are left to search.
+BOOK_PLIES = 16
+BOOK_PATH = os.environ.get('CHECKERS_BOOK', 'checkers.book')
+
+class BookEntry(NamedTuple):
+    move: Move
+    played: int
+    won: int
+
+def position_key(board: Board) -> int:
+    next_color, king, red, black = board
+    digest = hashlib.sha256(struct.pack('<BQQQ', 1 if next_color else 0, king, red, black)).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+def move_from_number(m: int) -> Move:
+    return m & 0xff, (m >> 8) & 0xff, (m >> 16) & 0xff, (m >> 24) & 0xff
+
+def book_stats(rows: List[HistoryRow], max_plies: int = BOOK_PLIES) -> Dict[Tuple[int, int], List[int]]:
+    """
+    Count (played, won) for each (position key, move) in the first max_plies
+    moves of the games in rows, in any order.  A move given more than once,
+    as when a history file overlaps checkers.db, counts once.  Unfinished
+    games count as played but not won.
+    """
+    games: Dict[bytes, Dict[int, HistoryRow]] = {}
+    for r in rows:
+        games.setdefault(r.launcher, {}).setdefault(r.ply, r)
+
+    stats: Dict[Tuple[int, int], List[int]] = {}
+    for plies in games.values():
+        game = [plies[ply] for ply in sorted(plies)]
+        # A game missing its first moves can't be placed in the book.
+        if game[0].ply != 0:
+            continue
+
+        last = game[-1]
+        won_by = winner((last.next, last.king, last.red, last.black))
+
+        board = INITIAL_BOARD
+        for expected_ply, r in enumerate(game[:max_plies]):
+            if r.ply != expected_ply:
+                break
+
+            entry = stats.setdefault((position_key(board), r.move), [0, 0])
+            entry[0] += 1
+            if won_by is not None and won_by == board[0]:
+                entry[1] += 1
+
+            board = (r.next, r.king, r.red, r.black)
+
+    return stats
+
+def write_book(path: str, stats: Dict[Tuple[int, int], List[int]]):
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(stats)))
+        for (key, move), (played, won) in sorted(stats.items()):
+            f.write(ENTRY.pack(key, move, played, won))
+
+class OpeningBook:
+    def __init__(self, path: str = BOOK_PATH):
+        self.file = open(path, 'rb')
+        header = self.file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f'{path} is not an opening book')
+
+        magic, version, self.count = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not an opening book')
+        if version != VERSION:
+            raise ValueError(f'{path} has book format {version}, expected {VERSION}')
+
+        self.data = None
+        if self.count:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self.data) < HEADER.size + self.count * ENTRY.size:
+                raise ValueError(f'{path} is damaged')
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+        self.file.close()
+
+    def key_at(self, i: int) -> int:
+        return struct.unpack_from('<Q', self.data, HEADER.size + i * ENTRY.size)[0]
+
+    def lookup(self, board: Board) -> List[BookEntry]:
+        """
+        The moves recorded from board, most played first.
+        """
+        if self.data is None:
+            return []
+
+        key = position_key(board)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        result = []
+        for i in range(low, self.count):
+            entry_key, move, played, won = ENTRY.unpack_from(self.data, HEADER.size + i * ENTRY.size)
+            if entry_key != key:
+                break
+            result.append(BookEntry(move_from_number(move), played, won))
+
+        result.sort(key=lambda e: -e.played)
+        return result
+
+    def choose(self, board: Board) -> Optional[Move]:
+        """
+        The book move with the best record from board, or None if the book
+        has nothing for it.  Records are evened out toward a draw so that one
+        lucky game doesn't outweigh many.
+        """
+        best = None
+        best_score = None
+        for entry in self.lookup(board):
+            # A different position with the same key would give moves that
+            # aren't allowed here.
+            if apply_move(board, *entry.move) is None:
+                continue
+
+            score = ((entry.won + 1) / (entry.played + 2), entry.played)
+            if best_score is None or score > best_score:
+                best, best_score = entry.move, score
+
+        return best
+
+def book_chooser(book: Optional[OpeningBook], search: Callable[[Board], Optional[Move]] = best_move):
+    """
+    A move chooser that takes the book's move when it has one and searches
+    otherwise.
+    """
+    if book is None:
+        return search
+
+    def choose(board: Board) -> Optional[Move]:
+        move = book.choose(board)
+        if move is not None:
+            return move
+        return search(board)
+
+    return choose
+
+def default_book() -> Optional[OpeningBook]:
+    """
+    The book at CHECKERS_BOOK, checkers.book by default, if it's been built.
+    """
+    if not os.path.exists(BOOK_PATH):
+        return None
+    return OpeningBook(BOOK_PATH)
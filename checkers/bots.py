@@ -0,0 +1,423 @@
+import asyncio
+import binascii
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from clvm.casts import int_from_bytes
+
+from checkers.batch import terminal
+from checkers.book import book_chooser, default_book
+from checkers.engine import Board, Move
+
+# Play many games from one process.  One wallet and one GameRecords are
+# shared by every game: a single sync loop reads each block once for all of
+# them, and after each sync the games where it's our turn are queued for a
+# pool of workers that choose a move and push it.
+#
+# Each game has at most one decision or push in flight, and once we've moved
+# it isn't queued again until the chain shows a new coin for it.  The queue is
+# bounded, so when the workers fall behind the sync loop waits for them rather
+# than piling up work, and pushes are rate limited across all games.
+#
+# With a MempoolWatcher, each sync also looks in the mempool for our
+# opponents' moves that aren't in a block yet.  When speculating, a
+# checkers.speculate Speculator prepares our reply to each answer the opponent
+# could make as soon as we've moved, and the reply is pushed as soon as their
+# move shows up, in the mempool or in a block, without waiting for a worker.
+#
+# Each game plays as the WalletIdentity of its own key, so games on different
+# keys don't wait for each other and nothing is held across a round trip.
+#
+# Games we've won are found after each sync too, for all of them at once with
+# checkers.batch, and their wins are taken in one spend bundle.
+
+DEFAULT_WORKERS = 4
+DEFAULT_SYNC_SECONDS = 10.0
+DEFAULT_PUSHES_PER_SECOND = 5.0
+# Games waiting for a worker before syncing waits.
+DEFAULT_QUEUE_SIZE = 256
+
+log = logging.getLogger(__name__)
+
+def board_tuple(board) -> Board:
+    return tuple(x if isinstance(x, int) else int_from_bytes(x) for x in board)
+
+class RateLimiter:
+    """
+    A token bucket: rate acquisitions per second on average, burst at once.
+    A rate of 0 or less doesn't limit.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class BotGame:
+    def __init__(self, mover, player):
+        self.mover = mover
+        # Which of the mover's players is us.
+        self.player = player
+        # Queued, deciding or pushing.
+        self.busy = False
+        # The coin we last moved from.  Until the game has another, our move
+        # is still on its way.
+        self.moved_from: Optional[bytes] = None
+        self.moves = 0
+        self.failures = 0
+        self.won = False
+        # Preparing replies to the opponent's next move, if speculating.
+        self.speculator = None
+
+class BotRunner:
+    def __init__(
+        self,
+        wallet,
+        inner_puzzle_code=None,
+        choose: Optional[Callable[[Board], Optional[Move]]] = None,
+        workers: int = DEFAULT_WORKERS,
+        pushes_per_second: float = DEFAULT_PUSHES_PER_SECOND,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        sync_seconds: float = DEFAULT_SYNC_SECONDS,
+        executor=None,
+        pool=None,
+        watcher=None,
+        speculate: bool = False
+    ):
+        self.wallet = wallet
+        self.inner_puzzle_code = inner_puzzle_code
+        # Run on executor threads when given.  Otherwise moves are chosen in
+        # the pool if there is one, and with the opening book here if not.
+        self.choose = choose
+        self.workers = workers
+        self.limiter = RateLimiter(pushes_per_second)
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.sync_seconds = sync_seconds
+        # Where choose runs; the event loop's default threads unless given.
+        self.executor = executor
+        # A checkers.workers MovePool to work out and sign moves in, if any.
+        self.pool = pool
+        # A checkers.mempool MempoolWatcher to look for our opponents' moves
+        # with after each sync, if any.
+        self.watcher = watcher
+        self.speculate = speculate
+        self.games: Dict[bytes, BotGame] = {}
+        # Prepared replies being pushed.
+        self.responding: Set[asyncio.Task] = set()
+
+    def add_mover(self, mover, player) -> BotGame:
+        """
+        Play the game mover follows as player, one of its two.  The wallet
+        must be started.
+        """
+        records = self.wallet.game_records
+        found = records.get_coin_for_launcher(mover.launch_coin_name)
+        if found is not None:
+            coin, board = found
+            mover.set_current_coin_name(coin)
+            mover.set_board(board)
+
+        records.add_mover(mover)
+        if self.watcher is not None:
+            self.watcher.track(mover)
+        game = BotGame(mover, player)
+        if self.speculate:
+            mover.on_new_coin = lambda coin: self.respond(game, coin.name())
+        self.games[bytes(mover.launch_coin_name)] = game
+        return game
+
+    async def add_game(self, identifier: str) -> BotGame:
+        """
+        Play the game with the identifier gamewallet.py launch gives, on
+        whichever side our keys are.
+        """
+        from blspy import G1Element
+
+        from checkers.driver import CheckersMover
+        from wallet.notme import NotMeWallet
+
+        launcher, black_pk_str, red_pk_str = identifier.split('-')
+        black_pk = G1Element.from_bytes(binascii.unhexlify(black_pk_str))
+        red_pk = G1Element.from_bytes(binascii.unhexlify(red_pk_str))
+
+        player = await self.wallet.identity_for_pk(red_pk)
+        if player is not None:
+            mover = CheckersMover(self.inner_puzzle_code, NotMeWallet(black_pk), player)
+        else:
+            player = await self.wallet.identity_for_pk(black_pk)
+            if player is None:
+                raise ValueError(f'neither player of {launcher} is one of our keys')
+            mover = CheckersMover(self.inner_puzzle_code, player, NotMeWallet(red_pk))
+
+        mover.set_launch_coin_name(binascii.unhexlify(launcher))
+        return self.add_mover(mover, player)
+
+    def ready(self, game: BotGame) -> bool:
+        mover = game.mover
+        return (
+            not game.busy and
+            mover.current_coin_name is not None and
+            mover.current_coin_name != game.moved_from and
+            mover.get_next_mover() is game.player
+        )
+
+    def won_games(self) -> List[BotGame]:
+        """
+        The games whose coin is ours to take: the other player is to move and
+        can't.
+        """
+        waiting = [
+            game for game in self.games.values()
+            if not game.busy and
+            not game.mover.claimed and
+            game.mover.current_coin_name is not None and
+            game.mover.current_coin_name != game.moved_from and
+            game.mover.get_next_mover() is not game.player
+        ]
+        over = terminal([board_tuple(game.mover.board) for game in waiting])
+        return [game for game, done in zip(waiting, over) if done]
+
+    async def push_claims(self, bundles) -> List[bool]:
+        """
+        Push the spend bundles taking wins together, and one at a time if
+        that's refused, so that one bad claim doesn't hold up the rest.
+        Gives whether each was accepted.
+        """
+        from chia.types.spend_bundle import SpendBundle
+
+        pushed = await self.wallet.push_tx(SpendBundle.aggregate(bundles))
+        if 'error' not in pushed.result:
+            return [True] * len(bundles)
+        if len(bundles) == 1:
+            log.warning('win refused: %s', pushed.result['error'])
+            return [False]
+
+        accepted = []
+        for bundle in bundles:
+            pushed = await self.wallet.push_tx(bundle)
+            accepted.append('error' not in pushed.result)
+        return accepted
+
+    async def claim_wins(self) -> int:
+        """
+        Take the coin of every game we've won.  Gives the number taken.
+        """
+        claims = []
+        for game in self.won_games():
+            mover = game.mover
+            parent_coins = await self.wallet.get_parent_coins(mover.launch_coin_name)
+            try:
+                claims.append((game, mover.current_coin_name, mover.win_bundle(parent_coins)))
+            except Exception as e:
+                game.failures += 1
+                log.warning('win in %s failed: %s', binascii.hexlify(mover.launch_coin_name).decode('utf8'), e)
+
+        if not claims:
+            return 0
+
+        await self.limiter.acquire()
+        accepted = await self.push_claims([bundle for _, _, bundle in claims])
+        for (game, spent, _), ok in zip(claims, accepted):
+            if ok:
+                game.moved_from = spent
+                game.won = True
+            else:
+                game.failures += 1
+
+        log.info('took %d wins', sum(accepted))
+        return sum(accepted)
+
+    async def watch_mempool(self) -> int:
+        """
+        Look in the mempool for moves in our games that aren't in a block
+        yet.  Gives the number found.
+        """
+        if self.watcher is None:
+            return 0
+
+        try:
+            found = await self.watcher.poll()
+        except Exception as e:
+            # Looked at again after the next sync.
+            log.warning('mempool poll failed: %s', e)
+            return 0
+
+        for mover, pending in found:
+            log.info('move %s in %s is waiting for a block', pending.move, binascii.hexlify(mover.launch_coin_name).decode('utf8'))
+            game = self.games.get(bytes(mover.launch_coin_name))
+            if game is not None and pending.created is not None:
+                self.respond(game, pending.created)
+        return len(found)
+
+    def respond(self, game: BotGame, coin_name: bytes) -> Optional[asyncio.Task]:
+        """
+        Push the reply prepared to the opponent's move that made the named
+        coin in game, if there is one, in the background.
+        """
+        speculator = game.speculator
+        if (
+            speculator is None or
+            game.busy or
+            game.moved_from == coin_name or
+            speculator.reply_for(coin_name) is None
+        ):
+            return None
+
+        game.busy = True
+        task = asyncio.create_task(self.push_reply(game, coin_name))
+        self.responding.add(task)
+        task.add_done_callback(self.responding.discard)
+        return task
+
+    async def push_reply(self, game: BotGame, coin_name: bytes):
+        mover = game.mover
+        try:
+            await self.limiter.acquire()
+            pushed = await game.speculator.respond(coin_name)
+            if pushed is None or 'error' in pushed.result:
+                # Played as usual once the chain has their move.
+                game.failures += 1
+                log.warning('prepared reply in %s refused', binascii.hexlify(mover.launch_coin_name).decode('utf8'))
+                return
+
+            game.moved_from = coin_name
+            game.moves += 1
+            log.info('replied in %s', binascii.hexlify(mover.launch_coin_name).decode('utf8'))
+            game.speculator.start()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            game.failures += 1
+            log.warning('prepared reply in %s failed: %s', binascii.hexlify(mover.launch_coin_name).decode('utf8'), e)
+        finally:
+            game.busy = False
+
+    def speculate_on(self, game: BotGame):
+        """
+        Start preparing replies to the opponent's answers to our last move.
+        """
+        if game.speculator is None:
+            from checkers.speculate import Speculator
+            game.speculator = Speculator(game.mover, self.choose, self.pool, self.executor)
+        game.speculator.start()
+
+    async def sync(self) -> int:
+        """
+        Sync every game, take any wins and queue the games where it's our
+        turn.  Gives the number queued.
+        """
+        await self.wallet.game_records.update_to_current_block(self.wallet.blocks_ago)
+        await self.watch_mempool()
+        await self.claim_wins()
+
+        queued = 0
+        for game in self.games.values():
+            if self.ready(game):
+                game.busy = True
+                # Waits here while the queue is full.
+                await self.queue.put(game)
+                queued += 1
+
+        if queued:
+            log.info('%d games to move in', queued)
+        return queued
+
+    async def choose_move(self, board: Board) -> Optional[Move]:
+        """
+        Our move on board, chosen away from the event loop.
+        """
+        if self.choose is None and self.pool is not None:
+            return await self.pool.choose(list(board))
+
+        if self.choose is None:
+            self.choose = book_chooser(default_book())
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.choose, board)
+
+    async def play(self, game: BotGame):
+        """
+        Choose and push our move in game.
+        """
+        mover = game.mover
+        spent = mover.current_coin_name
+
+        move = await self.choose_move(board_tuple(mover.board))
+        if move is None:
+            # We've no move, so the game's been lost.
+            game.moved_from = spent
+            return
+
+        await self.limiter.acquire()
+        parent_coins = await self.wallet.get_parent_coins(mover.launch_coin_name)
+        if self.pool is not None:
+            job = mover.move_job(parent_coins, *move)
+            await mover.push_prepared(parent_coins, await self.pool.prepare(job))
+        else:
+            await mover.make_move(parent_coins, *move)
+
+        game.moved_from = spent
+        game.moves += 1
+        log.info('moved %s in %s', move, binascii.hexlify(mover.launch_coin_name).decode('utf8'))
+        if self.speculate:
+            self.speculate_on(game)
+
+    async def worker(self):
+        while True:
+            game = await self.queue.get()
+            try:
+                await self.play(game)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Tried again after the next sync.
+                game.failures += 1
+                log.warning('move in %s failed: %s', binascii.hexlify(game.mover.launch_coin_name).decode('utf8'), e)
+            finally:
+                game.busy = False
+                self.queue.task_done()
+
+    async def run(self, syncs: Optional[int] = None):
+        """
+        Sync and play until cancelled, or for the given number of syncs,
+        after which the moves queued are finished.
+        """
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        try:
+            done = 0
+            while syncs is None or done < syncs:
+                await self.sync()
+                done += 1
+                if syncs is None or done < syncs:
+                    await asyncio.sleep(self.sync_seconds)
+            await self.queue.join()
+            await asyncio.gather(*self.responding)
+        finally:
+            for task in workers + list(self.responding):
+                task.cancel()
+            for game in self.games.values():
+                if game.speculator is not None:
+                    game.speculator.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def report(self) -> List[str]:
+        return [
+            f'{binascii.hexlify(launcher).decode("utf8")}: {game.moves} moves, {game.failures} failures' +
+            (', won' if game.won else '')
+            for launcher, game in self.games.items()
+        ]
@@ -1,10 +1,11 @@
 import io
 import os
 import time
-from typing import List, Tuple, Optional
+import logging
+from typing import Callable, Dict, List, NamedTuple, Tuple, Optional
 from binascii import hexlify, unhexlify
 
-from blspy import AugSchemeMPL
+from blspy import AugSchemeMPL, G2Element
 
 from clvm import SExp, to_sexp_f
 from clvm.casts import int_from_bytes, int_to_bytes
@@ -36,7 +37,13 @@ from chia.util.ints import uint64
 
 from cdv.test import CoinWrapper
 
+from checkers.engine import BLACK, winner
+from checkers.mempool import PendingMove
+from checkers.preflight import BAD_CONDITIONS, ILLEGAL_MOVE, SpendRejected, check_conditions, check_coin, check_lineage, check_move
+from checkers.solution import inspect_solution, move_from_solution
+from support.metrics import METRICS, run_program as timed_run_program, timed
 from wallet import tohex, fromhex
+from wallet.signing import sign_spend_for_conditions
 
 GAME_MOJO = 1 # 1 mojo, singleton requires odd number
 INITIAL_BOARD_PYTHON = [1, 0, int_to_bytes(0xa040a040a040a040), int_to_bytes(0x205020502050205)]
@@ -47,6 +54,8 @@ SINGLETON_MOD_HASH = SINGLETON_MOD.get_tree_hash()
 SINGLETON_LAUNCHER = load_clvm("singleton_launcher.clvm")
 SINGLETON_LAUNCHER_HASH = SINGLETON_LAUNCHER.get_tree_hash()
 
+log = logging.getLogger(__name__)
+
 def maskFor(x,y):
     return 1 << ((8 * x) + y)
 
@@ -63,7 +72,7 @@ def convert_to_int(b):
 
 def showBoard(b):
     outstr = io.StringIO()
-    print(f'black move {b} {convert_to_int(b[0])}')
+    log.debug('black move %s %s', b, convert_to_int(b[0]))
 
     if convert_to_int(b[0]):
         outstr.write('Black to move\n')
@@ -102,6 +111,23 @@ def boardDictToLinear(b):
 def showBoardFromDict(b):
     return showBoard(boardDictToLinear(b))
 
+def boardFromSExp(b):
+    return [a.as_atom() for a in b.as_iter()]
+
+class MoveSpend(NamedTuple):
+    coin_spend: CoinSpend
+    conditions: Dict             # as conditions_dict_for_solution gives them
+    cost: int
+    next_board: SExp
+    next_puzzle_hash: bytes32    # of the game coin the spend creates
+    seconds: Dict[str, float]
+
+class WinSpend(NamedTuple):
+    coin_spend: CoinSpend
+    conditions: Dict             # as conditions_dict_for_solution gives them
+    cost: int
+    winner: int                  # checkers.engine's BLACK or RED
+
 def make_move_sexp(fromX,fromY,toX,toY):
     return fromX + (fromY << 8) + (toX << 16) + (toY << 24)
 
@@ -113,8 +139,22 @@ class CheckersMover:
         self.red = player_red
         self.launch_coin_name = launcher_name
         self.current_coin_name = None
-        self.parent_puzzle_hash = None
+        # Seconds taken by each stage of the last move we made, and its cost.
+        self.move_breakdown = {}
         self.board = INITIAL_BOARD_PYTHON
+        # Moves seen by take_new_coin as (coin name, move, board, height) for
+        # GameRecords to keep.
+        self.seen_moves = []
+        # A spend of current_coin_name seen in the mempool, until it's in a block.
+        self.pending: Optional[PendingMove] = None
+        # The game coin our last move made and its board.
+        self.pushed_coin: Optional[Coin] = None
+        self.pushed_board = None
+        # Set once the winner has taken the game's coin.
+        self.claimed = False
+        # Called with each coin take_new_coin finds a move in our game made,
+        # for instance to push the reply a Speculator prepared to it.
+        self.on_new_coin: Optional[Callable[[Coin], None]] = None
 
     async def launch_game(self,launch_coin):
         """
@@ -129,54 +169,15 @@ class CheckersMover:
         using the ```get_puzzle_and_solution``` rpc method.
         """
 
-        print(f'launch with coin {launch_coin.name()}')
-
-        game_comment = [
-            ("game", "checkers"),
-            ("board", INITIAL_BOARD),
-            ("launcher", launch_coin.name())
-        ]
+        log.info('launch with coin %s', launch_coin.name())
 
         # Ensure black knows what wallet the coin we're using came from
         await self.black.select_identity_for_coin(launch_coin)
 
-        # Figure out the full singleton solution
-        self.launch_coin_name = Coin(
-            launch_coin.name(),
-            SINGLETON_LAUNCHER_HASH,
-            GAME_MOJO
-        ).name()
-
-        original_coin_puzzle = await self.black.puzzle_for_puzzle_hash(launch_coin.as_coin().puzzle_hash)
-        inner_puzzle = self.get_coin_puzzle()
-        created_singleton_puzzle = puzzle_for_singleton(
-            launch_coin.name(),
-            inner_puzzle
-        )
-        created_singleton_puzzle_hash = created_singleton_puzzle.get_tree_hash()
-
         # Conditions is the second argument to a conventional spend of launch_coin
         # Spend is the subsequent spend of the launcher to become launched.
-        print(f'creating launcher with pk {self.black.pk()} from launch coin {launch_coin.name()}')
-        launch_conditions, spend = launch_conditions_and_coinsol(
-            launch_coin.as_coin(),
-            inner_puzzle,
-            game_comment,
-            GAME_MOJO
-        )
-
-        print(f'launch coin {hexlify(launch_coin.name())}')
-        print(f'launch_conditions {Program.to(launch_conditions)}')
-        print(f'proposed spend {spend}')
-        print(f'spend.puzzle_reveal {spend.puzzle_reveal.get_tree_hash()} vs {SINGLETON_LAUNCHER_HASH}')
-
-        launch_coin_2 = Coin(
-            launch_coin.name(),
-            spend.puzzle_reveal.get_tree_hash(),
-            amount=GAME_MOJO
-        )
-
-        self.launch_coin_name = launch_coin_2.name()
+        log.debug('creating launcher with pk %s from launch coin %s', self.black.pk(), launch_coin.name())
+        launch_conditions, spend = self.launch_spends(launch_coin.as_coin())
 
         assert self.black
         assert self.black.puzzle_hash
@@ -190,30 +191,55 @@ class CheckersMover:
             pushtx=False
         )
 
-        assert launch_coin_2.name() == Coin(
-            launch_coin.name(),
-            SINGLETON_LAUNCHER_HASH,
-            GAME_MOJO
-        ).name()
-
-        print(f'second spend {spend}')
-        print(f'puzzle hash of eve coin is {created_singleton_puzzle_hash}')
-        print(f'expected parent of eve coin is {launch_coin_2.name()}')
+        log.debug('second spend %s', spend)
 
         launch_coin_spend_into_singleton_launcher.coin_spends.append(spend)
         await self.black.push_tx(launch_coin_spend_into_singleton_launcher)
 
-        result_coin = Coin(
-            launch_coin_2.name(),
-            created_singleton_puzzle_hash,
+        log.info('launched eve coin %s', self.current_coin.name())
+        return self.launch_coin_name, self.current_coin
+
+    def launch_spends(self,parent_coin: Coin) -> Tuple[List[Program], CoinSpend]:
+        """
+        Work out the launch of this game from a standard coin of GAME_MOJO or
+        more that we can spend.  Gives the conditions the parent's spend must
+        output and the spend of the singleton launcher it creates, and sets
+        the launcher name and eve coin of the game.  Nothing is signed or pushed.
+        """
+        game_comment = [
+            ("game", "checkers"),
+            ("board", INITIAL_BOARD),
+            ("launcher", parent_coin.name())
+        ]
+
+        launcher_coin = generate_launcher_coin(parent_coin, GAME_MOJO)
+        self.launch_coin_name = launcher_coin.name()
+
+        inner_puzzle = self.get_coin_puzzle()
+        launch_conditions, spend = launch_conditions_and_coinsol(
+            parent_coin,
+            inner_puzzle,
+            game_comment,
             GAME_MOJO
         )
-        print(f'expected eve coin name is {hexlify(result_coin.name())}')
 
-        self.current_coin = result_coin
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('launch_conditions %s', Program.to(launch_conditions))
+            log.debug('spend.puzzle_reveal %s vs %s', spend.puzzle_reveal.get_tree_hash(), SINGLETON_LAUNCHER_HASH)
 
-        print(f'returning coins {self.current_coin.name()}')
-        return self.launch_coin_name, self.current_coin
+        created_singleton_puzzle_hash = puzzle_for_singleton(
+            self.launch_coin_name,
+            inner_puzzle
+        ).get_tree_hash()
+
+        self.current_coin = Coin(
+            self.launch_coin_name,
+            created_singleton_puzzle_hash,
+            GAME_MOJO
+        )
+        log.debug('expected eve coin name is %s', self.current_coin.name())
+
+        return launch_conditions, spend
 
     def set_board(self, board):
         self.board = boardDictToLinear(board)
@@ -233,7 +259,7 @@ class CheckersMover:
         will only be spendable by a matching program with similarly pre-
         specified arguments.
         """
-        print(f'currying in identities BLACK {self.black.pk()} RED {self.red.pk()}')
+        log.debug('currying in identities BLACK %s RED %s', self.black.pk(), self.red.pk())
         return self.inner_puzzle_code.curry(
             self.inner_puzzle_code.get_tree_hash(),
             fromhex(self.launch_coin_name), # Launcher
@@ -255,6 +281,20 @@ class CheckersMover:
         else:
             return self.red
 
+    def winner(self) -> Optional[int]:
+        """
+        The color that has won, by checkers.engine, or None while the player
+        to move has a move.  Nothing is run on chain.
+        """
+        return winner(tuple(convert_to_int(x) for x in self.board))
+
+    def get_winning_player(self):
+        """Return the wallet of the winner, or None if the game isn't over"""
+        won_by = self.winner()
+        if won_by is None:
+            return None
+        return self.black if won_by == BLACK else self.red
+
     def set_current_coin_name(self,current_coin_name: bytes):
         self.current_coin_name = fromhex(current_coin_name)
 
@@ -262,7 +302,8 @@ class CheckersMover:
         self.launch_coin_name = fromhex(launch_coin_name)
 
     def own_conception_of_coin_id(self,launch_coin_name,launcher_puzzle_hash,amount):
-        _, sha256_result = run_program(
+        _, sha256_result = timed_run_program(
+            'coin_id',
             Program.to([11, (1, launch_coin_name), (1, launcher_puzzle_hash), (1, amount)]),
             [],
             OPERATOR_LOOKUP
@@ -270,56 +311,67 @@ class CheckersMover:
 
         return sha256_result
 
-    async def make_move(self,parent_list,fromX,fromY,toX,toY):
+    def simulate_move(self,board,fromX,fromY,toX,toY) -> Tuple[Program, SExp]:
         """
-        Given from and to coordinates, prepare arguments and spend the latest
-        coin of the game to perform the user's move.  If anything about this
-        is incorrect, the coin won't allow the spend.
+        Give the inner puzzle of the game coin holding board and the board the
+        contract says a move from it leaves.
         """
-
-        print('do move based on')
-        for p in parent_list:
-            print(f'{p["coin"].name} p')
-
         move = make_move_sexp(fromX,fromY,toX,toY)
         maybeMove = SExp.to(move).cons(SExp.to([]))
 
-        print(f're-creating puzzle based on board {self.board}')
-        current_puzzle = self.get_coin_puzzle()
+        log.debug('re-creating puzzle based on board %s', board)
+        current_puzzle = self.get_puzzle_for_board_state(board)
 
         simArgs = SExp.to([0, "simulate", maybeMove, []])
-        cost, result = run_program(
+        cost, result = timed_run_program(
+            'simulate',
             current_puzzle,
             simArgs,
             OPERATOR_LOOKUP
         )
-        self.parent_puzzle_hash = current_puzzle.get_tree_hash()
 
-        print(f'result {result}')
+        log.debug('result %s', result)
+        return current_puzzle, result.rest()
 
-        expectedPuzzleHash = bytes32(result.first().as_python())
-
-        player_to_move = self.get_next_mover()
+    def move_solution(self,lineage_proof: LineageProof,next_board,fromX,fromY,toX,toY) -> Program:
+        """
+        The singleton solution making a move that leaves next_board.
+        """
+        maybeMove = SExp.to(make_move_sexp(fromX,fromY,toX,toY)).cons(SExp.to([]))
         moveTail = [
             ("game", "checkers"),
-            ("board", result.rest()),
+            ("board", next_board),
             ("launcher", self.launch_coin_name)
         ]
+        inner_program_args = SExp.to([[], maybeMove, moveTail])
 
-        sing_adapted_puzzle = puzzle_for_singleton(
-            self.launch_coin_name,
-            current_puzzle
-        )
-        new_adapted_puzzle = puzzle_for_singleton(
-            self.launch_coin_name,
-            self.get_puzzle_for_board_state(result.rest())
+        return solution_for_singleton(
+            lineage_proof,
+            GAME_MOJO,
+            inner_program_args
         )
-        inner_program_args = SExp.to([[], maybeMove, moveTail])
 
-        # A fake coin spend that will be used as a container for the lineage
-        # Proof calculation.
-        print(f'game coin is {tohex(self.current_coin_name)}')
+    def win_solution(self,lineage_proof: LineageProof) -> Program:
+        """
+        The singleton solution taking the win: no move, and the launcher so
+        that observers can tell which game ended.
+        """
+        winTail = [
+            ("game", "checkers"),
+            ("launcher", self.launch_coin_name)
+        ]
+        inner_program_args = SExp.to([[], [], winTail])
+
+        return solution_for_singleton(
+            lineage_proof,
+            GAME_MOJO,
+            inner_program_args
+        )
 
+    def lineage_proof_for_move(self,parent_list) -> LineageProof:
+        """
+        The lineage proof for spending the newest coin in parent_list.
+        """
         # Lineage proof is constructed differently depending on whether this is
         # the first spend.  In the case of checkers, we give the originator the
         # first move so they will be responsible for constructing it differently.
@@ -332,63 +384,240 @@ class CheckersMover:
                 start_state = False
 
         if start_state:
-            lineage_proof = LineageProof(
+            return LineageProof(
                 fromhex(self.launch_coin_name),
                 None,
                 GAME_MOJO
             )
 
-        else:
-            lineage_proof = lineage_proof_for_coinsol(parent_list[-2]['spend'])
+        log.debug('"parent" coin %s', parent_list[-2]["coin"].coin.parent_coin_info)
+        return lineage_proof_for_coinsol(parent_list[-2]['spend'])
 
-        print(f'"parent" coin {tohex(parent_list[-2]["coin"].coin.parent_coin_info)}')
-        print(f'board state curried into spend {self.board}')
+    def checked_lineage_proof(self,parent_list) -> LineageProof:
+        """
+        lineage_proof_for_move, once parent_list is found to lead from our
+        launcher to the unspent coin our board is for.
+        """
+        lineage_proof = self.lineage_proof_for_move(parent_list)
+        check_lineage(parent_list,fromhex(self.launch_coin_name),self.current_coin_name,lineage_proof)
+        return lineage_proof
 
-        args = solution_for_singleton(
-            lineage_proof,
-            GAME_MOJO,
-            inner_program_args
-        )
-        print(f'singleton args {args}')
+    def prepare_move_spend(self,coin: Coin,lineage_proof: LineageProof,fromX,fromY,toX,toY) -> MoveSpend:
+        """
+        Build the spend of coin making a move from our board and run it once
+        for the conditions to sign.  The next board comes from
+        checkers.engine and the run confirms it: the coin the spend creates
+        must be the one for that board.  Only if it isn't is the contract asked
+        to simulate the move.
+
+        Raises checkers.preflight's SpendRejected, without running anything
+        when it can, if the node would refuse the spend.
+        """
+        seconds = {}
+        start = time.perf_counter()
+
+        def lap(stage):
+            nonlocal start
+            now = time.perf_counter()
+            seconds[stage] = seconds.get(stage, 0) + now - start
+            start = now
+
+        after = check_move(tuple(convert_to_int(x) for x in self.board),(fromX,fromY,toX,toY))
+        next_board = SExp.to(list(after))
+        current_puzzle = self.get_puzzle_for_board_state(self.board)
+        singleton_puzzle = puzzle_for_singleton(self.launch_coin_name, current_puzzle)
+        check_coin(coin,singleton_puzzle.get_tree_hash())
+        signer = self.get_next_mover().pk()
+        lap('board')
+
+        for simulated in (False, True):
+            if simulated:
+                log.warning('engine and contract disagree about move %s; simulating it', (fromX,fromY,toX,toY))
+                _, next_board = self.simulate_move(self.board,fromX,fromY,toX,toY)
+                lap('simulate')
+
+            solution = self.move_solution(lineage_proof,next_board,fromX,fromY,toX,toY)
+            next_puzzle_hash = puzzle_for_singleton(
+                self.launch_coin_name,
+                self.get_puzzle_for_board_state(next_board)
+            ).get_tree_hash()
+            coin_spend = CoinSpend(coin, singleton_puzzle, solution)
+            lap('puzzles')
+
+            run_start = time.perf_counter()
+            error, conditions, cost = conditions_dict_for_solution(
+                coin_spend.puzzle_reveal, coin_spend.solution, DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM
+            )
+            METRICS.observe('clvm', 'move_run', time.perf_counter() - run_start, error=error is not None, cost=cost or 0)
+            lap('run')
+
+            try:
+                check_conditions(error,conditions,cost or 0,signer,next_puzzle_hash,GAME_MOJO)
+            except SpendRejected as e:
+                if simulated or e.reason != BAD_CONDITIONS:
+                    raise
+                continue
+
+            return MoveSpend(coin_spend, conditions, cost, next_board, next_puzzle_hash, seconds)
+
+    def prepare_win_spend(self,coin: Coin,lineage_proof: LineageProof) -> WinSpend:
+        """
+        Build the spend of coin taking the win and run it once for the
+        conditions to sign.  The contract's own check that the game is over
+        can't be relied on (see checkers.engine), so a board the engine says
+        can still be played is refused here without running anything.
+        """
+        won_by = self.winner()
+        if won_by is None:
+            raise SpendRejected(ILLEGAL_MOVE, 'not a win yet')
 
-        print(f'run adapted puzzle {sing_adapted_puzzle}')
-        print(f'with args {args}')
-        puzzle_result = sing_adapted_puzzle.run(args)
+        singleton_puzzle = puzzle_for_singleton(self.launch_coin_name, self.get_coin_puzzle())
+        check_coin(coin,singleton_puzzle.get_tree_hash())
+        coin_spend = CoinSpend(coin, singleton_puzzle, self.win_solution(lineage_proof))
 
-        print(f'doing spend from {player_to_move.puzzle_hash}')
-        print(f'coin heritage: {parent_list}')
-        after_move_txn = await player_to_move.spend_coin(
+        with timed('clvm', 'win_run'):
+            error, conditions, cost = conditions_dict_for_solution(
+                coin_spend.puzzle_reveal, coin_spend.solution, DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM
+            )
+        # AGG_SIG_ME by the winner over the board, and the coin to them.
+        check_conditions(error,conditions,cost or 0,self.get_winning_player().pk(),None,GAME_MOJO)
+
+        return WinSpend(coin_spend, conditions, cost, won_by)
+
+    def win_bundle(self,parent_list) -> SpendBundle:
+        """
+        The signed spend taking the win from the newest coin in parent_list.
+        The winner must be one of our wallets, signing as the game's identity.
+        """
+        prepared = self.prepare_win_spend(
             parent_list[-1]['coin'].coin,
-            puzzle=sing_adapted_puzzle,
-            amt=GAME_MOJO,
-            args=args,
-            debug=True
+            self.checked_lineage_proof(parent_list)
+        )
+        player = self.get_winning_player()
+        return sign_spend_for_conditions(
+            prepared.coin_spend,
+            prepared.conditions,
+            player.pk_to_sk,
+            player.agg_sig_me_additional_data()
         )
 
-        assert 'error' not in after_move_txn.result
-        if hasattr(after_move_txn.result, 'additions'):
-            bare_coin = after_move_txn.result['additions'][0]
-
-            current_coin = CoinWrapper(
-                bare_coin.parent_coin_info,
-                new_adapted_puzzle.get_tree_hash(),
-                GAME_MOJO,
-                new_adapted_puzzle
+    async def claim_win(self,parent_list):
+        """
+        Take the game's coin as its winner.  Refused before the player to move
+        has run out of moves.
+        """
+        bundle = self.win_bundle(parent_list)
+        after_win_txn = await self.get_winning_player().push_tx(bundle)
+        assert 'error' not in after_win_txn.result
+        log.info('claimed win of %s', tohex(self.launch_coin_name))
+        return after_win_txn
+
+    async def make_move(self,parent_list,fromX,fromY,toX,toY):
+        """
+        Given from and to coordinates, prepare arguments and spend the latest
+        coin of the game to perform the user's move.  If anything about this
+        is incorrect, the spend is refused with checkers.preflight's
+        SpendRejected before anything is signed or pushed.
+
+        The spend is run once, for the conditions it's signed for, and the
+        time each stage took and the spend's cost are left in move_breakdown.
+        """
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('do move based on %s', [p['coin'].name for p in parent_list])
+
+        player_to_move = self.get_next_mover()
+
+        log.debug('game coin is %s', self.current_coin_name)
+        lineage_proof = self.checked_lineage_proof(parent_list)
+
+        log.debug('board state curried into spend %s', self.board)
+        spent_coin = parent_list[-1]['coin'].coin
+        prepared = self.prepare_move_spend(spent_coin,lineage_proof,fromX,fromY,toX,toY)
+        seconds = dict(prepared.seconds)
+
+        start = time.perf_counter()
+        with timed('clvm', 'sign_for_conditions'):
+            spend_bundle = sign_spend_for_conditions(
+                prepared.coin_spend,
+                prepared.conditions,
+                player_to_move.pk_to_sk,
+                player_to_move.agg_sig_me_additional_data()
             )
+        seconds['sign'] = time.perf_counter() - start
 
-            return current_coin
-        else:
-            return True
+        if log.isEnabledFor(logging.DEBUG):
+            # Runs the spend again, so only when it'll be seen.
+            spend_bundle.debug()
+
+        log.debug('doing spend from %s', player_to_move.puzzle_hash)
+        start = time.perf_counter()
+        after_move_txn = await player_to_move.push_tx(spend_bundle)
+        seconds['push'] = time.perf_counter() - start
+        self.move_breakdown = dict(seconds, cost=prepared.cost)
+        log.info('move %s: %s', (fromX,fromY,toX,toY), self.move_breakdown)
+
+        assert 'error' not in after_move_txn.result
+
+        # The coin our move makes, for whatever prepares the reply to it.
+        self.pushed_coin = Coin(spent_coin.name(), prepared.next_puzzle_hash, GAME_MOJO)
+        self.pushed_board = boardFromSExp(prepared.next_board)
+
+        return True
+
+    def move_job(self,parent_list,fromX,fromY,toX,toY) -> 'MoveJob':
+        """
+        The move as a job for checkers.workers, signed by whoever is to move.
+        """
+        from checkers.workers import MoveJob
+
+        player_to_move = self.get_next_mover()
+        return MoveJob(
+            bytes(fromhex(self.launch_coin_name)),
+            bytes(self.black.pk()),
+            bytes(self.red.pk()),
+            bytes(self.black.puzzle_hash),
+            bytes(self.red.puzzle_hash),
+            [convert_to_int(x) for x in self.board],
+            (fromX, fromY, toX, toY),
+            bytes(parent_list[-1]['coin'].coin),
+            bytes(self.checked_lineage_proof(parent_list)),
+            bytes(player_to_move.pk_to_sk(player_to_move.pk())),
+            bytes(player_to_move.agg_sig_me_additional_data())
+        )
+
+    async def make_move_in_pool(self,pool,parent_list,fromX,fromY,toX,toY):
+        """
+        make_move, with the spend worked out and signed in a checkers.workers
+        MovePool so that the event loop isn't held up meanwhile.
+        """
+        job = self.move_job(parent_list,fromX,fromY,toX,toY)
+        return await self.push_prepared(parent_list, await pool.prepare(job))
+
+    async def push_prepared(self,parent_list,prepared: 'PreparedMove'):
+        """
+        Push a move checkers.workers prepared from parent_list.
+        """
+        player_to_move = self.get_next_mover()
+        after_move_txn = await player_to_move.push_tx(SpendBundle.from_bytes(prepared.spend_bundle))
+        assert 'error' not in after_move_txn.result
+
+        spent_coin = parent_list[-1]['coin'].coin
+        self.pushed_coin = Coin(spent_coin.name(), bytes32(prepared.next_puzzle_hash), GAME_MOJO)
+        self.pushed_board = prepared.next_board
+        return after_move_txn
 
     def isolate_state_from_solution(self,solution):
-        print(f'isolate state in {solution.as_python()}')
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('isolate state in %s', solution.as_python())
         try:
             kv_pairs = solution.rest().rest().first().rest().rest().first()
         except:
-            print(f'bailing take_new_coin on solution {solution}')
+            log.debug('bailing take_new_coin on solution %s', solution)
             return None, None
 
-        print(f'kv_pairs {kv_pairs.as_python()}')
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('kv_pairs %s', kv_pairs.as_python())
         if not kv_pairs.listp():
             return None, None
 
@@ -406,36 +635,150 @@ class CheckersMover:
 
         return launcher, board
 
-    def take_new_coin(self,coin,raw_solution):
+    def take_new_coin(self,coin,raw_solution,height=None):
         """
         Given a coin and solution from the blockchain, determine whether
         the coin refers to a game we're watching and if so use it as the
         current game state.
         """
-        solution = Program.to(sexp_from_stream(io.BytesIO(unhexlify(str(raw_solution))), to_sexp_f))
-        launcher, board = self.isolate_state_from_solution(solution)
-        want_launch_name = self.launch_coin_name
+        if type(raw_solution) == str:
+            blob = unhexlify(raw_solution)
+        else:
+            blob = bytes(raw_solution)
+
+        want_launch_name = fromhex(self.launch_coin_name)
+        launcher, board = inspect_solution(blob, want_launch_name)
 
-        print(f'launcher {tohex(launcher)} want {tohex(want_launch_name)}')
-        if board and launcher and tohex(launcher) == tohex(want_launch_name):
-            print(f'found board {board}')
+        log.debug('launcher %s want %s', launcher, want_launch_name)
+        if launcher and launcher == want_launch_name and board is None and move_from_solution(blob) is None:
+            # The win was taken; coin is the winner's.
+            log.info('game %s was won', tohex(want_launch_name))
+            self.current_coin_name = coin.name()
+            self.claimed = True
+            self.pending = None
+        elif board and launcher and launcher == want_launch_name:
+            log.info('found board %s', board)
             self.current_coin_name = coin.name()
             self.board = board
+            self.pending = None
+
+            move = move_from_solution(blob)
+            if move is not None:
+                self.seen_moves.append((coin.name(), int_from_bytes(move), [convert_to_int(x) for x in board], height))
+                if self.on_new_coin is not None:
+                    self.on_new_coin(coin)
+
+    def take_pending_spend(self,spent_coin_name: bytes,raw_solution: bytes,tx_id: bytes,created: Optional[bytes]) -> Optional[PendingMove]:
+        """
+        Given a spend of our current coin from the mempool, keep the move and
+        board it would make as pending if it's a move in our game.
+        """
+        if spent_coin_name != self.current_coin_name:
+            return None
 
-    async def absorb_state(self,height,network):
+        launcher, board = inspect_solution(raw_solution, fromhex(self.launch_coin_name))
+        move = move_from_solution(raw_solution)
+        if not board or move is None or launcher != fromhex(self.launch_coin_name):
+            return None
+
+        self.pending = PendingMove(
+            spent_coin_name, tx_id, int_from_bytes(move), [convert_to_int(x) for x in board], created
+        )
+        log.info('pending move %s in %s', self.pending.move, tohex(tx_id))
+        return self.pending
+
+    def take_seen_moves(self):
+        moves = self.seen_moves
+        self.seen_moves = []
+        return moves
+
+    async def absorb_state(self,height,network,others: List['CheckersMover'] = []):
+        """
+        Take any game state for us, and for the other movers given, from the
+        block at height and give the block's header hash.  The block is read
+        once however many games are followed.
+        """
         blockrec = await network.get_block_record_by_height(height)
         header_hash = blockrec.header_hash
 
         additions, _ = await network.get_additions_and_removals(header_hash)
 
+        # With many games, each spend goes to the one whose launcher it names.
+        movers = {fromhex(m.launch_coin_name): m for m in [self] + list(others) if m.launch_coin_name}
+
         for a in additions:
             if a.coin.amount >= 1000:
                 continue
 
             spend = await network.get_puzzle_and_solution(a.coin.parent_coin_info, height)
-            if spend:
-                print(f'coin: {a.coin.name()} spend {spend}')
-                self.take_new_coin(a.coin,spend.solution)
+            if not spend:
+                continue
 
-        self.known_height = height
+            log.debug('coin: %s spend %s', a.coin.name(), spend)
+            if not others:
+                self.take_new_coin(a.coin,spend.solution,height)
+                continue
 
+            launcher, _ = inspect_solution(bytes(spend.solution))
+            mover = movers.get(launcher)
+            if mover is not None:
+                mover.take_new_coin(a.coin,spend.solution,height)
+
+        for mover in [self] + list(others):
+            mover.known_height = height
+        return header_hash
+
+
+async def launch_games(funder,movers: List[CheckersMover],funding_coin) -> List[Tuple[bytes, Coin]]:
+    """
+    Launch a game for each mover from one funding coin in a single spend
+    bundle and give the (launcher name, eve coin) of each.  The movers must all
+    have funder playing black.
+
+    Launcher coins are named by their parent, puzzle hash and amount, so one
+    coin can't create more than one launcher of GAME_MOJO.  The funding coin
+    is split instead into a GAME_MOJO coin per game, each to a different one of
+    our puzzle hashes, and those are spent into the launchers in the same
+    bundle.
+    """
+    count = len(movers)
+    if funding_coin.amount < count * GAME_MOJO:
+        raise ValueError(f'coin of {funding_coin.amount} mojo cannot fund {count} games of {GAME_MOJO}')
+    log.info('launch %d games with coin %s', count, funding_coin.name())
+
+    await funder.select_identity_for_coin(funding_coin)
+    identities = await funder.fresh_identities(count)
+
+    funding_conditions = []
+    own_spends = []
+    launcher_spends = []
+
+    for mover, (pk, puzzle) in zip(movers, identities):
+        assert mover.black is funder
+        game_coin = Coin(funding_coin.name(), puzzle.get_tree_hash(), GAME_MOJO)
+        funding_conditions.append([ConditionOpcode.CREATE_COIN, game_coin.puzzle_hash, GAME_MOJO])
+
+        launch_conditions, launcher_spend = mover.launch_spends(game_coin)
+        own_spends.append(CoinSpend(game_coin, puzzle, Program.to([[], (1, launch_conditions), []])))
+        launcher_spends.append(launcher_spend)
+
+    remaining = funding_coin.amount - count * GAME_MOJO
+    if remaining > 0:
+        funding_conditions.append([ConditionOpcode.CREATE_COIN, funder.puzzle_hash, remaining])
+
+    funding_spend = CoinSpend(
+        funding_coin.as_coin(),
+        funder.puzzle,
+        Program.to([[], (1, funding_conditions), []])
+    )
+
+    # The launchers are spent without signatures.
+    signed = await funder.sign_spends([funding_spend] + own_spends)
+    bundle = SpendBundle.aggregate([signed, SpendBundle(launcher_spends, G2Element())])
+
+    pushed = await funder.push_tx(bundle)
+    if 'error' in pushed.result:
+        raise ValueError(f"bulk launch was rejected: {pushed.result['error']}")
+
+    log.info('launched %d games', count)
+    return [(mover.launch_coin_name, mover.current_coin) for mover in movers]
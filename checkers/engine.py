@@ -0,0 +1,235 @@
+import random
+from typing import List, Optional, Tuple
+
+# The rules of checkers as checkers.cl means them, in plain python, so that
+# games can be generated and checked without running the contract.
+#
+# A board is (next, king, red, black) as curried into the contract: next is 1
+# when black is to move and the rest are masks with bit 8x+y set for each
+# occupied square.  Black moves toward y = 7 and is kinged there, red moves
+# toward y = 0.  A move is one diagonal step, or a jump of two over an
+# opponent's piece which is removed, and always passes the turn: the contract
+# has no multiple jumps and doesn't make captures compulsory.  A player with no
+# move has lost.
+
+RED = 0
+BLACK = 1
+
+INITIAL_BOARD = (BLACK, 0, 0xa040a040a040a040, 0x205020502050205)
+
+DIRECTIONS = [(-1, 1), (-1, -1), (1, 1), (1, -1)]
+
+Board = Tuple[int, int, int, int]
+Move = Tuple[int, int, int, int]
+
+def maskFor(x,y):
+    return 1 << ((8 * x) + y)
+
+def move_number(fromX,fromY,toX,toY):
+    """
+    The number the contract takes for a move, as make_move_sexp gives it.
+    """
+    return fromX + (fromY << 8) + (toX << 16) + (toY << 24)
+
+def in_bounds(x,y):
+    return 0 <= x < 8 and 0 <= y < 8
+
+def checker_at(board: Board,x,y) -> Optional[Tuple[bool, int]]:
+    """
+    Give (is_king, color) of the piece at x, y or None if the square is empty.
+    """
+    _, king, red, black = board
+    mask = maskFor(x,y)
+    if red & mask:
+        return bool(king & mask), RED
+    if black & mask:
+        return bool(king & mask), BLACK
+    return None
+
+def forward(color,dy):
+    return dy > 0 if color == BLACK else dy < 0
+
+def king_row(color):
+    return 7 if color == BLACK else 0
+
+def remove_checker(board: Board,x,y) -> Board:
+    next_color, king, red, black = board
+    mask = maskFor(x,y)
+    return next_color, king & ~mask, red & ~mask, black & ~mask
+
+def add_checker(board: Board,x,y,is_king,color) -> Board:
+    next_color, king, red, black = board
+    mask = maskFor(x,y)
+    if is_king:
+        king |= mask
+    if color == BLACK:
+        black |= mask
+    else:
+        red |= mask
+    return next_color, king, red, black
+
+def apply_move(board: Board,fromX,fromY,toX,toY) -> Optional[Board]:
+    """
+    Give the board after a move or None if the move isn't allowed.
+    """
+    next_color = board[0]
+    if not (in_bounds(fromX,fromY) and in_bounds(toX,toY)):
+        return None
+
+    piece = checker_at(board,fromX,fromY)
+    if piece is None or piece[1] != next_color:
+        return None
+    is_king, color = piece
+
+    dx = toX - fromX
+    dy = toY - fromY
+    if abs(dx) != abs(dy) or abs(dx) not in (1, 2):
+        return None
+    if checker_at(board,toX,toY) is not None:
+        return None
+    if not is_king and not forward(color,dy):
+        return None
+
+    result = remove_checker(board,fromX,fromY)
+    if abs(dx) == 2:
+        overX = fromX + dx // 2
+        overY = fromY + dy // 2
+        jumped = checker_at(board,overX,overY)
+        if jumped is None or jumped[1] == color:
+            return None
+        result = remove_checker(result,overX,overY)
+
+    result = add_checker(result,toX,toY,is_king or toY == king_row(color),color)
+    return (1 - next_color,) + result[1:]
+
+def move_refusal(board: Board,fromX,fromY,toX,toY) -> Optional[str]:
+    """
+    Why apply_move refuses a move, or None if it doesn't.
+    """
+    next_color = board[0]
+    if not (in_bounds(fromX,fromY) and in_bounds(toX,toY)):
+        return 'off the board'
+
+    piece = checker_at(board,fromX,fromY)
+    if piece is None:
+        return f'no piece at {fromX},{fromY}'
+    if piece[1] != next_color:
+        return f'the piece at {fromX},{fromY} is the other player\'s'
+    is_king, color = piece
+
+    dx = toX - fromX
+    dy = toY - fromY
+    if abs(dx) != abs(dy) or abs(dx) not in (1, 2):
+        return 'not a diagonal step or jump'
+    if checker_at(board,toX,toY) is not None:
+        return f'{toX},{toY} is taken'
+    if not is_king and not forward(color,dy):
+        return 'only kings move backward'
+    if abs(dx) == 2:
+        jumped = checker_at(board,fromX + dx // 2,fromY + dy // 2)
+        if jumped is None or jumped[1] == color:
+            return 'nothing to jump'
+    return None
+
+def pieces(board: Board,color) -> List[Tuple[int, int, bool]]:
+    _, king, red, black = board
+    mask = black if color == BLACK else red
+    result = []
+    for i in range(64):
+        if mask & (1 << i):
+            result.append((i // 8, i % 8, bool(king & (1 << i))))
+    return result
+
+def legal_moves(board: Board) -> List[Move]:
+    color = board[0]
+    result = []
+    for x, y, is_king in pieces(board,color):
+        for dx, dy in DIRECTIONS:
+            if not is_king and not forward(color,dy):
+                continue
+
+            for distance in (1, 2):
+                toX = x + distance * dx
+                toY = y + distance * dy
+                if apply_move(board,x,y,toX,toY) is not None:
+                    result.append((x, y, toX, toY))
+
+    return result
+
+def has_legal_move(board: Board) -> bool:
+    """
+    Whether the player to move has any move, stopping at the first found.
+    """
+    color = board[0]
+    for x, y, is_king in pieces(board,color):
+        for dx, dy in DIRECTIONS:
+            if not is_king and not forward(color,dy):
+                continue
+
+            for distance in (1, 2):
+                if apply_move(board,x,y,x + distance * dx,y + distance * dy) is not None:
+                    return True
+
+    return False
+
+def winner(board: Board) -> Optional[int]:
+    """
+    The color that has won, or None if the player to move can still move.
+    """
+    if has_legal_move(board):
+        return None
+    return 1 - board[0]
+
+def random_game(rng: random.Random,max_plies: int) -> List[Move]:
+    """
+    A game of random legal moves, ending when someone has won or after
+    max_plies moves.
+    """
+    board = INITIAL_BOARD
+    result = []
+    for _ in range(max_plies):
+        moves = legal_moves(board)
+        if not moves:
+            break
+        move = rng.choice(moves)
+        result.append(move)
+        board = apply_move(board,*move)
+
+    return result
+
+# A king is worth more than a man since it can move both ways.
+MAN_VALUE = 2
+KING_VALUE = 3
+WIN_SCORE = 1000
+DEFAULT_SEARCH_DEPTH = 2
+
+def material(board: Board,color) -> int:
+    """
+    How far ahead in pieces color is.
+    """
+    score = 0
+    for c in (RED, BLACK):
+        value = sum(KING_VALUE if is_king else MAN_VALUE for _, _, is_king in pieces(board,c))
+        score += value if c == color else -value
+    return score
+
+def search_score(board: Board,depth) -> int:
+    """
+    The score of board for the player to move, looking depth moves ahead.
+    """
+    moves = legal_moves(board)
+    if not moves:
+        return -WIN_SCORE
+    if depth == 0:
+        return material(board,board[0])
+    return max(-search_score(apply_move(board,*m),depth - 1) for m in moves)
+
+def best_move(board: Board,depth=DEFAULT_SEARCH_DEPTH) -> Optional[Move]:
+    """
+    The move that leaves the player to move best off in material after depth
+    moves, the first of equals in legal_moves order, or None if there's none.
+    """
+    moves = legal_moves(board)
+    if not moves:
+        return None
+    return max(moves, key=lambda m: -search_score(apply_move(board,*m),depth - 1))
@@ -0,0 +1,349 @@
+# Play random games through checkers.cl and check every step against the
+# rules in checkers.engine.
+#
+#   python -m checkers.fuzz [--games N] [--seed S] [--workers W] [--simulator N]
+#
+# Each game is seeded, so any divergence it reports can be replayed with
+# --games 1 --seed <seed>.  Games are played by running the contract directly
+# on the board; --simulator also plays some with real spends on a cdv network
+# through CheckersMover.make_move.
+import argparse
+import io
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+
+from clvm import SExp, to_sexp_f
+from clvm.EvalError import EvalError
+from clvm.casts import int_from_bytes
+from clvm.operators import OPERATOR_LOOKUP
+from clvm.run_program import run_program
+from clvm.serialize import sexp_from_stream
+
+from checkers.engine import INITIAL_BOARD, apply_move, checker_at, legal_moves, move_number, pieces
+
+CONTRACT_HEX = os.path.join(os.path.dirname(__file__), 'code', 'checkers.cl.hex')
+
+DEFAULT_MAX_PLIES = 200
+INFINITE_COST = 0x7FFFFFFFFFFFFFFF
+DEFAULT_PROBE_RATE = 0.25
+
+# Stand-ins for the curried identities.  The contract only hashes them.
+BASE_INNER_PUZZLE_HASH = bytes([1] * 32)
+LAUNCHER = bytes([2] * 32)
+P1_PK = bytes([3] * 48)
+P2_PK = bytes([4] * 48)
+P1_PH = bytes([5] * 32)
+P2_PH = bytes([6] * 32)
+AMT = 1
+
+# clvm_rs, which chia runs puzzles with, raises ValueError where clvm raises
+# EvalError.
+REFUSED = (EvalError, ValueError)
+
+class Contract:
+    """
+    checkers.cl run on a board without currying, which is the same program as
+    the curried puzzle given all its arguments at once.
+
+    It's run the way a full node runs it when chia is installed, and with the
+    much slower python clvm otherwise.
+    """
+    def __init__(self, path: str = CONTRACT_HEX):
+        with open(path) as f:
+            blob = bytes.fromhex(f.read().strip())
+        self.program = sexp_from_stream(io.BytesIO(blob), to_sexp_f)
+        self.curried = [BASE_INNER_PUZZLE_HASH, LAUNCHER, P1_PK, P2_PK, P1_PH, P2_PH, AMT]
+
+        try:
+            from chia.types.blockchain_format.program import SerializedProgram
+            self.serialized = SerializedProgram.from_bytes(blob)
+        except ImportError:
+            self.serialized = None
+
+    def run(self, board, d1, m, extra):
+        args = SExp.to(self.curried + [list(board), [], d1, m, extra])
+        if self.serialized is not None:
+            return self.serialized.run_with_cost(INFINITE_COST, args)
+        return run_program(self.program, args, OPERATOR_LOOKUP)
+
+    def simulate(self, board, move):
+        """
+        The contract's board after a move.  Raises one of REFUSED if it refuses.
+        """
+        cost, result = self.run(board, "simulate", [move_number(*move)], [])
+        return tuple(int_from_bytes(a.as_atom()) for a in result.rest().as_iter())
+
+    def spend(self, board, move, claimed_board) -> int:
+        """
+        Run a move as it's spent on chain, restating the resulting board in
+        the solution, and give its cost.
+        """
+        cost, result = self.run(board, 0, [move_number(*move)], [("board", list(claimed_board))])
+        return cost
+
+    def take_win(self, board) -> int:
+        cost, result = self.run(board, 0, [], [])
+        return cost
+
+contract_: Optional[Contract] = None
+
+def contract() -> Contract:
+    """
+    The contract, loaded once in each process.
+    """
+    global contract_
+    if contract_ is None:
+        contract_ = Contract()
+    return contract_
+
+def move_kind(board, move) -> str:
+    is_king, _ = checker_at(board, move[0], move[1])
+    kind = 'jump' if abs(move[2] - move[0]) == 2 else 'step'
+    return f'king {kind}' if is_king else kind
+
+def percentile(ordered: List[int], fraction: float) -> int:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class GameReport:
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.plies = 0
+        self.winner = None
+        self.costs: Dict[str, List[int]] = {}
+        self.divergences = []
+
+    def cost(self, kind: str, cost: int):
+        self.costs.setdefault(kind, []).append(cost)
+
+    def diverge(self, kind: str, board, detail: str):
+        self.divergences.append((kind, f'seed {self.seed} ply {self.plies} board {tuple(hex(x) for x in board)}: {detail}'))
+
+def check_take_win(c: Contract, board, legal, report: GameReport):
+    try:
+        cost = c.take_win(board)
+    except REFUSED:
+        if not legal:
+            report.diverge('win refused', board, 'no moves remain but takeWin failed')
+        return
+
+    if legal:
+        report.diverge('win claimed early', board, f'takeWin accepted with {len(legal)} moves available')
+    else:
+        report.cost('take win', cost)
+
+def illegal_candidate(rng: random.Random, board, legal):
+    """
+    A move the rules don't allow, made to look like one that might slip by:
+    from a piece of the right color when there is one, along or near a
+    diagonal, sometimes too far or off the board.  None if the one chosen
+    turned out to be legal.
+    """
+    own = pieces(board, board[0])
+    if own and rng.random() < 0.8:
+        fromX, fromY, _ = rng.choice(own)
+    else:
+        fromX, fromY = rng.randrange(8), rng.randrange(8)
+
+    distance = rng.choice([1, 2, 2, 3, 4])
+    dx = rng.choice([-1, 1]) * distance
+    dy = rng.choice([-1, 1]) * distance
+    if rng.random() < 0.2:
+        dy = rng.randrange(-2, 3)
+
+    move = (fromX, fromY, fromX + dx, fromY + dy)
+    # Moves are made of bytes, so coordinates can't be negative.
+    if min(move) < 0 or move in legal:
+        return None
+    return move
+
+def probe_illegal(c: Contract, rng: random.Random, board, legal, report: GameReport):
+    move = illegal_candidate(rng, board, legal)
+    if move is None:
+        return
+
+    try:
+        result = c.simulate(board, move)
+    except REFUSED:
+        report.cost('refused', 0)
+        return
+
+    report.diverge('accepted illegal move', board, f'move {move} gave {tuple(hex(x) for x in result)}')
+
+def play_game(seed: int, max_plies: int = DEFAULT_MAX_PLIES, probe_rate: float = DEFAULT_PROBE_RATE) -> GameReport:
+    """
+    Play one random game through the contract.  Every move is a legal one,
+    spent with the board the engine expects; now and then an illegal move and
+    an early win claim are tried too, which the contract should refuse.
+    """
+    c = contract()
+    rng = random.Random(seed)
+    board = INITIAL_BOARD
+    report = GameReport(seed)
+
+    while report.plies < max_plies:
+        legal = legal_moves(board)
+        if not legal or rng.random() < probe_rate:
+            check_take_win(c, board, legal, report)
+        if not legal:
+            report.winner = 1 - board[0]
+            break
+
+        if rng.random() < probe_rate:
+            probe_illegal(c, rng, board, legal, report)
+
+        move = rng.choice(legal)
+        expected = apply_move(board, *move)
+        try:
+            cost = c.spend(board, move, expected)
+        except REFUSED:
+            try:
+                got = c.simulate(board, move)
+                report.diverge('different board', board, f'move {move} gave {tuple(hex(x) for x in got)}')
+            except REFUSED as e:
+                report.diverge('refused legal move', board, f'move {move}: {e.args[0] if e.args else e}')
+            break
+
+        report.cost(move_kind(board, move), cost)
+        board = expected
+        report.plies += 1
+
+    return report
+
+async def play_simulated_game(seed: int, max_plies: int) -> GameReport:
+    """
+    Play a random game with real spends through CheckersMover.make_move on a
+    fresh simulator, checking the board it syncs against the engine.
+    """
+    from cdv.test import Network
+    from cdv.util.load_clvm import load_clvm
+
+    from checkers.driver import CheckersMover, GAME_MOJO
+    from support.simulation import game_coins, make_player
+
+    inner_puzzle_code = load_clvm("checkers.cl", "checkers.code", search_paths=["checkers/code"])
+    rng = random.Random(seed)
+    report = GameReport(seed)
+
+    network = await Network.create()
+    try:
+        alice = make_player(network, "alice")
+        bob = make_player(network, "bob")
+        await network.farm_block(farmer=alice)
+
+        mover = CheckersMover(inner_puzzle_code, alice, bob)
+        launcher, _ = await mover.launch_game(await alice.choose_coin(GAME_MOJO))
+
+        board = INITIAL_BOARD
+        while report.plies < max_plies:
+            legal = legal_moves(board)
+            if not legal:
+                report.winner = 1 - board[0]
+                break
+
+            move = rng.choice(legal)
+            expected = apply_move(board, *move)
+            try:
+                await mover.make_move(await game_coins(network, launcher), *move)
+            except Exception as e:
+                report.diverge('refused legal move', board, f'move {move} on the simulator: {e}')
+                break
+
+            await mover.absorb_state(network.sim.get_height(), network.sim_client)
+            synced = mover.get_board()
+            got = (int(synced['blackmove']), synced['king'], synced['red'], synced['black'])
+            if got != expected:
+                report.diverge('different board', board, f'move {move} synced as {tuple(hex(x) for x in got)}')
+                break
+
+            board = expected
+            report.plies += 1
+    finally:
+        await network.close()
+
+    return report
+
+def summarize(reports: List[GameReport], elapsed: float):
+    games = len(reports)
+    plies = sum(r.plies for r in reports)
+    print(f'{games} games, {plies} moves in {elapsed:.2f}s: {games / elapsed:.1f} games/s, {plies / elapsed:.0f} moves/s')
+
+    results = {0: 0, 1: 0, None: 0}
+    for r in reports:
+        results[r.winner] += 1
+    print(f'results: black won {results[1]}, red won {results[0]}, unfinished {results[None]}')
+
+    costs: Dict[str, List[int]] = {}
+    for r in reports:
+        for kind, values in r.costs.items():
+            costs.setdefault(kind, []).extend(values)
+
+    refused = len(costs.pop('refused', []))
+    print(f'illegal moves refused: {refused}')
+
+    if costs:
+        print('clvm cost per move:')
+        print(f'  {"kind":12} {"count":>8} {"min":>8} {"p50":>8} {"p90":>8} {"p99":>8} {"max":>8}')
+        for kind in sorted(costs):
+            ordered = sorted(costs[kind])
+            print(
+                f'  {kind:12} {len(ordered):8} {ordered[0]:8} {percentile(ordered, 0.5):8} '
+                f'{percentile(ordered, 0.9):8} {percentile(ordered, 0.99):8} {ordered[-1]:8}'
+            )
+
+    divergences: Dict[str, List[str]] = {}
+    for r in reports:
+        for kind, detail in r.divergences:
+            divergences.setdefault(kind, []).append(detail)
+
+    if not divergences:
+        print('no divergences from the engine')
+        return
+
+    print('divergences from the engine:')
+    for kind in sorted(divergences):
+        details = divergences[kind]
+        print(f'  {kind}: {len(details)}, first {details[0]}')
+
+def play_games(seeds: List[int], workers: int, max_plies: int, probe_rate: float) -> List[GameReport]:
+    play = partial(play_game, max_plies=max_plies, probe_rate=probe_rate)
+    if workers <= 1:
+        return [play(seed) for seed in seeds]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(play, seeds, chunksize=max(1, len(seeds) // (workers * 8))))
+
+def main():
+    parser = argparse.ArgumentParser(description='Play random games through checkers.cl and check them against the engine.')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-plies', type=int, default=DEFAULT_MAX_PLIES)
+    parser.add_argument('--probe-rate', type=float, default=DEFAULT_PROBE_RATE,
+                        help='chance per move of also trying an illegal move and an early win claim')
+    parser.add_argument('--simulator', type=int, default=0, metavar='N',
+                        help='also play N games with real spends on a cdv simulator')
+    args = parser.parse_args()
+
+    seeds = list(range(args.seed, args.seed + args.games))
+    start = time.perf_counter()
+    reports = play_games(seeds, args.workers, args.max_plies, args.probe_rate)
+    summarize(reports, time.perf_counter() - start)
+
+    if args.simulator:
+        import asyncio
+
+        async def simulate():
+            return [await play_simulated_game(seed, args.max_plies) for seed in seeds[:args.simulator]]
+
+        print()
+        print('on the simulator:')
+        start = time.perf_counter()
+        reports = asyncio.run(simulate())
+        summarize(reports, time.perf_counter() - start)
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,61 @@
 import json
+import logging
 import sqlite3
 import binascii
 
-from typing import Any
-from wallet import tohex
+from typing import Any, List, Optional, Tuple
+from checkers.book import book_stats, move_from_number, write_book
+from checkers.engine import INITIAL_BOARD, apply_move
+from checkers.history import HistoryRow, read_history, write_history
+from wallet import tohex, fromhex
+
+log = logging.getLogger(__name__)
+
+# How many of the most recent blocks we synced are checked against the node
+# each time we sync, and how far back a reorg can be undone.
+REORG_WINDOW = 32
+
+# Every move seen, so a game's history doesn't need the chain.  Masks are hex
+# since they don't fit sqlite's signed integers.  coin is the one the move
+# made.  ply is null for the moves of a game first seen after its first move,
+# which can't be placed in its history.
+MOVES_TABLE = (
+    "create table if not exists moves ("
+    "net text, launcher text, ply integer, move integer, next integer, "
+    "king text, red text, black text, height integer, coin text, primary key (net, coin))"
+)
+MOVES_INDEX = "create index if not exists moves_by_net_launcher on moves (net, launcher, ply)"
+
+def block_height_and_hash(record) -> Tuple[int, str]:
+    """
+    Height and hex header hash of a block record from the node, which is a
+    dict over RPC and an object from the simulator.
+    """
+    if isinstance(record, dict):
+        header_hash = record['header_hash']
+        if header_hash.startswith('0x'):
+            header_hash = header_hash[2:]
+        return int(record['height']), header_hash
+    return int(record.height), tohex(record.header_hash)
+
+async def find_fork_in(client,synced: List[Tuple[int, str]]) -> Optional[int]:
+    """
+    Given the (height, hex header hash) of blocks synced, in height order,
+    the height of the newest still in the node's chain if any above it
+    aren't, otherwise None.  If none match, all of them are given up.
+    """
+    if not synced:
+        return None
+
+    records = await client.get_block_records(synced[0][0], synced[-1][0] + 1)
+    chain = dict(block_height_and_hash(r) for r in records)
+
+    for h, header_hash in reversed(synced):
+        if chain.get(h) == header_hash:
+            return None if h == synced[-1][0] else h
+
+    log.warning('reorg deeper than the %d blocks kept below %d', len(synced), synced[-1][0])
+    return synced[0][0] - 1
 
 # An object that keeps track of the game state we can see in the blockchain.
 # Using the actual arguments (third argument to standard spend), we put in our
@@ -21,16 +73,59 @@ class GameRecords:
         self.netname = netname
         self.client = client
         self.mover = mover
+        # Every game synced, mover first.  Blocks are read once for all.
+        self.movers = [mover] if mover is not None else []
 
         self.db = sqlite3.connect('checkers.db')
         self.run_db("create table if not exists height (net text primary key, block integer)")
         self.run_db("create table if not exists checkers (launcher text, board text, coin text)")
         self.run_db("create table if not exists self (puzzle_hash)")
+        self.migrate_moves()
+        self.run_db(MOVES_TABLE)
+        self.run_db(MOVES_INDEX)
+        # The header hash of each recent block we synced, to notice reorgs, and
+        # what each synced block changed in the checkers table so it can be
+        # undone.  coin and board are the game's before the change, null if we
+        # didn't know the game yet.
+        self.run_db("create table if not exists blocks (net text, height integer, header_hash text, primary key (net, height))")
+        self.run_db(
+            "create table if not exists journal ("
+            "id integer primary key autoincrement, net text, height integer, launcher text, coin text, board text)"
+        )
         self.db.commit()
 
     def close(self):
         self.db.close()
 
+    def migrate_moves(self):
+        """
+        Add the net column to a moves table made before it had one, taking
+        the moves in it to be this network's.
+        """
+        columns = [row[1] for row in self.db.execute('pragma table_info(moves)').fetchall()]
+        if not columns or 'net' in columns:
+            return
+
+        cursor = self.db.cursor()
+        cursor.execute('alter table moves rename to moves_before_net')
+        cursor.execute(MOVES_TABLE)
+        cursor.execute(
+            'insert or ignore into moves (net, launcher, ply, move, next, king, red, black, height, coin) '
+            'select ?, launcher, ply, move, next, king, red, black, height, coin from moves_before_net',
+            (self.netname,)
+        )
+        cursor.execute('drop table moves_before_net')
+        cursor.close()
+        self.db.commit()
+
+    def add_mover(self,mover):
+        """
+        Sync another game along with the ones we have.
+        """
+        if self.mover is None:
+            self.mover = mover
+        self.movers.append(mover)
+
     def get_coin_for_launcher(self,launcher):
         """
         Find a coin and board state corresponding to the game launched from the
@@ -43,13 +138,12 @@ class GameRecords:
         if type(launcher) == type(b''):
             launcher = tohex(launcher)
 
-        print(f'find launcher {launcher}')
+        log.debug('find launcher %s', launcher)
         rows = cursor.execute('select coin, board from checkers where cast(launcher as text) = ? limit 1', (launcher,))
         fetched = rows.fetchall()
-        print(f'fetched {fetched}')
 
         for r in fetched:
-            print(f'found {r}')
+            log.debug('found %s', r)
             result = tohex(r[0]), json.loads(r[1])
 
         cursor.close()
@@ -63,6 +157,135 @@ class GameRecords:
             (tohex(launcher), tohex(coin), json.dumps(board))
         )
 
+    def remember_coins(self,games: List[Tuple[bytes, bytes, Any]]):
+        """
+        Remember (launcher, coin, board) for many games in one transaction.
+        """
+        cursor = self.db.cursor()
+        cursor.executemany(
+            'delete from checkers where cast(launcher as text) = ?',
+            [(tohex(launcher),) for launcher, _, _ in games]
+        )
+        cursor.executemany(
+            'insert into checkers (launcher, coin, board) values (?,?,?)',
+            [(tohex(launcher), tohex(coin), json.dumps(board)) for launcher, coin, board in games]
+        )
+        cursor.close()
+        self.db.commit()
+
+    def record_moves(self,launcher: bytes,seen: List):
+        """
+        Keep moves given by CheckersMover.take_seen_moves.  A move's ply counts
+        the moves of its game we'd already kept, if we have them from the first.
+        """
+        if not seen:
+            return
+
+        cursor = self.db.cursor()
+        self.insert_moves(cursor, launcher, seen)
+        cursor.close()
+        self.db.commit()
+
+    def next_ply(self,cursor,launcher: bytes,move: int,board) -> Optional[int]:
+        """
+        The ply of a move leaving board that we're about to keep, or None if
+        the game's earlier moves are missing.
+        """
+        kept, placed = cursor.execute(
+            'select count(*), count(ply) from moves where net = ? and launcher = ?', (self.netname, tohex(launcher))
+        ).fetchall()[0]
+        if kept:
+            return kept if placed == kept else None
+
+        # Men only move forward, so no later move leaves a board the first
+        # move can.
+        first = apply_move(INITIAL_BOARD, *move_from_number(move))
+        after = (1 if board[0] else 0, board[1], board[2], board[3])
+        return 0 if first == after else None
+
+    def insert_moves(self,cursor,launcher: bytes,seen: List):
+        for coin, move, board, height in seen:
+            cursor.execute(
+                'insert or ignore into moves (net, launcher, ply, move, next, king, red, black, height, coin) '
+                'values (?,?,?,?,?,?,?,?,?,?)',
+                (self.netname, tohex(launcher), self.next_ply(cursor, launcher, move, board), move, 1 if board[0] else 0,
+                 '%x' % board[1], '%x' % board[2], '%x' % board[3], height, tohex(coin))
+            )
+
+    def history_rows(self) -> List[HistoryRow]:
+        cursor = self.db.cursor()
+        rows = cursor.execute(
+            'select launcher, ply, move, next, king, red, black, height, coin from moves '
+            'where net = ? and ply is not null order by launcher, ply',
+            (self.netname,)
+        ).fetchall()
+        cursor.close()
+
+        return [
+            HistoryRow(
+                fromhex(launcher), ply, move, next_color,
+                int(king, 16), int(red, 16), int(black, 16), height or 0, fromhex(coin)
+            )
+            for launcher, ply, move, next_color, king, red, black, height, coin in rows
+        ]
+
+    def export_history(self,path: str) -> int:
+        rows = self.history_rows()
+        write_history(path, rows)
+        return len(rows)
+
+    def build_book(self,path: str,histories: List[str] = []) -> int:
+        """
+        Write an opening book from every game we've seen and those in the
+        given history files, and give the number of (position, move) entries.
+        """
+        rows = self.history_rows()
+        for history in histories:
+            rows.extend(read_history(history))
+
+        stats = book_stats(rows)
+        write_book(path, stats)
+        return len(stats)
+
+    def import_history(self,path: str) -> int:
+        """
+        Seed the database from an exported history: every move, the newest
+        coin and board of each game and, if we haven't synced yet, the height
+        to sync from.  Moves we already have are left alone.
+        """
+        rows = read_history(path)
+
+        cursor = self.db.cursor()
+        # A move we couldn't place when we saw it gets its ply from the history.
+        cursor.executemany(
+            'insert into moves (net, launcher, ply, move, next, king, red, black, height, coin) '
+            'values (?,?,?,?,?,?,?,?,?,?) on conflict (net, coin) do update set ply = excluded.ply where ply is null',
+            [
+                (self.netname, tohex(r.launcher), r.ply, r.move, r.next, '%x' % r.king, '%x' % r.red, '%x' % r.black, r.height, tohex(r.coin))
+                for r in rows
+            ]
+        )
+        cursor.close()
+        self.db.commit()
+
+        newest = {}
+        for r in rows:
+            if r.launcher not in newest or r.ply > newest[r.launcher].ply:
+                newest[r.launcher] = r
+
+        self.remember_coins([
+            (r.launcher, r.coin, {'blackmove': r.next != 0, 'king': r.king, 'red': r.red, 'black': r.black})
+            for r in newest.values()
+        ])
+
+        cursor = self.db.cursor()
+        synced = cursor.execute('select 1 from height where net = ?', (self.netname,)).fetchall()
+        cursor.close()
+        if rows and not synced:
+            self.set_current_block(max(r.height for r in rows))
+
+        return len(rows)
+
     async def get_current_height_from_node(self):
         """
         Use RPC to get the current blockchain height.
@@ -98,6 +321,126 @@ class GameRecords:
         cursor.close()
         self.db.commit()
 
+    def get_block_hashes(self,low: int,high: int) -> List[Tuple[int, str]]:
+        """
+        The (height, header hash) of the blocks we synced from low to high.
+        """
+        cursor = self.db.cursor()
+        rows = cursor.execute(
+            'select height, header_hash from blocks where net = ? and height >= ? and height <= ? order by height',
+            (self.netname, low, high)
+        ).fetchall()
+        cursor.close()
+        return rows
+
+    def commit_block(self,height: int,header_hash: str,seen: List):
+        """
+        Keep what syncing the block at height told us about our games in one
+        transaction: each game's coin and board, journaled so the block can be
+        rolled back, the moves seen, the block's hash and our height.  seen
+        gives the moves of each mover, in the order of movers.
+        """
+        cursor = self.db.cursor()
+
+        for mover, moves in zip(self.movers, seen):
+            self.journal_game(cursor, height, mover)
+            if mover.launch_coin_name:
+                self.insert_moves(cursor, mover.launch_coin_name, moves)
+
+        cursor.execute(
+            'insert or replace into blocks (net, height, header_hash) values (?,?,?)',
+            (self.netname, height, header_hash)
+        )
+        cursor.execute('insert or replace into height (net, block) values (?,?)', (self.netname, height))
+
+        # Nothing older than the window is ever rolled back.
+        cursor.execute('delete from blocks where net = ? and height <= ?', (self.netname, height - REORG_WINDOW))
+        cursor.execute('delete from journal where net = ? and height <= ?', (self.netname, height - REORG_WINDOW))
+
+        cursor.close()
+        self.db.commit()
+
+    def journal_game(self,cursor,height: int,mover):
+        launcher = mover.launch_coin_name
+        if not launcher or mover.current_coin_name is None:
+            return
+
+        coin = tohex(mover.current_coin_name)
+        rows = cursor.execute(
+            'select coin, board from checkers where cast(launcher as text) = ?', (tohex(launcher),)
+        ).fetchall()
+        before = rows[0] if rows else (None, None)
+
+        if before[0] != coin:
+            cursor.execute(
+                'insert into journal (net, height, launcher, coin, board) values (?,?,?,?,?)',
+                (self.netname, height, tohex(launcher), before[0], before[1])
+            )
+            cursor.execute('delete from checkers where cast(launcher as text) = ?', (tohex(launcher),))
+            cursor.execute(
+                'insert into checkers (launcher, coin, board) values (?,?,?)',
+                (tohex(launcher), coin, json.dumps(mover.get_board()))
+            )
+
+    def rollback_to(self,height: int) -> int:
+        """
+        Undo everything synced from blocks above height, newest first, and give
+        the number of game changes undone.
+        """
+        cursor = self.db.cursor()
+        undo = cursor.execute(
+            'select launcher, coin, board from journal where net = ? and height > ? order by id desc',
+            (self.netname, height)
+        ).fetchall()
+
+        for launcher, coin, board in undo:
+            cursor.execute('delete from checkers where cast(launcher as text) = ?', (launcher,))
+            if coin is not None:
+                cursor.execute('insert into checkers (launcher, coin, board) values (?,?,?)', (launcher, coin, board))
+
+        cursor.execute('delete from journal where net = ? and height > ?', (self.netname, height))
+        cursor.execute('delete from blocks where net = ? and height > ?', (self.netname, height))
+        cursor.execute('delete from moves where net = ? and height > ?', (self.netname, height))
+        cursor.execute('insert or replace into height (net, block) values (?,?)', (self.netname, height))
+
+        cursor.close()
+        self.db.commit()
+
+        return len(undo)
+
+    async def find_fork(self,height: int):
+        """
+        Compare the hashes of the blocks we synced up to height with the node's.
+        Give the height of the newest one that's still in the chain if any
+        above it aren't, otherwise None.  If none in the window match, the
+        whole window is given up.
+        """
+        return await find_fork_in(self.client, self.get_block_hashes(height - REORG_WINDOW + 1, height))
+
+    async def roll_back_reorg(self,height: int):
+        """
+        If blocks we synced up to height were orphaned, roll back to where the
+        chain forked and give that height so syncing can resume from it.
+        """
+        fork = await self.find_fork(height)
+        if fork is None:
+            return None
+
+        undone = self.rollback_to(fork)
+        log.warning('reorg: rolled back from block %d to %d, undoing %d game changes', height, fork, undone)
+
+        # The movers have the orphaned state, so take ours again.
+        for mover in self.movers:
+            mover.take_seen_moves()
+            if mover.launch_coin_name:
+                found = self.get_coin_for_launcher(mover.launch_coin_name)
+                if found is not None:
+                    coin, board = found
+                    mover.set_current_coin_name(coin)
+                    mover.set_board(board)
+
+        return fork
+
     def set_self_hash(self,puzzle_hash):
         """
         We choose an identity to use when playing checkers based on derived keys in
@@ -136,23 +479,28 @@ class GameRecords:
         Singletons need an additional entry to tell what the
         parent of the coin being spent is, so we give it here.
         """
-        cursor = self.db.cursor()
-
-        result = None
-        if self.mover.launch_coin_name:
-            hex_coin_name = tohex(self.mover.launch_coin_name)
-            rows = cursor.execute("select coin from checkers where cast(launcher as text) = ?", (hex_coin_name,))
+        if not self.movers:
+            return
 
-            for r in rows:
-                result = r[0]
+        for mover in self.movers:
+            if not mover.launch_coin_name:
+                continue
 
-        cursor.close()
+            cursor = self.db.cursor()
+            rows = cursor.execute(
+                "select coin from checkers where cast(launcher as text) = ?", (tohex(mover.launch_coin_name),)
+            ).fetchall()
+            cursor.close()
 
-        if result is not None:
-            print(f'result from db {result}')
-            self.mover.set_current_coin_name(binascii.unhexlify(result))
+            if rows:
+                log.debug('result from db %s', rows[-1][0])
+                mover.set_current_coin_name(binascii.unhexlify(rows[-1][0]))
 
         current_block = await self.retrieve_current_block()
+        fork = await self.roll_back_reorg(current_block)
+        if fork is not None:
+            current_block = fork
+
         new_height = await self.get_current_height_from_node()
         if new_height - blocks_ago < current_block:
             current_block = max(new_height - blocks_ago, 1)
@@ -165,9 +513,21 @@ class GameRecords:
             if new_height - current_block > 1:
                 new_height = current_block + 1
 
-            print(f'absorb state until block {new_height}')
-            await self.mover.absorb_state(new_height, self.client)
-            self.set_current_block(new_height)
-            current_block = new_height
+            log.info('absorb state until block %d', new_height)
+            header_hash = tohex(await self.mover.absorb_state(new_height, self.client, self.movers[1:]))
+
+            # A block we synced before that's different now means the chain
+            # reorganized while we were behind.
+            synced = self.get_block_hashes(new_height, new_height)
+            fork = None
+            if synced and synced[0][1] != header_hash:
+                fork = await self.roll_back_reorg(new_height)
+
+            if fork is None:
+                self.commit_block(new_height, header_hash, [m.take_seen_moves() for m in self.movers])
+                current_block = new_height
+            else:
+                current_block = fork
+
             blockchain_state = await self.client.get_blockchain_state()
             new_height = blockchain_state['peak'].height
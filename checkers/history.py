@@ -0,0 +1,119 @@
+import struct
+import zlib
+from typing import List, NamedTuple
+
+# Game histories in a compact file: a header, then one zlib compressed block
+# per column so that similar values sit together.  Launchers are stored once
+# and referred to by index.
+#
+#   magic version rows
+#   launchers  32 bytes each
+#   launcher   uint32 index into launchers
+#   ply        uint32
+#   move       uint32, as make_move_sexp gives it
+#   next       uint8, 1 if black is to move after the move
+#   king, red, black   uint64 masks
+#   height     uint32
+#   coin       32 bytes, the game coin the move created
+#
+# Each block is its compressed length as a uint32 followed by the data.  All
+# integers are little endian.
+
+MAGIC = b'CKHIST'
+VERSION = 1
+HEADER = struct.Struct('<6sBI')
+BLOCK_LENGTH = struct.Struct('<I')
+
+MASK_LIMIT = 1 << 64
+
+class HistoryRow(NamedTuple):
+    launcher: bytes
+    ply: int
+    move: int
+    next: int
+    king: int
+    red: int
+    black: int
+    height: int
+    coin: bytes
+
+def pack_block(data: bytes) -> bytes:
+    compressed = zlib.compress(data, 9)
+    return BLOCK_LENGTH.pack(len(compressed)) + compressed
+
+def write_history(path: str, rows: List[HistoryRow]):
+    launchers = {}
+    for r in rows:
+        launchers.setdefault(r.launcher, len(launchers))
+
+    for r in rows:
+        if any(m < 0 or m >= MASK_LIMIT for m in (r.king, r.red, r.black)):
+            raise ValueError(f'board of {r.coin.hex()} has squares off the board')
+
+    n = len(rows)
+    blocks = [
+        b''.join(launchers),
+        struct.pack(f'<{n}I', *(launchers[r.launcher] for r in rows)),
+        struct.pack(f'<{n}I', *(r.ply for r in rows)),
+        struct.pack(f'<{n}I', *(r.move for r in rows)),
+        struct.pack(f'<{n}B', *(r.next for r in rows)),
+        struct.pack(f'<{n}Q', *(r.king for r in rows)),
+        struct.pack(f'<{n}Q', *(r.red for r in rows)),
+        struct.pack(f'<{n}Q', *(r.black for r in rows)),
+        struct.pack(f'<{n}I', *(r.height for r in rows)),
+        b''.join(r.coin for r in rows),
+    ]
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, n))
+        for block in blocks:
+            f.write(pack_block(block))
+
+def read_history(path: str) -> List[HistoryRow]:
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if len(data) < HEADER.size:
+        raise ValueError(f'{path} is not a game history file')
+    magic, version, n = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a game history file')
+    if version != VERSION:
+        raise ValueError(f'{path} has history format {version}, expected {VERSION}')
+
+    try:
+        return unpack_rows(data, n)
+    except (struct.error, zlib.error, IndexError) as e:
+        raise ValueError(f'{path} is damaged: {e}')
+
+def unpack_rows(data: bytes, n: int) -> List[HistoryRow]:
+    pos = HEADER.size
+    blocks = []
+    while pos < len(data):
+        length, = BLOCK_LENGTH.unpack_from(data, pos)
+        pos += BLOCK_LENGTH.size
+        blocks.append(zlib.decompress(data[pos:pos + length]))
+        pos += length
+
+    if len(blocks) != 10:
+        raise IndexError(f'{len(blocks)} of 10 columns')
+
+    launcher_block = blocks[0]
+    launchers = [launcher_block[i:i + 32] for i in range(0, len(launcher_block), 32)]
+    launcher_index = struct.unpack(f'<{n}I', blocks[1])
+    ply = struct.unpack(f'<{n}I', blocks[2])
+    move = struct.unpack(f'<{n}I', blocks[3])
+    next_color = struct.unpack(f'<{n}B', blocks[4])
+    king = struct.unpack(f'<{n}Q', blocks[5])
+    red = struct.unpack(f'<{n}Q', blocks[6])
+    black = struct.unpack(f'<{n}Q', blocks[7])
+    height = struct.unpack(f'<{n}I', blocks[8])
+    coin_block = blocks[9]
+
+    return [
+        HistoryRow(
+            launchers[launcher_index[i]], ply[i], move[i], next_color[i],
+            king[i], red[i], black[i], height[i], coin_block[32 * i:32 * (i + 1)]
+        )
+        for i in range(n)
+    ]
@@ -0,0 +1,192 @@
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+from checkers.engine import BLACK, Board
+from wallet import tohex, fromhex
+
+# Ratings and statistics of every player the observer has seen, kept up to
+# date as it indexes: each batch of blocks adds its moves and results to the
+# per-player rows in player_stats, in the same transaction as the batch, so
+# nothing is counted twice and nothing is ever recomputed from the whole
+# history.  Reading the leaderboard is a lookup on player_stats.
+#
+# Ratings are Elo's: both players start at START_RATING and a result moves
+# each by K times the difference between it and the expected score.  A win
+# taken while the loser could still move (see README) is counted as early
+# but doesn't change ratings or win rates.
+
+START_RATING = float(os.environ.get('CHECKERS_ELO_START', 1500))
+K_FACTOR = float(os.environ.get('CHECKERS_ELO_K', 32))
+
+class PlayedMove(NamedTuple):
+    pk: bytes
+    before: Board
+    after: Board
+
+class GameResult(NamedTuple):
+    winner_pk: bytes
+    loser_pk: bytes
+    early: bool
+    height: int
+
+class PlayerStats(NamedTuple):
+    pk: bytes
+    rating: float
+    games: int
+    wins: int
+    losses: int
+    early_wins: int
+    early_losses: int
+    moves: int
+    captures: int
+    promotions: int
+    updated: int
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+STATS_COLUMNS = 'pk, rating, games, wins, losses, early_wins, early_losses, moves, captures, promotions, updated'
+COUNTERS = ['games', 'wins', 'losses', 'early_wins', 'early_losses', 'moves', 'captures', 'promotions']
+
+def expected_score(rating: float, opponent: float) -> float:
+    return 1 / (1 + 10 ** ((opponent - rating) / 400))
+
+def rate(winner: float, loser: float, k: float = K_FACTOR):
+    """
+    The winner's and loser's ratings after a game between them.
+    """
+    change = k * (1 - expected_score(winner, loser))
+    return winner + change, loser - change
+
+def move_counts(move: PlayedMove):
+    """
+    (captures, promotions) made by the player who moved.
+    """
+    # board is (next king red black) and it's the mover's turn before.
+    mine, theirs = (3, 2) if move.before[0] == BLACK else (2, 3)
+    captures = bin(move.before[theirs]).count('1') - bin(move.after[theirs]).count('1')
+    kings = bin(move.after[1] & move.after[mine]).count('1') - bin(move.before[1] & move.before[mine]).count('1')
+    return max(captures, 0), max(kings, 0)
+
+class Leaderboard:
+    def run_db(self,stmt,*params):
+        cursor = self.db.cursor()
+        cursor.execute(stmt, *params)
+        cursor.close()
+        self.db.commit()
+
+    def __init__(self,db):
+        self.db = db
+        self.run_db(
+            "create table if not exists player_stats ("
+            "pk text primary key, rating real, games integer, wins integer, losses integer, "
+            "early_wins integer, early_losses integer, moves integer, captures integer, promotions integer, "
+            "updated integer)"
+        )
+        # Covers ranking, which counts the players above.
+        self.run_db("create index if not exists player_stats_by_rating on player_stats (rating desc, games)")
+
+    def clear(self,cursor):
+        cursor.execute('delete from player_stats')
+
+    def row_stats(self,row) -> PlayerStats:
+        return PlayerStats(fromhex(row[0]), *row[1:])
+
+    def absorb(self,cursor,moves: List[PlayedMove],results: List[GameResult],height: int = 0):
+        """
+        Add moves and results, in the order they were made, to the players'
+        rows using cursor, leaving the commit to the caller.
+        """
+        players: Dict[bytes, Dict] = {}
+
+        def player(pk: bytes) -> Dict:
+            stats = players.get(pk)
+            if stats is None:
+                stats = players[pk] = dict.fromkeys(COUNTERS, 0)
+                stats['rating'] = None
+            return stats
+
+        for move in moves:
+            captures, promotions = move_counts(move)
+            stats = player(move.pk)
+            stats['moves'] += 1
+            stats['captures'] += captures
+            stats['promotions'] += promotions
+
+        rated = [r for r in results if r.winner_pk != r.loser_pk]
+        for result in rated:
+            player(result.winner_pk)
+            player(result.loser_pk)
+
+        # Only the ratings of this batch's players are read.
+        keys = {tohex(pk): pk for pk in players}
+        hexes = list(keys)
+        for i in range(0, len(hexes), 500):
+            chunk = hexes[i:i + 500]
+            rows = cursor.execute(
+                'select pk, rating from player_stats where pk in (%s)' % ','.join('?' * len(chunk)), chunk
+            ).fetchall()
+            for pk, rating in rows:
+                players[keys[pk]]['rating'] = rating
+
+        for result in rated:
+            winner = player(result.winner_pk)
+            loser = player(result.loser_pk)
+            if result.early:
+                winner['early_wins'] += 1
+                loser['early_losses'] += 1
+                continue
+
+            winner['rating'], loser['rating'] = rate(
+                START_RATING if winner['rating'] is None else winner['rating'],
+                START_RATING if loser['rating'] is None else loser['rating']
+            )
+            for stats in (winner, loser):
+                stats['games'] += 1
+            winner['wins'] += 1
+            loser['losses'] += 1
+
+        cursor.executemany(
+            'insert into player_stats (%s) values (?,?,?,?,?,?,?,?,?,?,?) '
+            'on conflict (pk) do update set rating = excluded.rating, updated = excluded.updated, %s' % (
+                STATS_COLUMNS, ', '.join(f'{c} = {c} + excluded.{c}' for c in COUNTERS)
+            ),
+            [
+                (key, START_RATING if players[pk]['rating'] is None else players[pk]['rating'])
+                + tuple(players[pk][c] for c in COUNTERS) + (height,)
+                for key, pk in keys.items()
+            ]
+        )
+
+    def top(self,count: int = 10,min_games: int = 1) -> List[PlayerStats]:
+        """
+        The count highest rated players with at least min_games rated games.
+        """
+        cursor = self.db.cursor()
+        rows = cursor.execute(
+            f'select {STATS_COLUMNS} from player_stats where games >= ? order by rating desc, pk limit ?', (min_games, count)
+        ).fetchall()
+        cursor.close()
+        return [self.row_stats(r) for r in rows]
+
+    def player(self,pk: bytes) -> Optional[PlayerStats]:
+        cursor = self.db.cursor()
+        rows = cursor.execute(f'select {STATS_COLUMNS} from player_stats where pk = ?', (tohex(pk),)).fetchall()
+        cursor.close()
+        return self.row_stats(rows[0]) if rows else None
+
+    def rank(self,pk: bytes) -> Optional[int]:
+        """
+        pk's place by rating, 1 for the best, among players with a rated game.
+        """
+        stats = self.player(pk)
+        if stats is None or not stats.games:
+            return None
+
+        cursor = self.db.cursor()
+        above = cursor.execute(
+            'select count(*) from player_stats where rating > ? and games > 0', (stats.rating,)
+        ).fetchall()[0][0]
+        cursor.close()
+        return above + 1
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from clvm.casts import int_to_bytes
+
+# Watch the full node's mempool for spends of the game coins we follow, so an
+# opponent's move is seen while it's still waiting for a block rather than
+# when absorb_state finds it.
+#
+# Each poll asks for the ids of the spend bundles in the mempool and fetches
+# only the ones it hasn't looked at yet, so a busy mempool is read once rather
+# than on every poll.  A bundle counts as looked at once it's been fetched and
+# matched or ruled out for the coins followed then; if fetching fails it's
+# fetched again next time.
+
+DEFAULT_POLL_SECONDS = 1.0
+
+log = logging.getLogger(__name__)
+
+class PendingMove(NamedTuple):
+    spent: bytes              # the game coin the move spends
+    tx_id: bytes              # the spend bundle it's in
+    move: int                 # as make_move_sexp gives it
+    board: List[int]          # the board after it, as (next king red black)
+    created: Optional[bytes]  # the game coin it creates
+
+def bytes_from_json(value: str) -> bytes:
+    if value.startswith('0x'):
+        value = value[2:]
+    return bytes.fromhex(value)
+
+def coin_name_from_json(coin: Dict) -> bytes:
+    """
+    The id of a coin as the RPC gives it, the same as Coin.name().
+    """
+    return hashlib.sha256(
+        bytes_from_json(coin['parent_coin_info']) +
+        bytes_from_json(coin['puzzle_hash']) +
+        int_to_bytes(int(coin['amount']))
+    ).digest()
+
+def coin_spends_of(item: Dict) -> List[Dict]:
+    # coin_spends is still called coin_solutions in the RPC's spend bundles.
+    bundle = item['spend_bundle']
+    return bundle.get('coin_spends') or bundle.get('coin_solutions') or []
+
+class MempoolWatcher:
+    def __init__(self,client,poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.client = client
+        self.poll_seconds = poll_seconds
+        self.movers = []
+        # Bundles matched or ruled out, with the coins each spends so that
+        # one is looked at again if a game comes to have one of them.
+        self.seen_tx_ids = set()
+        self.spent_by: Dict[bytes, frozenset] = {}
+        self.followed = frozenset()
+
+    def track(self,mover):
+        """
+        Watch for spends of mover's current coin, whichever it is at the time.
+        """
+        self.movers.append(mover)
+
+    async def poll(self) -> List[Tuple[Any, PendingMove]]:
+        """
+        Look at the spend bundles new to the mempool and give (mover, pending
+        move) for each that spends a coin we follow.  The mover keeps it as
+        its pending move too.
+        """
+        following = {
+            mover.current_coin_name: mover for mover in self.movers if mover.current_coin_name is not None
+        }
+        if not following:
+            return []
+
+        tx_ids = await self.client.get_all_mempool_tx_ids()
+        # Forget bundles that left the mempool so this doesn't grow.
+        self.seen_tx_ids.intersection_update(tx_ids)
+        for tx_id in set(self.spent_by) - self.seen_tx_ids:
+            del self.spent_by[tx_id]
+
+        # A bundle is only ruled out for the coins followed when it was looked
+        # at: once a game has a new coin, a reply to it may already be waiting.
+        followed = frozenset(following)
+        newly_followed = followed - self.followed
+        self.followed = followed
+        if newly_followed:
+            for tx_id, spent in list(self.spent_by.items()):
+                if spent & newly_followed:
+                    self.seen_tx_ids.discard(tx_id)
+                    del self.spent_by[tx_id]
+
+        found = []
+        for tx_id in tx_ids:
+            if tx_id in self.seen_tx_ids:
+                continue
+
+            item = await self.client.get_mempool_item_by_tx_id(tx_id)
+            if item is None:
+                # Included or dropped since we listed it.
+                self.seen_tx_ids.add(tx_id)
+                continue
+
+            spends = [(coin_name_from_json(spend['coin']), spend) for spend in coin_spends_of(item)]
+            for spent, spend in spends:
+                mover = following.get(spent)
+                if mover is None:
+                    continue
+
+                created = None
+                for addition in item.get('additions', []):
+                    if bytes_from_json(addition['parent_coin_info']) == spent:
+                        created = coin_name_from_json(addition)
+
+                pending = mover.take_pending_spend(spent, bytes_from_json(spend['solution']), tx_id, created)
+                if pending is not None:
+                    found.append((mover, pending))
+
+            # Matched, or spends none of our coins in a way that's a move.
+            self.seen_tx_ids.add(tx_id)
+            self.spent_by[tx_id] = frozenset(spent for spent, _ in spends)
+
+        return found
+
+    async def run(self,on_pending=None):
+        """
+        Poll until cancelled, awaiting on_pending(mover, pending) for each
+        pending move found.
+        """
+        while True:
+            for mover, pending in await self.poll():
+                log.debug('pending move %s spending %s', pending.move, pending.spent.hex())
+                if on_pending is not None:
+                    await on_pending(mover, pending)
+            await asyncio.sleep(self.poll_seconds)
@@ -0,0 +1,542 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from clvm.casts import int_from_bytes, int_to_bytes
+
+from checkers.engine import BLACK, INITIAL_BOARD, Board, winner
+from checkers.gamerecords import REORG_WINDOW, block_height_and_hash, find_fork_in
+from checkers.leaderboard import GameResult, Leaderboard, PlayedMove
+from checkers.solution import (
+    SINGLETON_LAUNCHER_HASH, atom_at, inspect_launcher_solution, inspect_solution, move_from_solution, tree_hash, uncurry
+)
+from wallet import tohex, fromhex
+
+# Index every checkers game on chain, not just the ones we play, for anyone
+# who wants to watch: a leaderboard, a game browser.  Nothing is signed or
+# pushed and no keys are needed.
+#
+# A game is found by its launcher: a coin with the singleton launcher's puzzle
+# hash whose solution's key-value data has ("game" . "checkers").  The
+# launcher doesn't say who plays, so the players are read from the game's
+# first spend, whose puzzle reveal is the singleton curried around the
+# checkers program, itself curried with its own hash, the launcher and the
+# players' keys.  A game whose reveal isn't that is dropped.  From then on
+# each spend of the game's coin is a move or the win being taken.
+#
+# Blocks are read in batches: one request for the batch's block records,
+# then the additions and removals of its blocks and the spends of the coins
+# that matter, each as concurrent requests.  A batch is kept in one
+# transaction along with the checkpoint, the height and hash of its last
+# block, so syncing picks up from there.  It stays CONFIRMATIONS blocks
+# behind the peak, and for a reorg deeper than that keeps the hashes of the
+# last REORG_WINDOW blocks and a journal of each batch's games as they were
+# before it, as GameRecords does, to roll back to where the chain forked.
+#
+# Each batch's moves and results also go to checkers/leaderboard.py's player
+# statistics, in the same transaction.
+#
+# Moves are kept in observed_moves, laid out as GameRecords' moves table but
+# apart from it: GameRecords rolls back its moves on reorgs, and the observer
+# never does.
+
+CONTRACT_HEX = os.path.join(os.path.dirname(__file__), 'code', 'checkers.cl.hex')
+
+CONFIRMATIONS = int(os.environ.get('CHECKERS_OBSERVER_CONFIRMATIONS', 6))
+BATCH_BLOCKS = int(os.environ.get('CHECKERS_OBSERVER_BATCH', 100))
+# Requests to the node at once.
+CONCURRENCY = int(os.environ.get('CHECKERS_OBSERVER_REQUESTS', 16))
+
+OBSERVED_MOVES_TABLE = (
+    "create table if not exists observed_moves ("
+    "launcher text, ply integer, move integer, next integer, "
+    "king text, red text, black text, height integer, coin text primary key)"
+)
+OBSERVED_MOVES_INDEX = "create index if not exists observed_moves_by_launcher on observed_moves (launcher, ply)"
+
+log = logging.getLogger(__name__)
+
+class ObservedGame(NamedTuple):
+    launcher: bytes
+    coin: Optional[bytes]           # the game coin, or the winner's once the win is taken
+    black_pk: Optional[bytes]       # None until the first move
+    red_pk: Optional[bytes]
+    board: Board
+    plies: int
+    launched: int
+    updated: int
+    winner: Optional[int]
+    early: bool                     # the win was taken while the loser could still move
+
+def checkers_puzzle_hash(path: str = CONTRACT_HEX) -> bytes:
+    with open(path) as f:
+        return tree_hash(bytes.fromhex(f.read().strip()))
+
+def eve_coin_name(launcher: bytes, puzzle_hash: bytes, amount: int) -> bytes:
+    return hashlib.sha256(launcher + puzzle_hash + int_to_bytes(amount)).digest()
+
+def player_to_move(game: ObservedGame) -> bytes:
+    return game.black_pk if game.board[0] == BLACK else game.red_pk
+
+def game_result(game: ObservedGame, height: int) -> GameResult:
+    if game.winner == BLACK:
+        return GameResult(game.black_pk, game.red_pk, game.early, height)
+    return GameResult(game.red_pk, game.black_pk, game.early, height)
+
+class GameObserver:
+    def run_db(self,stmt,*params):
+        cursor = self.db.cursor()
+        cursor.execute(stmt, *params)
+        cursor.close()
+        self.db.commit()
+
+    def __init__(self,netname,client,path='checkers.db',puzzle_hash: Optional[bytes] = None,confirmations=CONFIRMATIONS):
+        self.netname = netname
+        self.client = client
+        self.puzzle_hash = puzzle_hash if puzzle_hash is not None else checkers_puzzle_hash()
+        self.confirmations = confirmations
+        self.batch_blocks = BATCH_BLOCKS
+        self.concurrency = CONCURRENCY
+        self.requests = None
+
+        self.db = sqlite3.connect(path)
+        self.run_db(
+            "create table if not exists observed_games ("
+            "launcher text primary key, coin text, black_pk text, red_pk text, "
+            "next integer, king text, red text, black text, plies integer, "
+            "launched integer, updated integer, winner integer, early integer)"
+        )
+        self.run_db("create index if not exists observed_by_coin on observed_games (coin)")
+        self.run_db("create index if not exists observed_by_black on observed_games (black_pk)")
+        self.run_db("create index if not exists observed_by_red on observed_games (red_pk)")
+        self.run_db("create table if not exists observed_sync (net text primary key, height integer, header_hash text)")
+        self.run_db(
+            "create table if not exists observed_blocks (net text, height integer, header_hash text, primary key (net, height))"
+        )
+        # game is the observed_games row as json, null if the batch added it.
+        self.run_db(
+            "create table if not exists observed_journal ("
+            "id integer primary key autoincrement, net text, start integer, end integer, launcher text, game text)"
+        )
+        self.run_db(OBSERVED_MOVES_TABLE)
+        self.run_db(OBSERVED_MOVES_INDEX)
+        self.take_shared_moves()
+        self.leaderboard = Leaderboard(self.db)
+
+    def close(self):
+        self.db.close()
+
+    def take_shared_moves(self):
+        """
+        Copy the moves of observed games from the moves table, where a
+        checkers.db indexed before observed_moves existed kept them.
+        """
+        cursor = self.db.cursor()
+        tables = cursor.execute("select name from sqlite_master where type = 'table' and name = 'moves'").fetchall()
+        if tables and not cursor.execute('select 1 from observed_moves limit 1').fetchall():
+            cursor.execute(
+                'insert or ignore into observed_moves (launcher, ply, move, next, king, red, black, height, coin) '
+                'select launcher, ply, move, next, king, red, black, height, coin from moves '
+                'where ply is not null and launcher in (select launcher from observed_games)'
+            )
+        cursor.close()
+        self.db.commit()
+
+    def checkpoint(self) -> Optional[Tuple[int, str]]:
+        """
+        The height and hex header hash of the last block indexed.
+        """
+        cursor = self.db.cursor()
+        rows = cursor.execute('select height, header_hash from observed_sync where net = ?', (self.netname,)).fetchall()
+        cursor.close()
+        return rows[0] if rows else None
+
+    def row_game(self,row) -> ObservedGame:
+        launcher, coin, black_pk, red_pk, next_color, king, red, black, plies, launched, updated, won, early = row
+        return ObservedGame(
+            fromhex(launcher), fromhex(coin) if coin else None,
+            fromhex(black_pk) if black_pk else None, fromhex(red_pk) if red_pk else None,
+            (next_color, int(king, 16), int(red, 16), int(black, 16)),
+            plies, launched, updated, won, bool(early)
+        )
+
+    def game_row(self,game: ObservedGame):
+        return (
+            tohex(game.launcher), tohex(game.coin) if game.coin else None,
+            tohex(game.black_pk) if game.black_pk else None, tohex(game.red_pk) if game.red_pk else None,
+            game.board[0], '%x' % game.board[1], '%x' % game.board[2], '%x' % game.board[3],
+            game.plies, game.launched, game.updated, game.winner, 1 if game.early else 0
+        )
+
+    def games(self,pk: Optional[bytes] = None) -> List[ObservedGame]:
+        """
+        Every game indexed, oldest first, or those pk plays in.
+        """
+        cursor = self.db.cursor()
+        if pk is None:
+            rows = cursor.execute('select * from observed_games order by launched, launcher').fetchall()
+        else:
+            rows = cursor.execute(
+                'select * from observed_games where black_pk = ? or red_pk = ? order by launched, launcher',
+                (tohex(pk), tohex(pk))
+            ).fetchall()
+        cursor.close()
+        return [self.row_game(r) for r in rows]
+
+    def game(self,launcher: bytes) -> Optional[ObservedGame]:
+        cursor = self.db.cursor()
+        rows = cursor.execute('select * from observed_games where launcher = ?', (tohex(launcher),)).fetchall()
+        cursor.close()
+        return self.row_game(rows[0]) if rows else None
+
+    def games_at(self,coins: List[bytes]) -> Dict[bytes, ObservedGame]:
+        """
+        The games still going whose coin is one of coins, by coin.
+        """
+        found = {}
+        cursor = self.db.cursor()
+        # Within sqlite's limit on parameters.
+        for i in range(0, len(coins), 500):
+            chunk = [tohex(c) for c in coins[i:i + 500]]
+            rows = cursor.execute(
+                'select * from observed_games where winner is null and coin in (%s)' % ','.join('?' * len(chunk)), chunk
+            ).fetchall()
+            for row in rows:
+                game = self.row_game(row)
+                found[game.coin] = game
+        cursor.close()
+        return found
+
+    def rebuild_leaderboard(self) -> int:
+        """
+        Recompute the leaderboard from every game indexed, for a checkers.db
+        indexed before it was kept, and give the number of players.  Syncing
+        keeps it up to date from then on.
+        """
+        cursor = self.db.cursor()
+        self.leaderboard.clear(cursor)
+
+        games = {g.launcher: g for g in self.games() if g.black_pk is not None}
+        played = []
+        rows = cursor.execute(
+            'select launcher, next, king, red, black from observed_moves '
+            'where launcher in (select launcher from observed_games) order by launcher, ply'
+        ).fetchall()
+        before = None
+        for launcher, next_color, king, red, black in rows:
+            launcher = fromhex(launcher)
+            if before is None or before[0] != launcher:
+                before = (launcher, INITIAL_BOARD)
+            game = games.get(launcher)
+            after = (next_color, int(king, 16), int(red, 16), int(black, 16))
+            if game is not None:
+                played.append(PlayedMove(game.black_pk if before[1][0] == BLACK else game.red_pk, before[1], after))
+            before = (launcher, after)
+
+        finished = sorted((g for g in games.values() if g.winner is not None), key=lambda g: (g.updated, g.launcher))
+        checkpoint = self.checkpoint()
+        self.leaderboard.absorb(
+            cursor, played, [game_result(g, g.updated) for g in finished], checkpoint[0] if checkpoint else 0
+        )
+        players = cursor.execute('select count(*) from player_stats').fetchall()[0][0]
+        cursor.close()
+        self.db.commit()
+        return players
+
+    def players(self,reveal: bytes,launcher: bytes) -> Optional[Tuple[bytes, bytes]]:
+        """
+        The (black, red) pks curried into a game coin's puzzle reveal, or None
+        if it isn't the checkers program in a singleton for launcher.
+        """
+        singleton = uncurry(reveal)
+        if singleton is None or len(singleton[1]) != 2:
+            return None
+
+        inner = uncurry(reveal, singleton[1][1])
+        if inner is None or len(inner[1]) != 8:
+            return None
+
+        program, args = inner
+        if atom_at(reveal, args[0]) != self.puzzle_hash or atom_at(reveal, args[1]) != launcher:
+            return None
+        if tree_hash(reveal, program) != self.puzzle_hash:
+            return None
+
+        return atom_at(reveal, args[2]), atom_at(reveal, args[3])
+
+    async def bounded(self,request):
+        async with self.requests:
+            return await request
+
+    async def sync(self,from_height: int = 1) -> int:
+        """
+        Index the blocks from the checkpoint, or from_height the first time,
+        to CONFIRMATIONS below the peak, and give the height reached.  If the
+        checkpoint's block was orphaned, what was indexed after the fork is
+        rolled back first.
+        """
+        # Made here so that it belongs to the running loop.
+        self.requests = asyncio.Semaphore(self.concurrency)
+
+        checkpoint = self.checkpoint()
+        if checkpoint is not None:
+            fork = await self.find_fork(checkpoint)
+            if fork is not None:
+                await self.rollback_to(fork)
+                checkpoint = self.checkpoint()
+
+        if checkpoint is not None:
+            height = checkpoint[0]
+            start = height + 1
+        else:
+            height = from_height - 1
+            start = from_height
+
+        state = await self.client.get_blockchain_state()
+        target = state['peak'].height - self.confirmations
+
+        while start <= target:
+            end = min(start + self.batch_blocks - 1, target)
+            await self.sync_batch(start, end)
+            height = end
+            start = end + 1
+
+        return height
+
+    async def find_fork(self,checkpoint: Tuple[int, str]) -> Optional[int]:
+        """
+        The height of the newest block indexed that's still in the chain, if
+        the checkpoint's block isn't, otherwise None.
+        """
+        height, header_hash = checkpoint
+        cursor = self.db.cursor()
+        synced = cursor.execute(
+            'select height, header_hash from observed_blocks where net = ? and height > ? and height <= ? order by height',
+            (self.netname, height - REORG_WINDOW, height)
+        ).fetchall()
+        cursor.close()
+
+        if not synced:
+            # Indexed before block hashes were kept: nothing to roll back with.
+            record = await self.client.get_block_record_by_height(height)
+            if record is None or block_height_and_hash(record)[1] != header_hash:
+                raise ValueError(f'block {height} indexed by the observer is no longer in the chain')
+            return None
+
+        return await find_fork_in(self.client, synced)
+
+    async def rollback_to(self,fork: int) -> int:
+        """
+        Undo the batches that indexed blocks above fork, newest first, and
+        give the height indexing resumes from, which is at or below fork.
+        The leaderboard is rebuilt from the games left.
+        """
+        cursor = self.db.cursor()
+        undo = cursor.execute(
+            'select start, launcher, game from observed_journal where net = ? and end > ? order by id desc',
+            (self.netname, fork)
+        ).fetchall()
+        height = min([fork] + [start - 1 for start, _, _ in undo])
+
+        for _, launcher, game in undo:
+            cursor.execute('delete from observed_games where launcher = ?', (launcher,))
+            if game is not None:
+                cursor.execute('insert into observed_games values (?,?,?,?,?,?,?,?,?,?,?,?,?)', json.loads(game))
+
+        cursor.execute('delete from observed_journal where net = ? and end > ?', (self.netname, fork))
+        cursor.execute('delete from observed_moves where height > ?', (height,))
+        cursor.execute('delete from observed_blocks where net = ? and height > ?', (self.netname, height))
+        cursor.close()
+
+        record = await self.client.get_block_record_by_height(height) if height > 0 else None
+        if record is not None:
+            self.db.execute(
+                'insert or replace into observed_sync (net, height, header_hash) values (?,?,?)',
+                (self.netname, *block_height_and_hash(record))
+            )
+        else:
+            self.db.execute('delete from observed_sync where net = ?', (self.netname,))
+        self.db.commit()
+
+        log.warning('reorg: observer rolled back to block %d, undoing %d game changes', height, len(undo))
+        self.rebuild_leaderboard()
+        return height
+
+    async def sync_batch(self,start: int,end: int):
+        """
+        Index the blocks from start to end in one transaction.
+        """
+        records = await self.client.get_block_records(start, end + 1)
+        blocks = sorted(block_height_and_hash(r) for r in records)
+        if [h for h, _ in blocks] != list(range(start, end + 1)):
+            raise ValueError(f'the node gave blocks {[h for h, _ in blocks]} for {start} to {end}')
+
+        changes = await asyncio.gather(*[
+            self.bounded(self.client.get_additions_and_removals(fromhex(header_hash))) for _, header_hash in blocks
+        ])
+
+        removed = []
+        children = {}
+        for (height, _), (additions, removals) in zip(blocks, changes):
+            removed.extend((height, r.coin) for r in removals)
+            # A singleton's next coin is its odd child.
+            for a in additions:
+                if a.coin.amount % 2 == 1:
+                    children[a.coin.parent_coin_info] = a.coin
+
+        games = self.games_at([coin.name() for _, coin in removed])
+        spends = await self.fetch_spends(removed, set(games), children)
+
+        by_launcher = {game.launcher: game for game in games.values()}
+        coins = {coin: game.launcher for coin, game in games.items()}
+        dropped = set()
+        moves = []
+        played = []
+        results = []
+
+        for height, coin in removed:
+            spend = spends.get(coin.name())
+            if spend is None:
+                continue
+
+            if coin.puzzle_hash == SINGLETON_LAUNCHER_HASH:
+                eve = inspect_launcher_solution(bytes(spend.solution))
+                if eve is not None:
+                    launcher = coin.name()
+                    eve_name = eve_coin_name(launcher, *eve)
+                    by_launcher[launcher] = ObservedGame(
+                        launcher, eve_name, None, None, INITIAL_BOARD, 0, height, height, None, False
+                    )
+                    coins[eve_name] = launcher
+                continue
+
+            launcher = coins.pop(coin.name(), None)
+            if launcher is None:
+                continue
+
+            game = by_launcher[launcher]
+            if game.black_pk is None:
+                players = self.players(bytes(spend.puzzle_reveal), launcher)
+                if players is None:
+                    log.info('dropping %s: its coin is not a checkers game', tohex(launcher))
+                    del by_launcher[launcher]
+                    dropped.add(launcher)
+                    continue
+                game = game._replace(black_pk=players[0], red_pk=players[1])
+
+            before = game
+            by_launcher[launcher] = game = self.spent(game, coin, spend, children.get(coin.name()), height, moves)
+            if game.plies > before.plies:
+                played.append(PlayedMove(player_to_move(before), before.board, game.board))
+            if game.winner is not None:
+                results.append(game_result(game, height))
+            elif game.coin is not None:
+                coins[game.coin] = launcher
+
+        checkpoint = blocks[-1]
+        cursor = self.db.cursor()
+        stored = {game.launcher: game for game in games.values()}
+        cursor.executemany(
+            'insert into observed_journal (net, start, end, launcher, game) values (?,?,?,?,?)',
+            [
+                (self.netname, start, end, tohex(launcher),
+                 json.dumps(self.game_row(stored[launcher])) if launcher in stored else None)
+                for launcher in set(by_launcher) | dropped
+            ]
+        )
+        cursor.executemany(
+            'insert or replace into observed_blocks (net, height, header_hash) values (?,?,?)',
+            [(self.netname, height, header_hash) for height, header_hash in blocks[-REORG_WINDOW:]]
+        )
+        # Nothing older than the window is ever rolled back.
+        cursor.execute('delete from observed_blocks where net = ? and height <= ?', (self.netname, end - REORG_WINDOW))
+        cursor.execute('delete from observed_journal where net = ? and end <= ?', (self.netname, end - REORG_WINDOW))
+        cursor.executemany('delete from observed_games where launcher = ?', [(tohex(l),) for l in dropped])
+        cursor.executemany(
+            'insert or replace into observed_games values (?,?,?,?,?,?,?,?,?,?,?,?,?)',
+            [self.game_row(game) for game in by_launcher.values()]
+        )
+        cursor.executemany(
+            'insert or ignore into observed_moves (launcher, ply, move, next, king, red, black, height, coin) values (?,?,?,?,?,?,?,?,?)',
+            moves
+        )
+        self.leaderboard.absorb(cursor, played, results, checkpoint[0])
+        cursor.execute(
+            'insert or replace into observed_sync (net, height, header_hash) values (?,?,?)',
+            (self.netname, checkpoint[0], checkpoint[1])
+        )
+        cursor.close()
+        self.db.commit()
+
+        log.info('observed blocks %d to %d: %d games changed, %d moves', start, end, len(by_launcher), len(moves))
+
+    async def fetch_spends(self,removed: List,tracked: set,children: Dict) -> Dict:
+        """
+        The spends, by coin name, of the launchers and game coins removed.
+        Game coins made within the batch are only known once the spends
+        making them are read, so spends are requested in rounds until no
+        more game coins turn up.
+        """
+        spends = {}
+        wanted = [(h, c) for h, c in removed if c.puzzle_hash == SINGLETON_LAUNCHER_HASH or c.name() in tracked]
+        while wanted:
+            found = await asyncio.gather(*[
+                self.bounded(self.client.get_puzzle_and_solution(coin.name(), height)) for height, coin in wanted
+            ])
+
+            made = set()
+            for (_, coin), spend in zip(wanted, found):
+                if spend is None:
+                    continue
+                spends[coin.name()] = spend
+                solution = bytes(spend.solution)
+                if coin.puzzle_hash == SINGLETON_LAUNCHER_HASH:
+                    eve = inspect_launcher_solution(solution)
+                    if eve is not None:
+                        made.add(eve_coin_name(coin.name(), *eve))
+                elif move_from_solution(solution) is not None and coin.name() in children:
+                    made.add(children[coin.name()].name())
+
+            wanted = [(h, c) for h, c in removed if c.name() in made and c.name() not in spends]
+
+        return spends
+
+    def spent(self,game: ObservedGame,coin,spend,child,height: int,moves: List) -> ObservedGame:
+        """
+        The game after its coin was spent by spend, making child.  A move is
+        added to moves as a row of observed_moves.
+        """
+        solution = bytes(spend.solution)
+        launcher, board = inspect_solution(solution, game.launcher)
+        move = move_from_solution(solution)
+        child_name = child.name() if child is not None else None
+
+        if launcher != game.launcher:
+            log.warning('game %s spent without naming it in %s', tohex(game.launcher), tohex(coin.name()))
+            return game._replace(coin=None, updated=height)
+
+        if board is not None and move is not None and child_name is None:
+            log.warning('game %s moved in %s without making its next coin', tohex(game.launcher), tohex(coin.name()))
+            return game._replace(coin=None, updated=height)
+
+        if board is not None and move is not None:
+            board = tuple(int_from_bytes(x) for x in board)
+            moves.append((
+                tohex(game.launcher), game.plies, int_from_bytes(move), board[0],
+                '%x' % board[1], '%x' % board[2], '%x' % board[3], height, tohex(child_name)
+            ))
+            return game._replace(coin=child_name, board=board, plies=game.plies + 1, updated=height)
+
+        if board is None and move is None:
+            # The win goes to whoever isn't to move, whether or not they can,
+            # since the contract doesn't check.
+            return game._replace(
+                coin=child_name, updated=height, winner=1 - game.board[0], early=winner(game.board) is None
+            )
+
+        log.warning('game %s has a spend that is neither a move nor a win', tohex(game.launcher))
+        return game._replace(coin=None, updated=height)
@@ -0,0 +1,123 @@
+import os
+from typing import Dict, List, Optional
+
+from clvm.casts import int_from_bytes
+
+from checkers.engine import Board, apply_move, move_refusal
+
+# Check a spend of a game coin before it's signed and pushed, so that what
+# the node would refuse is refused here, without a round trip, and with the
+# reason rather than just the node's error code.
+#
+# A spend is checked in the order it's built: the move against our board, our
+# view of the game's coins against the chain's lineage, the coin against the
+# puzzle for our board, and once it's been run, its cost and conditions.
+
+# The conditions checked, as chia's ConditionOpcode has them.
+AGG_SIG_UNSAFE = bytes([49])
+AGG_SIG_ME = bytes([50])
+CREATE_COIN = bytes([51])
+
+# Half of MAX_BLOCK_COST_CLVM: the most the mempool takes for one
+# transaction.  A move costs a few million.
+MAX_SPEND_COST = int(os.environ.get('CHECKERS_MAX_SPEND_COST', 5500000000))
+
+ILLEGAL_MOVE = 'illegal move'
+STALE_BOARD = 'stale board'
+BAD_LINEAGE = 'bad lineage'
+COIN_SPENT = 'coin already spent'
+PUZZLE_FAILED = 'puzzle failed'
+OVER_COST = 'over cost limit'
+BAD_CONDITIONS = 'unexpected conditions'
+
+class SpendRejected(ValueError):
+    """
+    A spend refused before it was pushed.  reason is one of the constants
+    above and detail says what was wrong.
+    """
+    def __init__(self, reason: str, detail: str = ''):
+        super().__init__(f'{reason}: {detail}' if detail else reason)
+        self.reason = reason
+        self.detail = detail
+
+def hex_name(name) -> str:
+    return bytes(name).hex()
+
+def check_move(board: Board, move) -> Board:
+    """
+    The board move leaves, or SpendRejected saying why it isn't allowed.
+    """
+    after = apply_move(board, *move)
+    if after is None:
+        raise SpendRejected(ILLEGAL_MOVE, f'{move}: {move_refusal(board, *move)}')
+    return after
+
+def check_lineage(parent_list: List[Dict], launcher: bytes, current_coin_name: Optional[bytes], lineage_proof):
+    """
+    Check that parent_list, as get_parent_coins gives it, runs from the
+    launcher to an unspent coin, that the coin is the one our board came
+    from, and that lineage_proof describes its parent.
+    """
+    if not parent_list:
+        raise SpendRejected(BAD_LINEAGE, 'no coins for the game')
+
+    if parent_list[0]['coin'].coin.name() != launcher:
+        raise SpendRejected(BAD_LINEAGE, f'coins start at {hex_name(parent_list[0]["coin"].coin.name())}, not the launcher')
+
+    for parent, child in zip(parent_list, parent_list[1:]):
+        if child['coin'].coin.parent_coin_info != parent['coin'].coin.name():
+            raise SpendRejected(BAD_LINEAGE, f'{hex_name(child["coin"].coin.name())} is not a child of the coin before it')
+
+    newest = parent_list[-1]['coin']
+    if newest.spent:
+        raise SpendRejected(COIN_SPENT, f'{hex_name(newest.coin.name())} was spent at height {newest.spent_block_index}')
+
+    if current_coin_name is not None and newest.coin.name() != current_coin_name:
+        raise SpendRejected(
+            STALE_BOARD, f'the game is at {hex_name(newest.coin.name())} but our board is for {hex_name(current_coin_name)}'
+        )
+
+    if len(parent_list) < 2:
+        raise SpendRejected(BAD_LINEAGE, 'the launcher has no game coin yet')
+
+    if len(parent_list) == 2:
+        # The eve coin is proved by the launcher alone.
+        if lineage_proof.inner_puzzle_hash is not None:
+            raise SpendRejected(BAD_LINEAGE, 'the eve coin is spent with a proof for a later coin')
+        return
+
+    parent = parent_list[-2]['coin'].coin
+    if lineage_proof.inner_puzzle_hash is None:
+        raise SpendRejected(BAD_LINEAGE, 'a later coin is spent with the eve coin\'s proof')
+    if lineage_proof.parent_name != parent.parent_coin_info or lineage_proof.amount != parent.amount:
+        raise SpendRejected(BAD_LINEAGE, f'the proof does not describe the parent {hex_name(parent.name())}')
+
+def check_coin(coin, puzzle_hash: bytes):
+    """
+    Check that coin is the game coin for our board, whose puzzle hash is given.
+    """
+    if coin.puzzle_hash != puzzle_hash:
+        raise SpendRejected(STALE_BOARD, f'{hex_name(coin.name())} is not the game coin for our board')
+
+def check_conditions(error, conditions, cost: int, signer: bytes, created: Optional[bytes], amount: int, max_cost: int = MAX_SPEND_COST):
+    """
+    Check the result of running a spend, as conditions_dict_for_solution gives
+    it: that it ran, within max_cost, asks only signer to sign and creates
+    one coin of amount, with the puzzle hash created if it's given.
+    """
+    if error is not None or conditions is None:
+        raise SpendRejected(PUZZLE_FAILED, str(error))
+
+    if cost > max_cost:
+        raise SpendRejected(OVER_COST, f'cost {cost} is over {max_cost}')
+
+    if conditions.get(AGG_SIG_UNSAFE):
+        raise SpendRejected(BAD_CONDITIONS, 'asks for AGG_SIG_UNSAFE')
+
+    signers = [bytes(c.vars[0]) for c in conditions.get(AGG_SIG_ME, [])]
+    if signers != [bytes(signer)]:
+        raise SpendRejected(BAD_CONDITIONS, f'signed for by {[s.hex() for s in signers]}, not {bytes(signer).hex()}')
+
+    coins = [(bytes(c.vars[0]), int_from_bytes(c.vars[1])) for c in conditions.get(CREATE_COIN, [])]
+    if len(coins) != 1 or coins[0][1] != amount or (created is not None and coins[0][0] != bytes(created)):
+        raise SpendRejected(BAD_CONDITIONS, f'creates {[(ph.hex(), amt) for ph, amt in coins]}')
@@ -0,0 +1,273 @@
+import hashlib
+from typing import List, Optional, Tuple
+
+# Pull the game state out of a singleton spend's solution without building
+# an SExp for it.
+#
+# The solution of a checkers singleton is
+#
+#   (lineage_proof amount (truths move extra))
+#
+# where extra is the alist (("game" . "checkers") ("board" . board) ("launcher" . launcher)).
+# Serialized clvm is a prefix encoding: 0xff is a cons followed by its first
+# and rest, 0x80 is nil, a byte below 0x80 is a one byte atom and otherwise the
+# leading one bits of the first byte give the number of bytes holding the atom
+# length.  That's enough to walk straight to the alist and read two atoms.
+#
+# The same walk reads launcher solutions and curried puzzle reveals for
+# checkers/observer.py, which looks at every singleton on chain.
+
+# The tree hash of chia's singleton_launcher.clvm.  Every singleton starts as
+# a coin with this puzzle hash.
+SINGLETON_LAUNCHER_HASH = bytes.fromhex('eff07522495060c066f66f32acc2a77e3a3e737aca8baea4d1a64ea4cdc13da9')
+
+CONS_BOX_MARKER = 0xff
+NIL = 0x80
+
+GAME_KEY = b'game'
+GAME_NAME = b'checkers'
+LAUNCHER_KEY = b'launcher'
+BOARD_KEY = b'board'
+
+def atom_span(blob: bytes, pos: int) -> Optional[Tuple[int, int]]:
+    """
+    Give the (start, end) of the atom's bytes whose encoding begins at pos or
+    None if there's a cons there or the blob is truncated.
+    """
+    if pos >= len(blob):
+        return None
+
+    b = blob[pos]
+    if b == CONS_BOX_MARKER:
+        return None
+    if b < 0x80:
+        return pos, pos + 1
+    if b == NIL:
+        return pos + 1, pos + 1
+
+    # Count the leading ones to find how many bytes hold the length.
+    bit_count = 0
+    bit_mask = 0x80
+    while b & bit_mask:
+        bit_count += 1
+        b &= 0xff ^ bit_mask
+        bit_mask >>= 1
+
+    size = b
+    for i in range(1, bit_count):
+        if pos + i >= len(blob):
+            return None
+        size = (size << 8) | blob[pos + i]
+
+    start = pos + bit_count
+    end = start + size
+    if end > len(blob):
+        return None
+    return start, end
+
+def skip_sexp(blob: bytes, pos: int) -> Optional[int]:
+    """
+    Give the position just after the serialized sexp starting at pos.
+    """
+    pending = 1
+    while pending:
+        if pos >= len(blob):
+            return None
+        if blob[pos] == CONS_BOX_MARKER:
+            # Replaced by its first and rest.
+            pending += 1
+            pos += 1
+        else:
+            span = atom_span(blob, pos)
+            if span is None:
+                return None
+            pos = span[1]
+            pending -= 1
+
+    return pos
+
+def rest_of(blob: bytes, pos: Optional[int]) -> Optional[int]:
+    if pos is None or pos >= len(blob) or blob[pos] != CONS_BOX_MARKER:
+        return None
+    return skip_sexp(blob, pos + 1)
+
+def first_of(blob: bytes, pos: Optional[int]) -> Optional[int]:
+    if pos is None or pos >= len(blob) or blob[pos] != CONS_BOX_MARKER:
+        return None
+    return pos + 1
+
+def atom_at(blob: bytes, pos: Optional[int]) -> Optional[bytes]:
+    if pos is None:
+        return None
+    span = atom_span(blob, pos)
+    if span is None:
+        return None
+    return blob[span[0]:span[1]]
+
+def atom_list_at(blob: bytes, pos: int) -> Optional[List[bytes]]:
+    """
+    Read a proper list of atoms, such as a board, or None if it's anything else.
+    """
+    result = []
+    while pos < len(blob) and blob[pos] == CONS_BOX_MARKER:
+        atom = atom_at(blob, pos + 1)
+        if atom is None:
+            return None
+        result.append(atom)
+        pos = rest_of(blob, pos)
+        if pos is None:
+            return None
+
+    if atom_at(blob, pos) != b'':
+        return None
+    return result
+
+def extra_data_position(blob: bytes) -> Optional[int]:
+    """
+    Find where the extra data alist starts in a singleton solution, or None if
+    the solution doesn't have that shape.
+    """
+    inner = first_of(blob, rest_of(blob, rest_of(blob, 0)))
+    return first_of(blob, rest_of(blob, rest_of(blob, inner)))
+
+def inspect_solution(blob: bytes, want_launcher: Optional[bytes] = None):
+    """
+    Return (launcher, board) from a serialized singleton solution in the form
+    CheckersMover.isolate_state_from_solution gives them: launcher as bytes and
+    board as a list of atoms, or None for either if it isn't present.
+
+    If want_launcher is given, the board of any other game isn't decoded.
+    """
+    pos = extra_data_position(blob)
+    if pos is None:
+        return None, None
+
+    launcher = None
+    board_pos = None
+
+    while pos < len(blob) and blob[pos] == CONS_BOX_MARKER:
+        pair = pos + 1
+        if pair < len(blob) and blob[pair] == CONS_BOX_MARKER:
+            key = atom_at(blob, pair + 1)
+            value = rest_of(blob, pair)
+
+            if value is None or value >= len(blob) or blob[value] == NIL:
+                pass
+            elif key == GAME_KEY and atom_at(blob, value) not in (None, GAME_NAME):
+                # Someone else's game using the same conventions.
+                return None, None
+            elif key == LAUNCHER_KEY:
+                launcher = atom_at(blob, value)
+                if launcher is None:
+                    # A (launcher x ...) list gives the first element.
+                    launcher = atom_at(blob, first_of(blob, value))
+                if want_launcher is not None and launcher != want_launcher:
+                    return launcher, None
+            elif key == BOARD_KEY and blob[value] == CONS_BOX_MARKER:
+                board_pos = value
+
+        pos = rest_of(blob, pos)
+        if pos is None:
+            # Truncated
+            return None, None
+
+    board = None
+    if board_pos is not None:
+        board = atom_list_at(blob, board_pos)
+
+    return launcher, board
+
+def move_from_solution(blob: bytes) -> Optional[bytes]:
+    """
+    The move atom of a singleton solution, (lineage amount (truths (move) extra)),
+    or None if there isn't one.
+    """
+    inner = first_of(blob, rest_of(blob, rest_of(blob, 0)))
+    move_list = first_of(blob, rest_of(blob, inner))
+    return atom_at(blob, first_of(blob, move_list))
+
+def inspect_launcher_solution(blob: bytes) -> Optional[Tuple[bytes, int]]:
+    """
+    Give the (puzzle hash, amount) of the eve coin a singleton launcher's
+    solution, (puzzle_hash amount extra), creates if extra has a
+    ("game" . "checkers") entry, otherwise None.
+    """
+    puzzle_hash = atom_at(blob, first_of(blob, 0))
+    amount_pos = rest_of(blob, 0)
+    amount = atom_at(blob, first_of(blob, amount_pos))
+    pos = first_of(blob, rest_of(blob, amount_pos))
+    if puzzle_hash is None or len(puzzle_hash) != 32 or amount is None or pos is None:
+        return None
+
+    while pos < len(blob) and blob[pos] == CONS_BOX_MARKER:
+        pair = pos + 1
+        if pair < len(blob) and blob[pair] == CONS_BOX_MARKER and atom_at(blob, pair + 1) == GAME_KEY:
+            if atom_at(blob, rest_of(blob, pair)) == GAME_NAME:
+                return puzzle_hash, int.from_bytes(amount, 'big')
+            return None
+
+        pos = rest_of(blob, pos)
+        if pos is None:
+            return None
+
+    return None
+
+def tree_hash(blob: bytes, pos: int = 0) -> bytes:
+    """
+    sha256tree of the serialized sexp at pos, as chia's get_tree_hash gives
+    it, in one pass over the bytes.
+    """
+    # The hashes of the first halves of the conses we're inside.
+    pending: List[List[bytes]] = []
+    while True:
+        if pos >= len(blob):
+            raise ValueError('truncated sexp')
+        if blob[pos] == CONS_BOX_MARKER:
+            pending.append([])
+            pos += 1
+            continue
+
+        span = atom_span(blob, pos)
+        if span is None:
+            raise ValueError('truncated sexp')
+        node = hashlib.sha256(b'\x01' + blob[span[0]:span[1]]).digest()
+        pos = span[1]
+
+        while pending:
+            pending[-1].append(node)
+            if len(pending[-1]) < 2:
+                break
+            first, rest = pending.pop()
+            node = hashlib.sha256(b'\x02' + first + rest).digest()
+        else:
+            return node
+
+def uncurry(blob: bytes, pos: int = 0) -> Optional[Tuple[int, List[int]]]:
+    """
+    Give the positions of the program and of each argument in a curried
+    program, (a (q . program) (c (q . arg) ... 1)), or None if it isn't one.
+    """
+    if atom_at(blob, first_of(blob, pos)) != b'\x02':
+        return None
+
+    quoted = first_of(blob, rest_of(blob, pos))
+    if atom_at(blob, first_of(blob, quoted)) != b'\x01':
+        return None
+    program = rest_of(blob, quoted)
+
+    args = []
+    env = first_of(blob, rest_of(blob, rest_of(blob, pos)))
+    while atom_at(blob, env) != b'\x01':
+        if atom_at(blob, first_of(blob, env)) != b'\x04':
+            return None
+        arg = first_of(blob, rest_of(blob, env))
+        if atom_at(blob, first_of(blob, arg)) != b'\x01':
+            return None
+        args.append(rest_of(blob, arg))
+        env = first_of(blob, rest_of(blob, rest_of(blob, env)))
+        if env is None:
+            return None
+
+    if program is None or None in args:
+        return None
+    return program, args
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.spend_bundle import SpendBundle
+from chia.wallet.lineage_proof import LineageProof
+
+from checkers import workers
+from checkers.driver import CheckersMover, GAME_MOJO, convert_to_int
+from checkers.engine import BLACK, Board, Move, legal_moves
+from checkers.workers import MoveJob
+from support.metrics import timed
+
+# Work out our reply to every move the opponent could make while we wait for
+# theirs, so that when it arrives the reply only has to be pushed.
+#
+# After our move the opponent has a handful of legal moves.  Each of them
+# creates a game coin we can name in advance, and for each we choose a reply
+# and work out and sign its spend as checkers.workers does any move: the
+# coin's puzzle is run once and the spend checked before it's signed.  All of
+# that is done in a MovePool if there is one and on executor threads if not,
+# so the event loop only waits for it.  take_new_coin and the mempool watcher
+# both give the name of the coin the opponent's move made, which is what the
+# replies are kept by.
+
+log = logging.getLogger(__name__)
+
+class PreparedReply(NamedTuple):
+    opponent_move: Move
+    coin: Coin                           # the game coin the opponent's move makes
+    reply: Optional[Move]                # None if the opponent's move wins
+    next_puzzle_hash: Optional[bytes32]  # the game coin our reply makes
+    next_board: Optional[List[int]]      # the board our reply leaves
+    spend_bundle: Optional[SpendBundle]  # our reply, signed
+
+def board_tuple(board) -> Board:
+    return tuple(convert_to_int(x) for x in board)
+
+class Speculator:
+    def __init__(
+        self,
+        mover: CheckersMover,
+        choose: Optional[Callable[[Board], Optional[Move]]] = None,
+        pool=None,
+        executor=None
+    ):
+        self.mover = mover
+        # The opening book if there is one, then search, unless given.  Given,
+        # it runs on executor threads rather than in the pool.
+        self.choose = choose
+        # A checkers.workers MovePool to prepare replies in, if any, and where
+        # they're prepared otherwise; the event loop's default threads unless
+        # given.
+        self.pool = pool
+        self.executor = executor
+        self.replies: Dict[bytes32, PreparedReply] = {}
+        self.task: Optional[asyncio.Task] = None
+        self.player = None
+
+    def start(self) -> asyncio.Task:
+        """
+        Prepare replies to the opponent's answer to the move the mover last
+        made, in the background.
+        """
+        self.cancel()
+        self.task = asyncio.create_task(self.prepare(self.mover.pushed_coin, self.mover.pushed_board))
+        return self.task
+
+    def cancel(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        self.task = None
+
+    def reply_jobs(self, coin: Coin, board) -> List[MoveJob]:
+        """
+        A job for each move the opponent can make from board, held by the game
+        coin coin, to prepare our reply to it with.
+        """
+        mover = self.mover
+
+        # Spending any child of coin proves coin was its parent.
+        coin_puzzle = mover.get_puzzle_for_board_state(board)
+        lineage_proof = LineageProof(coin.parent_coin_info, coin_puzzle.get_tree_hash(), GAME_MOJO)
+
+        return [
+            MoveJob(
+                bytes(mover.launch_coin_name),
+                bytes(mover.black.pk()),
+                bytes(mover.red.pk()),
+                bytes(mover.black.puzzle_hash),
+                bytes(mover.red.puzzle_hash),
+                list(board_tuple(board)),
+                opponent_move,
+                bytes(coin),
+                bytes(lineage_proof),
+                bytes(self.player.pk_to_sk(self.player.pk())),
+                bytes(self.player.agg_sig_me_additional_data())
+            )
+            for opponent_move in legal_moves(board_tuple(board))
+        ]
+
+    async def prepare(self, coin: Coin, board):
+        """
+        Prepare a reply to each move the opponent can make from board, held
+        by the game coin coin.
+        """
+        self.replies = {}
+
+        # The opponent is to move on board, so the replies are ours.
+        self.player = self.mover.red if convert_to_int(board[0]) == BLACK else self.mover.black
+
+        loop = asyncio.get_running_loop()
+        jobs = await loop.run_in_executor(self.executor, self.reply_jobs, coin, board)
+        with timed('speculate', 'prepare'):
+            for prepared in await asyncio.gather(*[self.prepare_reply(job) for job in jobs]):
+                self.replies[prepared.coin.name()] = prepared
+
+        log.info('prepared %d replies for moves from %s', len(self.replies), coin.name())
+        return self.replies
+
+    async def prepare_reply(self, job: MoveJob) -> PreparedReply:
+        """
+        Our reply to the opponent's move in job, worked out away from the
+        event loop.
+        """
+        if self.pool is not None and self.choose is None:
+            done = await self.pool.prepare_reply(job)
+        else:
+            loop = asyncio.get_running_loop()
+            done = await loop.run_in_executor(
+                self.executor, workers.prepare_reply, job, self.choose, self.mover.inner_puzzle_code
+            )
+
+        next_coin = Coin.from_bytes(done.coin)
+        if done.prepared is None:
+            return PreparedReply(job.move, next_coin, None, None, None, None)
+
+        return PreparedReply(
+            job.move,
+            next_coin,
+            done.reply,
+            bytes32(done.prepared.next_puzzle_hash),
+            done.prepared.next_board,
+            SpendBundle.from_bytes(done.prepared.spend_bundle)
+        )
+
+    def reply_for(self, coin_name: bytes32) -> Optional[PreparedReply]:
+        """
+        The reply prepared for the opponent's move that made the named coin.
+        """
+        return self.replies.get(coin_name)
+
+    async def respond(self, coin_name: bytes32):
+        """
+        Push the reply prepared for the move that made the named coin.  Gives
+        the push's result, or None if there was no reply ready.  Once it's
+        accepted, the mover's pushed coin is the one the reply makes, ready
+        for start.
+        """
+        prepared = self.reply_for(coin_name)
+        if prepared is None or prepared.spend_bundle is None:
+            return None
+
+        log.info('pushing prepared reply %s to %s', prepared.reply, prepared.opponent_move)
+        result = await self.player.push_tx(prepared.spend_bundle)
+        if 'error' not in result.result:
+            self.mover.pushed_coin = Coin(prepared.coin.name(), prepared.next_puzzle_hash, GAME_MOJO)
+            self.mover.pushed_board = prepared.next_board
+        return result
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from support.metrics import timed
+
+# Prepare moves in other processes.  Working out a move curries and hashes
+# puzzles, runs the singleton to find the signature it asks for and signs it,
+# all of which holds the GIL.
+# Done inside CheckersMover.make_move that stalls the event loop, and with it
+# every RPC and every other game a bot is playing.
+#
+# A MoveJob carries everything a move needs as plain bytes and ints, so it
+# pickles cheaply, and prepare_move gives back the signed spend bundle, also
+# as bytes.  Nothing here talks to the network; pushing the bundle is up to
+# the caller.
+#
+# Choosing a move searches the game tree in Python, which holds the GIL for
+# longer still, so the pool chooses moves too.
+
+log = logging.getLogger(__name__)
+
+class MoveJob(NamedTuple):
+    launcher: bytes
+    black_pk: bytes
+    red_pk: bytes
+    black_puzzle_hash: bytes
+    red_puzzle_hash: bytes
+    board: List[int]            # (next king red black)
+    move: Tuple[int, int, int, int]
+    coin: bytes                 # the game coin spent, serialized
+    lineage_proof: bytes        # serialized
+    sk: bytes                   # the mover's secret key
+    additional_data: bytes      # AGG_SIG_ME_ADDITIONAL_DATA of the network
+
+class PreparedMove(NamedTuple):
+    spend_bundle: bytes         # serialized and signed
+    next_board: List[int]
+    next_puzzle_hash: bytes     # of the game coin the move makes
+    seconds: Dict[str, float]   # time taken by each stage
+
+class PreparedReplyMove(NamedTuple):
+    coin: bytes                         # the game coin the opponent's move makes, serialized
+    reply: Optional[Tuple[int, int, int, int]]  # None if the opponent's move wins
+    prepared: Optional[PreparedMove]    # our reply, spending coin
+
+# The checkers program of this worker process, given once by the pool.
+inner_puzzle_code_ = None
+# The move chooser of this worker process, made when first used unless the
+# pool was given one.
+chooser_ = None
+
+class JobPlayer:
+    """
+    What CheckersMover needs of a player to curry its puzzle.
+    """
+    def __init__(self, pk: bytes, puzzle_hash: bytes):
+        self.pk_ = pk
+        self.puzzle_hash = puzzle_hash
+
+    def pk(self):
+        return self.pk_
+
+def load_inner_puzzle(serialized: bytes):
+    global inner_puzzle_code_
+    from chia.types.blockchain_format.program import Program
+    inner_puzzle_code_ = Program.from_bytes(serialized)
+
+def start_worker(serialized: bytes, choose=None):
+    global chooser_
+    load_inner_puzzle(serialized)
+    chooser_ = choose
+
+def choose_move(board: List[int]) -> Optional[Tuple[int, int, int, int]]:
+    """
+    The move to make on board: the opening book's if it has the position and
+    checkers.engine's best_move otherwise, unless the pool chooses otherwise.
+    """
+    global chooser_
+    if chooser_ is None:
+        from checkers.book import book_chooser, default_book
+        chooser_ = book_chooser(default_book())
+    return chooser_(tuple(board))
+
+def job_mover(job: MoveJob, inner_puzzle_code=None):
+    """
+    A CheckersMover for job's game, on job.board.
+    """
+    from checkers.driver import CheckersMover
+
+    mover = CheckersMover(
+        inner_puzzle_code or inner_puzzle_code_,
+        JobPlayer(job.black_pk, job.black_puzzle_hash),
+        JobPlayer(job.red_pk, job.red_puzzle_hash),
+        launcher_name=job.launcher
+    )
+    mover.board = list(job.board)
+    return mover
+
+def prepare_move(job: MoveJob, inner_puzzle_code=None) -> PreparedMove:
+    """
+    Work out, solve and sign the spend of job.coin making job.move.  The
+    checkers program is the pool's unless given.
+    """
+    from blspy import PrivateKey
+    from chia.types.blockchain_format.coin import Coin
+    from chia.wallet.lineage_proof import LineageProof
+
+    from checkers.driver import boardFromSExp, convert_to_int
+    from wallet.signing import sign_spend_for_conditions
+
+    mover = job_mover(job, inner_puzzle_code)
+
+    prepared = mover.prepare_move_spend(
+        Coin.from_bytes(job.coin), LineageProof.from_bytes(job.lineage_proof), *job.move
+    )
+    seconds = dict(prepared.seconds)
+
+    # Only the mover's signature is asked for.
+    start = time.perf_counter()
+    sk = PrivateKey.from_bytes(job.sk)
+    bundle = sign_spend_for_conditions(
+        prepared.coin_spend, prepared.conditions, lambda pk: sk if pk == sk.get_g1() else None, job.additional_data
+    )
+    seconds['sign'] = time.perf_counter() - start
+
+    return PreparedMove(
+        bytes(bundle),
+        [convert_to_int(x) for x in boardFromSExp(prepared.next_board)],
+        bytes(prepared.next_puzzle_hash),
+        seconds
+    )
+
+def prepare_reply(job: MoveJob, choose=None, inner_puzzle_code=None) -> PreparedReplyMove:
+    """
+    Our reply to the opponent making job.move from job.board in job.coin,
+    ready before they make it: the coin their move makes, the move chosen on
+    the board it leaves, and that move worked out and signed with job.sk,
+    spending the coin with job.lineage_proof.
+    """
+    from chia.types.blockchain_format.coin import Coin
+    from chia.wallet.puzzles.singleton_top_layer import puzzle_for_singleton
+
+    from checkers.driver import GAME_MOJO
+    from checkers.engine import apply_move
+
+    mover = job_mover(job, inner_puzzle_code)
+    after = apply_move(tuple(job.board), *job.move)
+    next_puzzle = puzzle_for_singleton(mover.launch_coin_name, mover.get_puzzle_for_board_state(list(after)))
+    next_coin = Coin(Coin.from_bytes(job.coin).name(), next_puzzle.get_tree_hash(), GAME_MOJO)
+
+    reply = choose(after) if choose is not None else choose_move(list(after))
+    if reply is None:
+        return PreparedReplyMove(bytes(next_coin), None, None)
+
+    reply_job = job._replace(board=list(after), move=tuple(reply), coin=bytes(next_coin))
+    return PreparedReplyMove(bytes(next_coin), tuple(reply), prepare_move(reply_job, inner_puzzle_code))
+
+class MovePool:
+    """
+    Processes choosing and preparing moves of games played with the given
+    checkers program, awaited from the event loop.  choose, if given, must be
+    a module level function so that it can be sent to them.
+    """
+    def __init__(self, inner_puzzle_code, processes: Optional[int] = None, choose=None):
+        # Spawned rather than forked: the parent has an event loop, threads
+        # and open connections that a fork would copy.
+        self.executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=start_worker,
+            initargs=(bytes(inner_puzzle_code), choose)
+        )
+
+    async def prepare_reply(self, job: MoveJob) -> PreparedReplyMove:
+        loop = asyncio.get_running_loop()
+        with timed('workers', 'prepare_reply'):
+            return await loop.run_in_executor(self.executor, prepare_reply, job)
+
+    async def choose(self, board: List[int]) -> Optional[Tuple[int, int, int, int]]:
+        loop = asyncio.get_running_loop()
+        with timed('workers', 'choose_move'):
+            return await loop.run_in_executor(self.executor, choose_move, list(board))
+
+    async def prepare(self, job: MoveJob) -> PreparedMove:
+        loop = asyncio.get_running_loop()
+        with timed('workers', 'prepare_move'):
+            prepared = await loop.run_in_executor(self.executor, prepare_move, job)
+        log.debug('prepared move %s: %s', job.move, prepared.seconds)
+        return prepared
+
+    def close(self):
+        self.executor.shutdown(wait=True)
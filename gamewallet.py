@@ -1,220 +1,461 @@
-import os
-import os.path
-import yaml
-import json
-import sys
+import argparse
 import asyncio
-from pathlib import Path
 import binascii
+import logging
+import os
+import sys
 
-from typing import Dict, List, Tuple, Optional, Union
-from blspy import AugSchemeMPL, G1Element, G2Element, PrivateKey
+# Only what parsing the command line needs is imported here.  Each command
+# imports the rest itself, so that --help, the database commands and my-pk
+# don't pay for chia, blspy, cdv and the driver unless they use them.
 
-from clvm import SExp, to_sexp_f
+NETNAME = 'testnet10'
 
-from chia.types.blockchain_format.coin import Coin
-from chia.types.blockchain_format.program import Program
-from chia.types.blockchain_format.sized_bytes import bytes32
-from chia.types.spend_bundle import SpendBundle
-from chia.types.coin_spend import CoinSpend
-from chia.types.coin_record import CoinRecord
+log = logging.getLogger('gamewallet')
+
+# The flags this took before it had subcommands.
+LEGACY_FLAGS = {
+    '--launch': 'launch',
+    '--launch-many': 'launch-many',
+    '--my-pk': 'my-pk',
+    '--export-history': 'export-history',
+    '--import-history': 'import-history',
+    '--build-book': 'build-book',
+}
+
+def load_game_code():
+    from cdv.util.load_clvm import load_clvm
+    return load_clvm(
+        "checkers.cl", "checkers.code", search_paths=["checkers/code"]
+    )
+
+def open_records():
+    # Only the database is needed, not the node or wallet.
+    from checkers.gamerecords import GameRecords
+    return GameRecords(1, NETNAME, None, None)
+
+def game_identifier(launcher_coin: bytes, black_pk, red_pk) -> str:
+    return '-'.join([
+        binascii.hexlify(launcher_coin).decode('utf8'),
+        binascii.hexlify(bytes(black_pk)).decode('utf8'),
+        binascii.hexlify(bytes(red_pk)).decode('utf8')
+    ])
+
+def parse_move(text: str):
+    """
+    from_x,from_y:to_x,to_y as four ints.
+    """
+    try:
+        moveFrom, moveTo = text.split(':')
+        fromX, fromY = [int(x) for x in moveFrom.split(',')]
+        toX, toY = [int(x) for x in moveTo.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{text} is not a move like 0,2:1,3')
+    return fromX, fromY, toX, toY
+
+async def export_history(args):
+    records = open_records()
+    try:
+        print(f'exported {records.export_history(args.file)} moves')
+    finally:
+        records.close()
 
-from chia.consensus.default_constants import DEFAULT_CONSTANTS
-from chia.wallet.sign_coin_spends import sign_coin_spends
-from chia.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (  # standard_transaction
-    puzzle_for_pk,
-    calculate_synthetic_secret_key,
-    DEFAULT_HIDDEN_PUZZLE_HASH,
-)
+async def import_history(args):
+    records = open_records()
+    try:
+        print(f'imported {records.import_history(args.file)} moves')
+    finally:
+        records.close()
 
-from chia.rpc.rpc_client import RpcClient
-from chia.rpc.full_node_rpc_client import FullNodeRpcClient
-from chia.rpc.wallet_rpc_client import WalletRpcClient
+async def build_book(args):
+    from checkers.book import BOOK_PATH
 
-from chia.util.condition_tools import ConditionOpcode
-from chia.util.config import load_config, save_config
-from chia.util.hash import std_hash
-from chia.util.ints import uint16, uint64
+    records = open_records()
+    try:
+        print(f'{records.build_book(BOOK_PATH, args.histories)} book entries written to {BOOK_PATH}')
+    finally:
+        records.close()
 
-from cdv.util.load_clvm import load_clvm
+async def my_pk(args):
+    from wallet.live import CheckersRunnerWallet
 
-from chia.wallet.derive_keys import master_sk_to_wallet_sk
+    mywallet = CheckersRunnerWallet(NETNAME, 1)
+    try:
+        await mywallet.wallet_get_pk(args.fingerprint)
+        print(mywallet.pk())
+    finally:
+        mywallet.close()
 
-from cdv.test import SmartCoinWrapper, CoinPairSearch, CoinWrapper, Wallet
+async def launch(args):
+    from checkers.driver import CheckersMover, GAME_MOJO
+    from wallet.live import CheckersRunnerWallet
+    from wallet.notme import NotMeWallet
 
-from checkers.gamerecords import GameRecords
-from checkers.driver import CheckersMover, showBoardFromDict, GAME_MOJO
+    inner_puzzle_code = load_game_code()
 
-from wallet.notme import NotMeWallet
-from wallet.live import CheckersRunnerWallet
+    # Init wallet configuration for launching
+    mywallet = CheckersRunnerWallet(NETNAME, 1)
+    notmywallet = NotMeWallet(binascii.unhexlify(args.red_pk))
 
-from support import SpendResult, FakeCoin, GAME_MOJO, LARGE_NUMBER_OF_BLOCKS
+    try:
+        mover = CheckersMover(inner_puzzle_code, mywallet, notmywallet)
+        await mywallet.start(mover)
 
-## HTTP LOGGING
-import logging
+        found_coin = await mywallet.choose_coin(GAME_MOJO)
+        if found_coin is None:
+            raise ValueError(f"could not find available coin containing {GAME_MOJO} mojo")
+        log.info('select id for coin %s', found_coin.name())
+        await mywallet.select_identity_for_coin(found_coin)
 
-NETNAME = 'testnet10'
+        launcher_coin, run_coin = await mover.launch_game(found_coin)
+        log.info('launcher_coin %s, run_coin %s', launcher_coin, run_coin)
 
-async def main():
-    black_wallet = None
-    red_wallet = None
-    mover = None
+        print(f'you are playing black, identifier: {game_identifier(launcher_coin, mywallet.pk(), notmywallet.pk())}')
 
-    try:
-        inner_puzzle_code = load_clvm(
-            "checkers.cl", "checkers.code", search_paths=["checkers/code"]
+        mywallet.game_records.remember_coin(
+            launcher_coin,
+            run_coin.name(),
+            mover.get_board()
         )
+    finally:
+        mywallet.close()
+        notmywallet.close()
 
-        do_launch = None
-        do_init_height = 1
+async def launch_many(args):
+    from checkers.driver import CheckersMover, launch_games, GAME_MOJO
+    from wallet.live import CheckersRunnerWallet
+    from wallet.notme import NotMeWallet
 
-        launcher = None
-        color = None
+    inner_puzzle_code = load_game_code()
 
-        if '--launch' in sys.argv[1:] and len(sys.argv) > 2:
-            do_launch = sys.argv[2]
-        elif '--my-pk' in sys.argv[1:]:
-            pk_fingerprint = None
+    mywallet = CheckersRunnerWallet(NETNAME, 1)
+    try:
+        movers = [
+            CheckersMover(inner_puzzle_code, mywallet, NotMeWallet(binascii.unhexlify(pk)))
+            for pk in args.red_pks
+        ]
+        await mywallet.start(movers[0])
 
-            if len(sys.argv) > 2:
-                pk_fingerprint = int(sys.argv[1])
+        amt = GAME_MOJO * len(movers)
+        found_coin = await mywallet.choose_coin(amt)
+        if found_coin is None:
+            raise ValueError(f"could not find available coin containing {amt} mojo")
 
-            mywallet = CheckersRunnerWallet(NETNAME, do_init_height)
-            black_wallet = mywallet
+        launched = await launch_games(mywallet, movers, found_coin)
 
-            await mywallet.wallet_get_pk(pk_fingerprint)
-            print(mywallet.pk())
+        games = []
+        for mover, (launcher_coin, run_coin) in zip(movers, launched):
+            print(game_identifier(launcher_coin, mywallet.pk(), mover.red.pk()))
+            games.append((launcher_coin, run_coin.name(), mover.get_board()))
 
-            return
+        mywallet.game_records.remember_coins(games)
+    finally:
+        mywallet.close()
+
+async def play(args):
+    """
+    Show a game's board, or make a move in it if one is given.
+    """
+    from blspy import G1Element
+
+    from checkers.driver import CheckersMover, showBoardFromDict
+    from checkers.mempool import MempoolWatcher
+    from support import LARGE_NUMBER_OF_BLOCKS
+    from wallet.live import CheckersRunnerWallet
+    from wallet.notme import NotMeWallet
+
+    inner_puzzle_code = load_game_code()
+
+    launcher_coin_name, black_public_key_str, red_public_key_str = \
+        args.identifier.split('-')
+
+    if getattr(args, 'move', None) is not None:
+        fromX, fromY, toX, toY = args.move
+    else:
+        fromX, fromY, toX, toY = None, None, None, None
+
+    black_public_key = G1Element.from_bytes(
+        binascii.unhexlify(black_public_key_str)
+    )
+    red_public_key = G1Element.from_bytes(
+        binascii.unhexlify(red_public_key_str)
+    )
 
-        elif len(sys.argv) < 2:
-            print('usage:')
-            print('gamewallet.py --launch <red-player-pk> # Launch a game, returning its identifier')
-            print(' -- returns identifier')
-            print('gamewallet.py --my-pk # Give my pk for the game to start')
-            print(' -- returns public key')
-            print('gamewallet.py [identifier] # Show the game board')
-            print('gamewallet.py [identifier] [move] # Make a move in the game')
-            sys.exit(1)
-
-        if do_launch:
-            # Init wallet configuration for launching
-            mywallet = CheckersRunnerWallet(NETNAME, do_init_height)
-            notmywallet = NotMeWallet(binascii.unhexlify(do_launch))
-            black_wallet = mywallet
-            red_wallet = notmywallet
+    # Determine who we are
+    mywallet = CheckersRunnerWallet(NETNAME, 1)
 
+    black_wallet = mywallet
+    red_wallet = NotMeWallet(red_public_key)
+
+    try:
+        mover = CheckersMover(inner_puzzle_code, black_wallet, red_wallet, launcher_name = binascii.unhexlify(launcher_coin_name))
+        await mywallet.start(mover)
+
+        matches_red = \
+            await mywallet.public_key_matches(red_public_key)
+
+        if matches_red:
+            log.info('MATCHED RED %s', red_public_key)
+            # We're playing red so reconfigure.
+            mywallet.close()
+            red_wallet.close()
+
+            mywallet = CheckersRunnerWallet(NETNAME, LARGE_NUMBER_OF_BLOCKS, keyring=mywallet.keyring)
+            red_wallet = mywallet
+            black_wallet = NotMeWallet(black_public_key)
             mover = CheckersMover(inner_puzzle_code, black_wallet, red_wallet)
+            mover.set_launch_coin_name(launcher_coin_name)
             await mywallet.start(mover)
 
-            found_coin = await mywallet.choose_coin(GAME_MOJO)
-            if found_coin is None:
-                raise ValueError(f"could not find available coin containing {GAME_MOJO} mojo")
-            print(f'select id for coin {found_coin.name()}')
-            await mywallet.select_identity_for_coin(found_coin)
+            # Select identity based on key embedded in game id
+            await mywallet.public_key_matches(red_public_key)
 
-            launcher_coin, run_coin = await mover.launch_game(found_coin)
-            print(f'launcher_coin {launcher_coin}, run_coin {run_coin}')
+        await mywallet.update(mover)
 
-            print(f'you are playing black, identifier: {binascii.hexlify(launcher_coin).decode("utf8")}-{binascii.hexlify(bytes(mywallet.pk())).decode("utf-8")}-{binascii.hexlify(bytes(notmywallet.pk())).decode("utf-8")}')
+        log.debug('launcher_coin_name %s', launcher_coin_name)
+        current_coin_name_and_board = mywallet.game_records.get_coin_for_launcher(binascii.unhexlify(launcher_coin_name))
+        log.info('found current game coin: %s', current_coin_name_and_board)
+
+        if current_coin_name_and_board:
+            current_coin_name, current_board = current_coin_name_and_board
+            parent_coins = await mywallet.get_parent_coins(binascii.unhexlify(launcher_coin_name))
+            log.debug('coins %s', parent_coins)
+            if len(parent_coins) < 1:
+                print(f"Couldn't yet find the most recent coin for the game.  Try again in a moment.")
+                return
 
+            mover.set_current_coin_name(current_coin_name)
+            mover.set_board(current_board)
             mywallet.game_records.remember_coin(
-                launcher_coin,
-                run_coin.name(),
+                binascii.unhexlify(launcher_coin_name),
+                mover.current_coin_name,
                 mover.get_board()
             )
         else:
-            launcher_coin_name, black_public_key_str, red_public_key_str = \
-                sys.argv[1].split('-')
-
-            if len(sys.argv) > 2:
-                moveFrom, moveTo = sys.argv[2].split(':')
-                fromX, fromY = [int(x) for x in moveFrom.split(',')]
-                toX, toY = [int(x) for x in moveTo.split(',')]
-            else:
-                fromX, fromY, toX, toY = None, None, None, None
-
-            black_public_key = G1Element.from_bytes(
-                binascii.unhexlify(black_public_key_str)
-            )
-            red_public_key = G1Element.from_bytes(
-                binascii.unhexlify(red_public_key_str)
-            )
+            print(f'no coin for game')
+            return
 
-            # Determine who we are
-            mywallet = CheckersRunnerWallet(NETNAME, do_init_height)
+        log.info('current coin for game %s', mover.current_coin_name)
 
-            black_wallet = mywallet
-            red_wallet = NotMeWallet(red_public_key)
+        if fromX is not None:
+            launch_coin = await mywallet.find_coin_by_name(
+                binascii.unhexlify(launcher_coin_name)
+            )
 
-            mover = CheckersMover(inner_puzzle_code, black_wallet, red_wallet, launcher_name = binascii.unhexlify(launcher_coin_name))
-            await mywallet.start(mover)
+            if not matches_red:
+                await mywallet.public_key_matches(black_public_key)
+                mover.set_launch_coin_name(launch_coin.name)
 
-            self_puzzle_hash = mywallet.game_records.get_self_hash()
-            matches_red = \
-                await mywallet.public_key_matches(red_public_key)
-
-            if matches_red:
-                print(f'MATCHED RED {red_public_key}')
-                # We're playing red so reconfigure.
-                mywallet.close()
-
-                mywallet = CheckersRunnerWallet(NETNAME, LARGE_NUMBER_OF_BLOCKS)
-                red_wallet = mywallet
-                black_wallet = NotMeWallet(black_public_key)
-                mover = CheckersMover(inner_puzzle_code, black_wallet, red_wallet)
-                mover.set_launch_coin_name(launcher_coin_name)
-                await mywallet.start(mover)
-
-                # Select identity based on key embedded in game id
-                await mywallet.public_key_matches(red_public_key)
-
-            await mywallet.update(mover)
-
-            print(f'launcher_coin_name {launcher_coin_name}')
-            current_coin_name_and_board = mywallet.game_records.get_coin_for_launcher(binascii.unhexlify(launcher_coin_name))
-            print(f'found current game coin: {current_coin_name_and_board}')
-
-            if current_coin_name_and_board:
-                current_coin_name, current_board = current_coin_name_and_board
-                parent_coins = await mywallet.get_parent_coins(binascii.unhexlify(launcher_coin_name))
-                print(f'coins {parent_coins}')
-                if len(parent_coins) < 1:
-                    print(f"Couldn't yet find the most recent coin for the game.  Try again in a moment.")
-                    return
-
-                mover.set_current_coin_name(current_coin_name)
-                mover.set_board(current_board)
-                mywallet.game_records.remember_coin(
-                    binascii.unhexlify(launcher_coin_name),
-                    mover.current_coin_name,
-                    mover.get_board()
-                )
-            else:
-                print(f'no coin for game')
-                return
+            await mover.make_move(parent_coins, fromX, fromY, toX, toY)
+        else:
+            board = mover.get_board()
+            print(showBoardFromDict(board))
+            if mover.get_winning_player() is not None:
+                print(f"{'black' if mover.winner() else 'red'} has won; the bot command takes the win")
+
+            # A move that's been made but isn't in a block yet.
+            watcher = MempoolWatcher(mywallet.parent)
+            watcher.track(mover)
+            for _, pending in await watcher.poll():
+                m = pending.move
+                print(f'move {m & 0xff},{(m >> 8) & 0xff}:{(m >> 16) & 0xff},{(m >> 24) & 0xff} is waiting for a block:')
+                print(showBoardFromDict({
+                    'blackmove': pending.board[0] != 0,
+                    'king': pending.board[1],
+                    'red': pending.board[2],
+                    'black': pending.board[3]
+                }))
+    finally:
+        black_wallet.close()
+        red_wallet.close()
+
+async def bot(args):
+    from checkers.bots import BotRunner
+    from checkers.mempool import MempoolWatcher
+    from wallet.live import CheckersRunnerWallet
+
+    identifiers = list(args.identifiers)
+    if args.games_file:
+        with open(args.games_file) as f:
+            identifiers.extend(line.strip() for line in f if line.strip())
+
+    inner_puzzle_code = load_game_code()
+    pool = None
+    if args.processes:
+        from checkers.workers import MovePool
+        pool = MovePool(inner_puzzle_code, args.processes)
+
+    mywallet = CheckersRunnerWallet(NETNAME, 1)
+    try:
+        await mywallet.start(None)
+        runner = BotRunner(
+            mywallet,
+            inner_puzzle_code,
+            workers=args.workers,
+            pushes_per_second=args.rate,
+            sync_seconds=args.sync_seconds,
+            pool=pool,
+            watcher=MempoolWatcher(mywallet.parent),
+            speculate=args.speculate
+        )
+        for identifier in identifiers:
+            await runner.add_game(identifier)
 
-            print(f'current coin for game {mover.current_coin_name}')
+        try:
+            await runner.run(args.syncs)
+        finally:
+            print('\n'.join(runner.report()))
+    finally:
+        mywallet.close()
+        if pool is not None:
+            pool.close()
 
-            if fromX is not None:
-                launch_coin = await mywallet.find_coin_by_name(
-                    binascii.unhexlify(launcher_coin_name)
-                )
+async def observe(args):
+    from checkers.observer import GameObserver
+    from wallet.session import get_session
+
+    full_node, _ = await get_session().connect()
+    observer = GameObserver(NETNAME, full_node)
+    try:
+        syncs = 0
+        while True:
+            height = await observer.sync(args.from_height)
+            games = observer.games()
+            print(f'indexed to block {height}: {len(games)} games, {sum(1 for g in games if g.winner is not None)} won')
+
+            syncs += 1
+            if not args.follow or (args.syncs is not None and syncs >= args.syncs):
+                break
+            await asyncio.sleep(args.sync_seconds)
+    finally:
+        observer.close()
 
-                if not matches_red:
-                    await mywallet.public_key_matches(black_public_key)
-                    mover.set_launch_coin_name(launch_coin.name)
+async def leaderboard(args):
+    from checkers.observer import GameObserver
 
-                await mover.make_move(parent_coins, fromX, fromY, toX, toY)
-            else:
-                board = mover.get_board()
-                print(showBoardFromDict(board))
+    # Only the database is needed, not the node.
+    observer = GameObserver(NETNAME, None)
+    try:
+        if args.rebuild:
+            print(f'{observer.rebuild_leaderboard()} players rated')
+
+        players = [observer.leaderboard.player(binascii.unhexlify(args.player))] if args.player else \
+            observer.leaderboard.top(args.count, args.min_games)
+        for stats in players:
+            if stats is None:
+                print(f'{args.player} has not played')
+                continue
+            rank = observer.leaderboard.rank(stats.pk)
+            print(
+                f'{rank or "-":>5} {stats.pk.hex()[:16]} {stats.rating:6.0f} {stats.games:5} games '
+                f'{stats.win_rate:4.0%} won {stats.early_wins} early, {stats.moves} moves {stats.captures} captures '
+                f'{stats.promotions} kings'
+            )
+    finally:
+        observer.close()
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='gamewallet.py', description='Play checkers on the chia blockchain.')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    command = commands.add_parser('my-pk', help='give my pk for someone to launch a game with')
+    command.add_argument('fingerprint', type=int, nargs='?', help='wallet key fingerprint, the first by default')
+    command.set_defaults(run=my_pk, node=True)
+
+    command = commands.add_parser('launch', help='launch a game, giving its identifier')
+    command.add_argument('red_pk', help="the other player's pk")
+    command.set_defaults(run=launch, node=True)
+
+    command = commands.add_parser('launch-many', help='launch a game with each player in one transaction')
+    command.add_argument('red_pks', nargs='+', metavar='red_pk', help='gives an identifier per line, in this order')
+    command.set_defaults(run=launch_many, node=True)
+
+    command = commands.add_parser('show', help='show the game board')
+    command.add_argument('identifier')
+    command.set_defaults(run=play, node=True)
+
+    command = commands.add_parser('move', help='make a move in the game')
+    command.add_argument('identifier')
+    command.add_argument('move', type=parse_move, help='from_x,from_y:to_x,to_y, for example 0,2:1,3')
+    command.set_defaults(run=play, node=True)
+
+    command = commands.add_parser('bot', help='play every game given until stopped')
+    command.add_argument('identifiers', nargs='*', metavar='identifier')
+    command.add_argument('--games-file', help='a file of game identifiers, one per line')
+    command.add_argument('--workers', type=int, default=4, help='moves chosen and pushed at once')
+    command.add_argument('--rate', type=float, default=5.0, help='most moves pushed per second')
+    command.add_argument('--sync-seconds', type=float, default=10.0, help='time between syncs')
+    command.add_argument('--syncs', type=int, help='stop after this many syncs')
+    command.add_argument('--processes', type=int, default=0, help='work out and sign moves in this many processes')
+    command.add_argument('--no-speculate', dest='speculate', action='store_false', help="don't prepare replies before the opponent moves")
+    command.set_defaults(run=bot, node=True)
+
+    command = commands.add_parser('observe', help='index every checkers game on chain, keys not needed')
+    command.add_argument('--from-height', type=int, default=1, help='where to start the first time')
+    command.add_argument('--follow', action='store_true', help='keep indexing new blocks')
+    command.add_argument('--sync-seconds', type=float, default=30.0, help='time between syncs when following')
+    command.add_argument('--syncs', type=int, help='stop following after this many syncs')
+    command.set_defaults(run=observe, node=True)
+
+    command = commands.add_parser('leaderboard', help='show the best rated players of the games observed')
+    command.add_argument('--count', type=int, default=20, help='players shown')
+    command.add_argument('--min-games', type=int, default=1, help='rated games a player needs to be shown')
+    command.add_argument('--player', help="one player's pk instead")
+    command.add_argument('--rebuild', action='store_true', help='recompute it from every game observed first')
+    command.set_defaults(run=leaderboard, node=False)
+
+    command = commands.add_parser('export-history', help='write the moves of every game seen to a file')
+    command.add_argument('file')
+    command.set_defaults(run=export_history, node=False)
+
+    command = commands.add_parser('import-history', help='load moves exported elsewhere')
+    command.add_argument('file')
+    command.set_defaults(run=import_history, node=False)
+
+    command = commands.add_parser('build-book', help='build the opening book from games seen and history files')
+    command.add_argument('histories', nargs='*', metavar='file')
+    command.set_defaults(run=build_book, node=False)
+
+    return parser
+
+def translate_legacy(argv):
+    """
+    Turn the old command lines, such as --launch <pk> or <identifier> [move],
+    into subcommands.
+    """
+    if not argv:
+        return argv
+    if argv[0] in LEGACY_FLAGS:
+        return [LEGACY_FLAGS[argv[0]]] + argv[1:]
+    if '-' in argv[0] and not argv[0].startswith('-') and argv[0] not in LEGACY_FLAGS.values():
+        return ['move' if len(argv) > 1 else 'show'] + argv
+    return argv
+
+async def main(argv):
+    from support.log import configure_logging
+
+    parser = make_parser()
+    args = parser.parse_args(translate_legacy(argv))
+    if args.command is None:
+        parser.print_help()
+        sys.exit(1)
+
+    configure_logging()
 
+    try:
+        await args.run(args)
     finally:
-        if black_wallet:
-            black_wallet.close()
-        if red_wallet:
-            red_wallet.close()
+        if args.node:
+            from wallet.session import get_session
+
+            session = get_session()
+            if 'CHECKERS_RPC_STATS' in os.environ:
+                print(session.report())
+            await session.close()
+
+        if 'CHECKERS_METRICS' in os.environ:
+            from support.metrics import export_metrics
+            export_metrics()
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,483 @@
+import asyncio
+import hashlib
+import random
+from typing import Dict, List, Optional, Tuple
+
+from clvm import SExp
+from clvm.casts import int_to_bytes
+
+from checkers.engine import BLACK, INITIAL_BOARD, apply_move, has_legal_move, legal_moves, move_number
+from checkers.solution import SINGLETON_LAUNCHER_HASH, tree_hash
+
+# A stand-in for the full node and wallet RPC clients, holding a chain in
+# memory, so the sync and move pipeline can be run against thousands of games
+# without a node.  Only the RPCs this project calls are here, each answering
+# in the shape FullNodeRpcClient and WalletRpcClient give, and each can be
+# made to take a set time to stand in for the network.
+#
+# SyntheticChain fills a FakeFullNode with checkers games whose spends have the
+# solutions CheckersMover makes, so absorb_state and GameRecords see what
+# they'd see on chain.  Puzzles aren't run: a spend's additions are given with
+# it, and the puzzle hashes of synthetic coins are made up.  Given the checkers
+# program, a game coin's spend reveals it curried as CheckersMover curries it,
+# inside a stand-in for the singleton top layer.
+
+GAME_MOJO = 1
+# Spends of ordinary coins between the games; absorb_state passes over coins
+# this large.
+NOISE_MOJO = 1000000
+# Stands in for singleton_top_layer.clvm, which is never run here.
+SINGLETON_STANDIN = b'singleton'
+
+class FakeCoin:
+    def __init__(self, parent_coin_info: bytes, puzzle_hash: bytes, amount: int):
+        self.parent_coin_info = parent_coin_info
+        self.puzzle_hash = puzzle_hash
+        self.amount = amount
+
+    def name(self) -> bytes:
+        return hashlib.sha256(self.parent_coin_info + self.puzzle_hash + int_to_bytes(self.amount)).digest()
+
+    def __repr__(self):
+        return f'FakeCoin({self.name().hex()})'
+
+class FakeCoinRecord:
+    def __init__(self, coin, confirmed_block_index: int, timestamp: int):
+        self.coin = coin
+        self.confirmed_block_index = confirmed_block_index
+        self.spent_block_index = 0
+        self.spent = False
+        self.coinbase = False
+        self.timestamp = timestamp
+
+    @property
+    def name(self) -> bytes:
+        return bytes(self.coin.name())
+
+class FakeCoinSpend:
+    def __init__(self, coin, puzzle_reveal: bytes, solution: bytes):
+        self.coin = coin
+        self.puzzle_reveal = puzzle_reveal
+        self.solution = solution
+
+class FakeBlockRecord:
+    def __init__(self, height: int, header_hash: bytes, prev_hash: bytes, timestamp: int):
+        self.height = height
+        self.header_hash = header_hash
+        self.prev_hash = prev_hash
+        self.timestamp = timestamp
+
+class FakeFullNode:
+    """
+    The FullNodeRpcClient methods we use, over an in memory chain.  Spends are
+    pushed to a mempool and confirmed by farm_block.
+    """
+    def __init__(self, latency: float = 0.0, start_time: int = 1600000000):
+        self.latency = latency
+        self.time = start_time
+        genesis = hashlib.sha256(b'genesis').digest()
+        self.blocks = [FakeBlockRecord(0, genesis, genesis, self.time)]
+        self.by_hash = {genesis: self.blocks[0]}
+        self.coins: Dict[bytes, FakeCoinRecord] = {}
+        self.children: Dict[bytes, List[bytes]] = {}
+        # (coin name, height spent) -> spend
+        self.spends: Dict[Tuple[bytes, int], FakeCoinSpend] = {}
+        # header hash -> (additions, removals)
+        self.changes: Dict[bytes, Tuple[List[FakeCoinRecord], List[FakeCoinRecord]]] = {}
+        # tx id -> (spends, additions)
+        self.mempool: Dict[bytes, Tuple[List[FakeCoinSpend], List]] = {}
+        self.calls: Dict[str, int] = {}
+
+    async def answer(self, method: str):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    @property
+    def height(self) -> int:
+        return self.blocks[-1].height
+
+    def add_coin(self, coin, height: int) -> FakeCoinRecord:
+        record = FakeCoinRecord(coin, height, self.time)
+        name = record.name
+        self.coins[name] = record
+        self.children.setdefault(bytes(coin.parent_coin_info), []).append(name)
+        return record
+
+    def mint(self, puzzle_hash: bytes, amount: int) -> FakeCoinRecord:
+        """
+        Make a coin out of nothing in the newest block, as farming would.
+        """
+        parent = hashlib.sha256(b'mint' + int_to_bytes(len(self.coins))).digest()
+        record = self.add_coin(FakeCoin(parent, puzzle_hash, amount), self.height)
+        record.coinbase = True
+        return record
+
+    def add_to_mempool(self, spends: List[FakeCoinSpend], additions: List) -> bytes:
+        for spend in spends:
+            record = self.coins.get(bytes(spend.coin.name()))
+            if record is None:
+                raise ValueError({'success': False, 'error': 'UNKNOWN_UNSPENT'})
+            if record.spent:
+                raise ValueError({'success': False, 'error': 'DOUBLE_SPEND'})
+
+        tx_id = hashlib.sha256(b''.join(bytes(s.coin.name()) + s.solution for s in spends)).digest()
+        self.mempool[tx_id] = (spends, additions)
+        return tx_id
+
+    def farm_block(self) -> FakeBlockRecord:
+        """
+        Make a block confirming everything in the mempool.
+        """
+        self.time += 19
+        height = self.height + 1
+        prev_hash = self.blocks[-1].header_hash
+        header_hash = hashlib.sha256(prev_hash + int_to_bytes(height)).digest()
+        block = FakeBlockRecord(height, header_hash, prev_hash, self.time)
+        self.blocks.append(block)
+        self.by_hash[header_hash] = block
+
+        added = []
+        removed = []
+        spent = set()
+        for spends, additions in self.mempool.values():
+            if any(bytes(s.coin.name()) in spent for s in spends):
+                # Another bundle in this block got there first.
+                continue
+
+            for spend in spends:
+                name = bytes(spend.coin.name())
+                spent.add(name)
+                record = self.coins[name]
+                record.spent = True
+                record.spent_block_index = height
+                self.spends[(name, height)] = spend
+                removed.append(record)
+
+            for coin in additions:
+                added.append(self.add_coin(coin, height))
+
+        self.mempool.clear()
+        self.changes[header_hash] = (added, removed)
+        return block
+
+    async def get_blockchain_state(self) -> Dict:
+        await self.answer('get_blockchain_state')
+        return {'peak': self.blocks[-1], 'sync': {'synced': True}}
+
+    async def get_block_record_by_height(self, height: int) -> Optional[FakeBlockRecord]:
+        await self.answer('get_block_record_by_height')
+        if 0 <= height < len(self.blocks):
+            return self.blocks[height]
+        return None
+
+    async def get_block_record(self, header_hash: bytes) -> Optional[FakeBlockRecord]:
+        await self.answer('get_block_record')
+        return self.by_hash.get(bytes(header_hash))
+
+    async def get_block_records(self, start: int, end: int) -> List[Dict]:
+        await self.answer('get_block_records')
+        return [
+            {'height': b.height, 'header_hash': '0x' + b.header_hash.hex()}
+            for b in self.blocks[max(start, 0):max(end, 0)]
+        ]
+
+    async def get_additions_and_removals(self, header_hash: bytes) -> Tuple[List[FakeCoinRecord], List[FakeCoinRecord]]:
+        await self.answer('get_additions_and_removals')
+        return self.changes.get(bytes(header_hash), ([], []))
+
+    async def get_puzzle_and_solution(self, coin_id: bytes, height: int) -> Optional[FakeCoinSpend]:
+        await self.answer('get_puzzle_and_solution')
+        return self.spends.get((bytes(coin_id), height))
+
+    async def get_coin_record_by_name(self, name: bytes) -> Optional[FakeCoinRecord]:
+        await self.answer('get_coin_record_by_name')
+        return self.coins.get(bytes(name))
+
+    async def get_coin_records_by_names(self, names: List[bytes], include_spent_coins: bool = True) -> List[FakeCoinRecord]:
+        await self.answer('get_coin_records_by_names')
+        records = [self.coins[bytes(n)] for n in names if bytes(n) in self.coins]
+        return [r for r in records if include_spent_coins or not r.spent]
+
+    async def get_coin_records_by_parent_ids(self, parent_ids: List[bytes], include_spent_coins: bool = True) -> List[FakeCoinRecord]:
+        await self.answer('get_coin_records_by_parent_ids')
+        records = [self.coins[c] for p in parent_ids for c in self.children.get(bytes(p), [])]
+        return [r for r in records if include_spent_coins or not r.spent]
+
+    async def push_tx(self, spend_bundle) -> Dict:
+        """
+        Take a chia SpendBundle.  Like the node, a rejected bundle raises
+        ValueError.
+        """
+        await self.answer('push_tx')
+        spends = [
+            FakeCoinSpend(cs.coin, bytes(cs.puzzle_reveal), bytes(cs.solution))
+            for cs in spend_bundle.coin_spends
+        ]
+        self.add_to_mempool(spends, spend_bundle.additions())
+        return {'status': 'SUCCESS', 'success': True}
+
+    async def get_all_mempool_tx_ids(self) -> List[bytes]:
+        await self.answer('get_all_mempool_tx_ids')
+        return list(self.mempool.keys())
+
+    async def get_mempool_item_by_tx_id(self, tx_id: bytes) -> Optional[Dict]:
+        await self.answer('get_mempool_item_by_tx_id')
+        if bytes(tx_id) not in self.mempool:
+            return None
+
+        spends, additions = self.mempool[bytes(tx_id)]
+        return {
+            'spend_bundle': {'coin_solutions': [
+                {'coin': coin_json(s.coin), 'puzzle_reveal': '0x' + s.puzzle_reveal.hex(), 'solution': '0x' + s.solution.hex()}
+                for s in spends
+            ]},
+            'additions': [coin_json(c) for c in additions],
+        }
+
+    def close(self):
+        pass
+
+    async def await_closed(self):
+        pass
+
+def coin_json(coin) -> Dict:
+    return {
+        'parent_coin_info': '0x' + bytes(coin.parent_coin_info).hex(),
+        'puzzle_hash': '0x' + bytes(coin.puzzle_hash).hex(),
+        'amount': int(coin.amount),
+    }
+
+class FakeWalletRpc:
+    """
+    The WalletRpcClient methods CheckersRunnerWallet.start uses.  keys maps
+    each fingerprint to its master secret key's bytes.
+    """
+    def __init__(self, keys: Dict[int, bytes] = {}, transactions: List = [], latency: float = 0.0):
+        self.keys = dict(keys)
+        self.transactions = list(transactions)
+        self.latency = latency
+
+    async def answer(self):
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    async def get_public_keys(self) -> List[int]:
+        await self.answer()
+        return list(self.keys.keys())
+
+    async def get_private_key(self, fingerprint: int) -> Dict:
+        await self.answer()
+        return {'fingerprint': fingerprint, 'sk': self.keys[fingerprint].hex()}
+
+    async def get_wallets(self) -> List[Dict]:
+        await self.answer()
+        return [{'id': 1, 'name': 'Chia Wallet', 'type': 0}]
+
+    async def get_transactions(self, wallet_id: int) -> List:
+        await self.answer()
+        return self.transactions
+
+    def close(self):
+        pass
+
+    async def await_closed(self):
+        pass
+
+def board_solution(launcher: bytes, move: Optional[int], board) -> bytes:
+    """
+    A serialized singleton solution as CheckersMover.move_solution makes it:
+    (lineage_proof amount (truths (move) extra)).  The lineage proof is made
+    up; nothing here checks it.
+    """
+    extra = [(b'game', b'checkers'), [b'board'] + list(board), (b'launcher', launcher)]
+    moves = [] if move is None else [move]
+    return SExp.to([[launcher, launcher, GAME_MOJO], GAME_MOJO, [[], moves, extra]]).as_bin()
+
+def win_solution(launcher: bytes) -> bytes:
+    """
+    A serialized singleton solution taking the win, as CheckersMover.win_solution
+    makes it: no move and no board.
+    """
+    extra = [(b'game', b'checkers'), (b'launcher', launcher)]
+    return SExp.to([[launcher, launcher, GAME_MOJO], GAME_MOJO, [[], [], extra]]).as_bin()
+
+def curry(program: bytes, args: List[bytes]) -> bytes:
+    """
+    The serialized program with the serialized args curried in, as chia's
+    Program.curry gives it: (a (q . program) (c (q . arg) ... 1)).  Put
+    together from the bytes, since the checkers program is slow to serialize.
+    """
+    env = b'\x01'
+    for arg in reversed(args):
+        env = b'\xff\x04\xff\xff\x01' + arg + b'\xff' + env + b'\x80'
+    return b'\xff\x02\xff\xff\x01' + program + b'\xff' + env + b'\x80'
+
+def launcher_solution(eve_puzzle_hash: bytes, parent: bytes) -> bytes:
+    """
+    A serialized launcher solution as CheckersMover.launch_spends makes it.
+    """
+    extra = [(b'game', b'checkers'), [b'board'] + list(INITIAL_BOARD), (b'launcher', parent)]
+    return SExp.to([eve_puzzle_hash, GAME_MOJO, extra]).as_bin()
+
+class SyntheticGame:
+    def __init__(self, launcher: bytes, coin, black_pk: bytes = bytes(48), red_pk: bytes = bytes(48)):
+        self.launcher = launcher
+        self.coin = coin
+        self.board = INITIAL_BOARD
+        self.ply = 0
+        self.black_pk = black_pk
+        self.red_pk = red_pk
+        self.won: Optional[int] = None
+
+    def puzzle_hash(self) -> bytes:
+        # Stands in for the singleton's, which commits to the board.
+        return hashlib.sha256(self.launcher + repr(self.board).encode()).digest()
+
+    def puzzle_reveal(self, inner_puzzle: bytes, inner_puzzle_hash: bytes) -> bytes:
+        inner = curry(inner_puzzle, [SExp.to(arg).as_bin() for arg in [
+            inner_puzzle_hash, self.launcher, self.black_pk, self.red_pk,
+            hashlib.sha256(self.black_pk).digest(), hashlib.sha256(self.red_pk).digest(),
+            GAME_MOJO, list(self.board)
+        ]])
+        singleton_struct = (hashlib.sha256(SINGLETON_STANDIN).digest(), (self.launcher, SINGLETON_LAUNCHER_HASH))
+        return curry(SExp.to(SINGLETON_STANDIN).as_bin(), [SExp.to(singleton_struct).as_bin(), inner])
+
+class SyntheticChain:
+    """
+    Many checkers games played on a FakeFullNode by random legal moves, with
+    ordinary spends between them.  Each block, moves_per_block of the games
+    still going make a move.  With the serialized checkers program as
+    inner_puzzle, moves reveal the games' puzzles.  With take_wins, a game's
+    win is taken the block after it's over.
+    """
+    def __init__(
+        self, node: FakeFullNode, seed: int = 1, noise_per_block: int = 0,
+        inner_puzzle: Optional[bytes] = None, take_wins: bool = False
+    ):
+        self.node = node
+        self.take_wins = take_wins
+        self.rng = random.Random(seed)
+        self.noise_per_block = noise_per_block
+        self.inner_puzzle = inner_puzzle
+        self.inner_puzzle_hash = tree_hash(inner_puzzle) if inner_puzzle is not None else None
+        self.games: List[SyntheticGame] = []
+        self.moves_made = 0
+        self.noise_coins = []
+
+    def launch(self, count: int) -> List[bytes]:
+        """
+        Launch count games confirmed in the next block and give their
+        launchers.  Each game's eve coin holds the initial board.
+        """
+        launched = []
+        spends = []
+        additions = []
+        for _ in range(count):
+            player = hashlib.sha256(b'player' + int_to_bytes(len(self.games))).digest()
+            funding = self.node.mint(player, GAME_MOJO)
+            launcher = FakeCoin(funding.name, SINGLETON_LAUNCHER_HASH, GAME_MOJO)
+            game = SyntheticGame(launcher.name(), None, player + player[:16], self.opponent())
+            game.coin = FakeCoin(launcher.name(), game.puzzle_hash(), GAME_MOJO)
+
+            # The funding coin makes the launcher and the launcher the eve coin.
+            self.node.add_coin(launcher, self.node.height)
+            spends.append(FakeCoinSpend(launcher, b'\x80', launcher_solution(game.coin.puzzle_hash, funding.name)))
+            additions.append(game.coin)
+
+            self.games.append(game)
+            launched.append(game.launcher)
+
+        self.node.add_to_mempool(spends, additions)
+        self.node.farm_block()
+        return launched
+
+    def opponent(self) -> bytes:
+        # Players meet more than once, as they would on a leaderboard.
+        if len(self.games) >= 2 and self.rng.random() < 0.5:
+            return self.rng.choice(self.games).black_pk
+        return hashlib.sha256(b'opponent' + int_to_bytes(len(self.games))).digest() + bytes(16)
+
+    def reveal(self, game: SyntheticGame) -> bytes:
+        if self.inner_puzzle is None:
+            return b'\x80'
+        return game.puzzle_reveal(self.inner_puzzle, self.inner_puzzle_hash)
+
+    def move(self, game: SyntheticGame) -> bool:
+        """
+        Put a random legal move of game in the mempool, unless it's over.
+        """
+        moves = legal_moves(game.board)
+        if not moves:
+            return False
+
+        fromX, fromY, toX, toY = self.rng.choice(moves)
+        reveal = self.reveal(game)
+        game.board = apply_move(game.board, fromX, fromY, toX, toY)
+        game.ply += 1
+
+        spent = game.coin
+        game.coin = FakeCoin(spent.name(), game.puzzle_hash(), GAME_MOJO)
+        solution = board_solution(game.launcher, move_number(fromX, fromY, toX, toY), game.board)
+        self.node.add_to_mempool([FakeCoinSpend(spent, reveal, solution)], [game.coin])
+        self.moves_made += 1
+        return True
+
+    def take_win(self, game: SyntheticGame) -> bool:
+        """
+        Put the spend taking game's win in the mempool, whether or not it's
+        over, as the contract allows, unless it's been taken.
+        """
+        if game.won is not None:
+            return False
+
+        reveal = self.reveal(game)
+        game.won = 1 - game.board[0]
+        winner_pk = game.black_pk if game.won == BLACK else game.red_pk
+
+        spent = game.coin
+        game.coin = FakeCoin(spent.name(), hashlib.sha256(winner_pk).digest(), GAME_MOJO)
+        self.node.add_to_mempool([FakeCoinSpend(spent, reveal, win_solution(game.launcher))], [game.coin])
+        return True
+
+    def add_noise(self):
+        # Coins made by this block's noise can't be spent until it's farmed.
+        made = []
+        for _ in range(self.noise_per_block):
+            if self.noise_coins and self.rng.random() < 0.5:
+                spent = self.noise_coins.pop(self.rng.randrange(len(self.noise_coins)))
+            else:
+                spent = self.node.mint(hashlib.sha256(b'noise').digest(), NOISE_MOJO).coin
+            created = FakeCoin(spent.name(), hashlib.sha256(b'noise' + spent.name()).digest(), NOISE_MOJO)
+            self.node.add_to_mempool([FakeCoinSpend(spent, b'\x80', b'\x80')], [created])
+            made.append(created)
+        self.noise_coins.extend(made)
+
+    def stage(self, moves_per_block: int) -> int:
+        """
+        Put the next block's moves in the mempool without farming it, and give
+        how many there are.
+        """
+        going = [g for g in self.games if g.won is None and has_legal_move(g.board)]
+        chosen = self.rng.sample(going, min(moves_per_block, len(going)))
+        made = sum(1 for game in chosen if self.move(game))
+        if self.take_wins:
+            for game in self.games:
+                if game.won is None and game not in chosen and not has_legal_move(game.board):
+                    self.take_win(game)
+        self.add_noise()
+        return made
+
+    def extend(self, blocks: int, moves_per_block: int) -> int:
+        """
+        Farm blocks, each with moves_per_block moves, and give the number of
+        moves made.
+        """
+        made = 0
+        for _ in range(blocks):
+            made += self.stage(moves_per_block)
+            self.node.farm_block()
+        return made
+
+    def game(self, launcher: bytes) -> SyntheticGame:
+        return next(g for g in self.games if g.launcher == launcher)
@@ -0,0 +1,33 @@
+import logging
+import os
+from typing import Optional
+
+DEFAULT_LEVEL = 'WARNING'
+LOG_FORMAT = '%(asctime)s %(name)s %(levelname)s %(message)s'
+
+def configure_logging(spec: Optional[str] = None):
+    """
+    Set log levels from spec, or from CHECKERS_LOG if spec isn't given.
+
+    The spec is a comma separated list of levels, either bare to set the level
+    for everything or as module=level for one logger and its children, for
+    example "INFO,checkers.driver=DEBUG".  The default of WARNING keeps the
+    block scan and identity search loops from formatting anything.
+    """
+    if spec is None:
+        spec = os.environ.get('CHECKERS_LOG', DEFAULT_LEVEL)
+
+    root_level = DEFAULT_LEVEL
+    module_levels = []
+
+    for part in filter(None, [p.strip() for p in spec.split(',')]):
+        if '=' in part:
+            name, level = part.split('=', 1)
+            module_levels.append((name.strip(), level.strip().upper()))
+        else:
+            root_level = part.upper()
+
+    logging.basicConfig(format=LOG_FORMAT, level=root_level)
+    logging.getLogger().setLevel(root_level)
+    for name, level in module_levels:
+        logging.getLogger(name).setLevel(level)
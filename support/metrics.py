@@ -0,0 +1,224 @@
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from clvm.operators import OPERATOR_LOOKUP
+from clvm.run_program import run_program as clvm_run_program
+
+# Upper bounds, in seconds, of the latency buckets.  RPCs to a local node take
+# a few milliseconds; block scans and signing can take seconds.
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+class Histogram:
+    """
+    A cumulative-on-export latency histogram in the shape prometheus expects.
+    """
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            running += count
+            yield bound, running
+
+    def quantile(self, q: float) -> float:
+        """
+        The upper bound of the bucket holding the q-th quantile, as prometheus'
+        histogram_quantile would give at a bucket's edge, or 0 with no values.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        for bound, running in self.cumulative():
+            if running and running >= rank:
+                return bound
+        return float('inf')
+
+class Series:
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.cost = 0
+
+class Metrics:
+    """
+    Counts, latencies, bytes and CLVM cost for each RPC method and each named
+    run_program call site, keyed by (kind, name) where kind is the rpc service
+    or "clvm".
+    """
+    def __init__(self):
+        self.series: Dict[tuple, Series] = {}
+
+    def get(self, kind: str, name: str) -> Series:
+        key = (kind, name)
+        if key not in self.series:
+            self.series[key] = Series()
+        return self.series[key]
+
+    def observe(self, kind: str, name: str, elapsed: float, error: bool = False, cost: int = 0):
+        series = self.get(kind, name)
+        series.latency.observe(elapsed)
+        series.cost += cost
+        if error:
+            series.errors += 1
+
+    def report(self, kind: Optional[str] = None) -> str:
+        lines = []
+        for (k, name), s in sorted(self.series.items()):
+            if kind is not None and k != kind or s.latency.count == 0:
+                continue
+            lines.append(
+                f'{k}.{name} {s.latency.count} calls {s.latency.total:.3f}s total '
+                f'{1000 * s.latency.total / s.latency.count:.1f}ms avg '
+                f'{1000 * s.latency.quantile(0.99):g}ms p99 '
+                f'{s.bytes_sent}B sent {s.bytes_received}B received'
+            )
+        return '\n'.join(lines)
+
+    def to_json(self) -> Dict:
+        result = {}
+        for (kind, name), s in sorted(self.series.items()):
+            result.setdefault(kind, {})[name] = {
+                'count': s.latency.count,
+                'errors': s.errors,
+                'seconds': s.latency.total,
+                'bytes_sent': s.bytes_sent,
+                'bytes_received': s.bytes_received,
+                'cost': s.cost,
+                'buckets': dict((str(bound), count) for bound, count in s.latency.cumulative())
+            }
+        return result
+
+    def to_prometheus(self) -> str:
+        # Each metric family's samples have to be contiguous in the text format.
+        series = sorted(self.series.items())
+        out = ['# TYPE checkers_call_seconds histogram']
+        for (kind, name), s in series:
+            labels = f'kind="{kind}",name="{name}"'
+            for bound, count in s.latency.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                out.append(f'checkers_call_seconds_bucket{{{labels},le="{le}"}} {count}')
+            out.append(f'checkers_call_seconds_sum{{{labels}}} {s.latency.total}')
+            out.append(f'checkers_call_seconds_count{{{labels}}} {s.latency.count}')
+
+        counters = [
+            ('checkers_call_errors_total', 'errors'),
+            ('checkers_bytes_sent_total', 'bytes_sent'),
+            ('checkers_bytes_received_total', 'bytes_received'),
+            ('checkers_clvm_cost_total', 'cost'),
+        ]
+        for metric, attr in counters:
+            out.append(f'# TYPE {metric} counter')
+            for (kind, name), s in series:
+                out.append(f'{metric}{{kind="{kind}",name="{name}"}} {getattr(s, attr)}')
+
+        return '\n'.join(out) + '\n'
+
+    def export(self, path: str):
+        """
+        Write a JSON summary if path ends in .json, otherwise prometheus text
+        suitable for node_exporter's textfile collector.
+        """
+        if path.endswith('.json'):
+            text = json.dumps(self.to_json(), indent=2)
+        else:
+            text = self.to_prometheus()
+
+        # Write then rename so a collector never reads a partial file.
+        with open(f'{path}.tmp', 'w') as f:
+            f.write(text)
+        os.replace(f'{path}.tmp', path)
+
+METRICS = Metrics()
+
+def export_metrics():
+    """
+    Write METRICS to the file named by CHECKERS_METRICS, if it's set.
+    """
+    if 'CHECKERS_METRICS' in os.environ:
+        METRICS.export(os.environ['CHECKERS_METRICS'])
+
+def rpc_path(url) -> str:
+    return url.path.strip('/')
+
+def trace_config_for(service: str) -> aiohttp.TraceConfig:
+    """
+    An aiohttp trace config that counts the bytes on the wire for each rpc.
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_chunk_sent(session, ctx, params):
+        METRICS.get(service, rpc_path(params.url)).bytes_sent += len(params.chunk)
+
+    async def on_response_chunk_received(session, ctx, params):
+        METRICS.get(service, rpc_path(params.url)).bytes_received += len(params.chunk)
+
+    trace_config.on_request_chunk_sent.append(on_request_chunk_sent)
+    trace_config.on_response_chunk_received.append(on_response_chunk_received)
+    return trace_config
+
+def instrument_client(client, service: str):
+    """
+    Time every request an RpcClient makes.  Every full node and wallet method
+    goes through fetch, named by its rpc path.
+    """
+    fetch = client.fetch
+
+    async def timed_fetch(path, request_json):
+        start = time.perf_counter()
+        error = True
+        try:
+            result = await fetch(path, request_json)
+            error = False
+            return result
+        finally:
+            METRICS.observe(service, path, time.perf_counter() - start, error=error)
+
+    client.fetch = timed_fetch
+    return client
+
+class timed:
+    """
+    Record the time spent in a block of code, for work that doesn't go
+    through run_program, such as Program.run and signing.
+    """
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        METRICS.observe(self.kind, self.name, time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+def run_program(name: str, program, args, operator_lookup=OPERATOR_LOOKUP, **kwargs):
+    """
+    clvm's run_program, recording the time taken and cost under name.
+    """
+    start = time.perf_counter()
+    error = True
+    cost = 0
+    try:
+        cost, result = clvm_run_program(program, args, operator_lookup, **kwargs)
+        error = False
+        return cost, result
+    finally:
+        METRICS.observe('clvm', name, time.perf_counter() - start, error=error, cost=cost)
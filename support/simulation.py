@@ -0,0 +1,92 @@
+from typing import List
+
+from chia.consensus.default_constants import DEFAULT_CONSTANTS
+from chia.types.blockchain_format.sized_bytes import bytes32
+
+from cdv.test import CoinWrapper, Network, Wallet
+
+from support import SpendResult
+
+# Blocks farmed to each player when the shared network is built.  Every test
+# starts from the state right after these.
+FUNDING_BLOCKS = 2
+
+class SimPlayer(Wallet):
+    """
+    A cdv wallet with the parts of CheckersRunnerWallet that CheckersMover
+    uses, so the driver can play on the simulator.
+    """
+    async def select_identity_for_coin(self, coin):
+        # A simulated player has one identity.
+        assert coin.puzzle_hash == self.puzzle_hash
+
+    async def push_tx(self, bundle):
+        return SpendResult(await self.parent.push_tx(bundle))
+
+    def pk_to_sk(self, pk):
+        assert pk == self.pk()
+        return self.sk_
+
+    def agg_sig_me_additional_data(self):
+        # The simulator signs for mainnet's constants.
+        return DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA
+
+    async def spend_coin(self, coin, pushtx: bool = True, debug: bool = False, **kwargs):
+        # cdv spends with coin.puzzle(), the driver passes the puzzle.
+        if 'puzzle' in kwargs:
+            coin = CoinWrapper.from_coin(coin, kwargs.pop('puzzle'))
+        return await super().spend_coin(coin, pushtx, **kwargs)
+
+def make_player(network: Network, name: str) -> SimPlayer:
+    pk, sk = network._alloc_key()
+    player = SimPlayer(network, name, pk, sk)
+    network.wallets[str(player.pk())] = player
+    return player
+
+class Snapshot:
+    """
+    The state of a simulated network at some height, which tests fork from.
+    The simulator keeps its coins in sqlite and can roll them back, so forking
+    rewinds to the snapshot instead of building and farming a new network.
+    """
+    def __init__(self, network: Network):
+        self.network = network
+        self.height = network.sim.get_height()
+        self.time = network.time
+
+    async def fork(self) -> Network:
+        sim = self.network.sim
+        await sim.rewind(self.height)
+        await sim.new_peak()
+        sim.mempool_manager.seen_bundle_hashes.clear()
+        self.network.time = self.time
+
+        # Give the wallets back the coins they had, as farm_block does.
+        for wallet in self.network.wallets.values():
+            wallet._clear_coins()
+            records = await self.network.sim_client.get_coin_records_by_puzzle_hash(wallet.puzzle_hash)
+            for record in records:
+                if not record.spent:
+                    wallet.add_coin(CoinWrapper.from_coin(record.coin, wallet.puzzle))
+
+        return self.network
+
+async def game_coins(network: Network, launcher: bytes32) -> List:
+    """
+    The coins of a game from its launcher to its newest coin, each with the
+    spend that consumed it, in the form of CheckersRunnerWallet.get_parent_coins.
+    """
+    coin_store = network.sim.mempool_manager.coin_store
+    record = await coin_store.get_coin_record(launcher)
+    result = []
+
+    while record is not None:
+        spend = None
+        if record.spent:
+            spend = await network.sim_client.get_puzzle_and_solution(record.name, record.spent_block_index)
+        result.append({'coin': record, 'spend': spend})
+
+        children = await coin_store.get_coin_records_by_parent_ids(True, [record.name])
+        record = children[0] if len(children) > 0 else None
+
+    return result
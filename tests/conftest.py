@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+
+# The chia and cdv imports are made inside the fixtures so that tests which
+# only need clvm can run without them.
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--max-suite-seconds',
+        type=float,
+        default=60.0,
+        help='fail the run if the tests take longer than this in total, 0 for no limit'
+    )
+
+def pytest_sessionstart(session):
+    session.started_at = time.perf_counter()
+
+def pytest_sessionfinish(session, exitstatus):
+    budget = session.config.getoption('--max-suite-seconds')
+    if not budget:
+        return
+
+    elapsed = time.perf_counter() - session.started_at
+    if elapsed > budget:
+        reporter = session.config.pluginmanager.get_plugin('terminalreporter')
+        if reporter is not None:
+            reporter.write_line(f'suite took {elapsed:.1f}s, over its {budget:.1f}s budget', red=True)
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+@pytest.fixture(scope="session")
+def event_loop():
+    # Session scoped so that the shared network's fixture can be async.
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture(scope="session")
+def inner_puzzle_code():
+    from cdv.util.load_clvm import load_clvm
+    return load_clvm("checkers.cl", "checkers.code", search_paths=["checkers/code"])
+
+@pytest.fixture(scope="session")
+async def funded_network():
+    """
+    One simulated network for the whole run, with alice and bob holding farmed
+    coins.  Use the network fixture, which forks it, rather than this.
+    """
+    from cdv.test import Network
+    from support.simulation import Snapshot, make_player, FUNDING_BLOCKS
+
+    network = await Network.create()
+    alice = make_player(network, "alice")
+    bob = make_player(network, "bob")
+
+    for _ in range(FUNDING_BLOCKS):
+        await network.farm_block(farmer=alice)
+        await network.farm_block(farmer=bob)
+
+    yield Snapshot(network), alice, bob
+
+    await network.close()
+
+@pytest.fixture(scope="function")
+async def network(funded_network):
+    """
+    The funded network as it was after funding, whatever earlier tests did.
+    """
+    snapshot, alice, bob = funded_network
+    yield await snapshot.fork(), alice, bob
@@ -0,0 +1,53 @@
+import random
+
+import numpy as np
+
+from checkers.batch import evaluate, popcount, terminal
+from checkers.engine import BLACK, RED, INITIAL_BOARD, apply_move, legal_moves, pieces, random_game, winner
+
+def random_boards(count, seed=1):
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = INITIAL_BOARD
+        for move in random_game(rng, rng.randrange(120)):
+            board = apply_move(board, *move)
+            boards.append(board)
+    return boards[:count]
+
+def is_jump(move):
+    return abs(move[2] - move[0]) == 2
+
+class TestBatch:
+    def test_popcount(self):
+        masks = np.array([0, 1, 0xffffffffffffffff, 0x8000000000000001], dtype=np.uint64)
+        assert list(popcount(masks)) == [0, 1, 64, 2]
+
+    def test_agrees_with_engine(self):
+        boards = random_boards(2000)
+        result = evaluate(*zip(*boards))
+
+        for i, board in enumerate(boards):
+            legal = legal_moves(board)
+            assert result.mobility[i] == len(legal)
+            assert result.can_jump[i] == any(is_jump(m) for m in legal)
+            assert result.terminal[i] == (winner(board) is not None)
+
+            assert result.red_pieces[i] == len(pieces(board, RED))
+            assert result.black_kings[i] == sum(1 for _, _, k in pieces(board, BLACK) if k)
+
+            other = (1 - board[0],) + board[1:]
+            red_board, black_board = (board, other) if board[0] == RED else (other, board)
+            assert result.red_mobility[i] == len(legal_moves(red_board))
+            assert result.black_mobility[i] == len(legal_moves(black_board))
+
+    def test_edges_dont_wrap(self):
+        # Black men on the far edge and the top row have nowhere to go.
+        black = sum(1 << (8 * 7 + y) for y in range(0, 8, 2)) | sum(1 << (8 * x + 7) for x in range(8))
+        result = evaluate([BLACK], [0], [0], [black])
+        assert result.mobility[0] == len(legal_moves((BLACK, 0, 0, black)))
+
+    def test_terminal(self):
+        boards = random_boards(200, seed=2) + [(RED, 0, 0, INITIAL_BOARD[3])]
+        assert list(terminal(boards)) == [winner(board) is not None for board in boards]
+        assert len(terminal([])) == 0
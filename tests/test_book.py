@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from checkers.book import OpeningBook, book_chooser, book_stats, position_key, write_book
+from checkers.engine import INITIAL_BOARD, apply_move, move_number, random_game
+from checkers.history import HistoryRow, write_history
+
+def game_rows(launcher, moves):
+    board = INITIAL_BOARD
+    rows = []
+    for ply, move in enumerate(moves):
+        board = apply_move(board, *move)
+        rows.append(HistoryRow(launcher, ply, move_number(*move), *board, 1000 + ply, ply.to_bytes(32, 'big')))
+    return rows
+
+def finished_game(seed):
+    rng = random.Random(seed)
+    while True:
+        moves = random_game(rng, 400)
+        board = INITIAL_BOARD
+        for move in moves:
+            board = apply_move(board, *move)
+        if len(moves) < 400:
+            return moves, 1 - board[0]
+
+class TestOpeningBook:
+    def test_lookup(self, tmp_path):
+        rows = sum((game_rows(bytes([seed]) * 32, random_game(random.Random(seed), 20)) for seed in range(50)), [])
+        stats = book_stats(rows)
+        path = str(tmp_path / 'checkers.book')
+        write_book(path, stats)
+
+        book = OpeningBook(path)
+        entries = book.lookup(INITIAL_BOARD)
+        assert sum(e.played for e in entries) == 50
+        for e in entries:
+            assert stats[(position_key(INITIAL_BOARD), move_number(*e.move))] == [e.played, e.won]
+
+        assert book.lookup((1, 0, 0, 0)) == []
+        book.close()
+
+        # Only the opening moves are kept.
+        assert {key for key, _ in book_stats(rows, max_plies=1)} == {position_key(INITIAL_BOARD)}
+
+    def test_chooses_winning_moves(self, tmp_path):
+        moves, won_by = finished_game(3)
+        rows = game_rows(bytes([1]) * 32, moves)
+        # An unfinished game counts as played but not won.
+        rows += game_rows(bytes([2]) * 32, random_game(random.Random(4), 10))
+
+        path = str(tmp_path / 'checkers.book')
+        write_book(path, book_stats(rows))
+        book = OpeningBook(path)
+
+        board = INITIAL_BOARD
+        for move in moves[:4]:
+            if board[0] == won_by:
+                assert book.choose(board) == move
+            board = apply_move(board, *move)
+
+        choose = book_chooser(book, search=lambda board: 'searched')
+        assert choose((1, 0, 0, 0)) == 'searched'
+        book.close()
+
+    def test_overlapping_history(self, tmp_path, monkeypatch):
+        from checkers.gamerecords import GameRecords
+
+        games = [
+            [r._replace(coin=bytes([seed]) + r.coin[1:]) for r in game_rows(bytes([seed]) * 32, random_game(random.Random(seed), 20))]
+            for seed in range(5)
+        ]
+        expected = book_stats(sum(games, []))
+
+        monkeypatch.chdir(tmp_path)
+        records = GameRecords(1, 'testnet', None, None)
+        for rows in games[:3]:
+            records.record_moves(rows[0].launcher, [(r.coin, r.move, [r.next, r.king, r.red, r.black], r.height) for r in rows])
+
+        # The file repeats some of what checkers.db has, in another order.
+        history = str(tmp_path / 'games.hist')
+        write_history(history, games[4] + games[1][:8] + games[3] + games[2])
+        records.build_book('checkers.book', [history])
+        records.close()
+
+        book = OpeningBook('checkers.book')
+        entries = book.lookup(INITIAL_BOARD)
+        assert sum(e.played for e in entries) == 5
+        for e in entries:
+            assert expected[(position_key(INITIAL_BOARD), move_number(*e.move))] == [e.played, e.won]
+        assert book.count == len(expected)
+        book.close()
+
+    def test_empty_and_damaged(self, tmp_path):
+        path = tmp_path / 'checkers.book'
+        write_book(str(path), {})
+        book = OpeningBook(str(path))
+        assert book.choose(INITIAL_BOARD) is None
+        book.close()
+
+        write_book(str(path), {(1, 2): [3, 4], (5, 6): [7, 8]})
+        path.write_bytes(path.read_bytes()[:-4])
+        with pytest.raises(ValueError):
+            OpeningBook(str(path))
+
+        path.write_bytes(b'not a book')
+        with pytest.raises(ValueError):
+            OpeningBook(str(path))
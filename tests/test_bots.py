@@ -0,0 +1,266 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from checkers.bots import BotRunner, RateLimiter
+from checkers.engine import BLACK, INITIAL_BOARD, RED, apply_move, legal_moves
+from checkers.mempool import PendingMove
+
+def coin(n):
+    return bytes([n]) * 32
+
+class FakeRecords:
+    def __init__(self):
+        self.movers = []
+        self.syncs = 0
+        self.wins_taken = set()
+
+    def get_coin_for_launcher(self, launcher):
+        return None
+
+    def add_mover(self, mover):
+        self.movers.append(mover)
+
+    async def update_to_current_block(self, blocks_ago):
+        # Every pushed move is in the next block.
+        self.syncs += 1
+        for mover in self.movers:
+            mover.confirm()
+            if mover.current_coin_name in self.wins_taken:
+                mover.claimed = True
+
+class FakeWallet:
+    blocks_ago = 0
+
+    def __init__(self):
+        self.game_records = FakeRecords()
+
+    async def get_parent_coins(self, launcher):
+        return []
+
+class FakePlayer:
+    def __init__(self, pk):
+        self.pk_ = pk
+
+    def pk(self):
+        return self.pk_
+
+class FakeMover:
+    def __init__(self, player, other, launcher, our_color):
+        self.player = player
+        self.other = other
+        self.launch_coin_name = launcher
+        self.current_coin_name = launcher
+        self.board = list(INITIAL_BOARD)
+        self.our_color = our_color
+        self.pushed = []
+        self.identities = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.claimed = False
+
+    def get_next_mover(self):
+        return self.player if self.board[0] == self.our_color else self.other
+
+    async def make_move(self, parent_coins, *move):
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        self.identities.append(self.get_next_mover().pk())
+        await asyncio.sleep(0.001)
+        self.pushed.append(move)
+        self.in_flight -= 1
+
+    def confirm(self):
+        for move in self.pushed:
+            self.board = list(apply_move(tuple(self.board), *move))
+            self.current_coin_name = coin(len(self.pushed) + self.current_coin_name[0])
+        self.pushed = []
+
+class FakeSpeculator:
+    def __init__(self, replies):
+        self.replies = set(replies)
+        self.starts = 0
+        self.responded = []
+
+    def start(self):
+        self.starts += 1
+
+    def cancel(self):
+        pass
+
+    def reply_for(self, coin_name):
+        return coin_name if coin_name in self.replies else None
+
+    async def respond(self, coin_name):
+        self.responded.append(coin_name)
+        return SimpleNamespace(result={})
+
+class FakeWatcher:
+    def __init__(self, found=[]):
+        self.movers = []
+        self.found = found
+        self.polls = 0
+
+    def track(self, mover):
+        self.movers.append(mover)
+
+    async def poll(self):
+        self.polls += 1
+        return self.found
+
+def first_move(board):
+    moves = legal_moves(board)
+    return moves[0] if moves else None
+
+def runner_with_games(count, our_color=BLACK, **kwargs):
+    kwargs.setdefault('choose', first_move)
+    runner = BotRunner(FakeWallet(), sync_seconds=0, pushes_per_second=0, **kwargs)
+    movers = []
+    for i in range(count):
+        player = FakePlayer(f'pk{i}')
+        mover = FakeMover(player, FakePlayer('them'), coin(i + 1), our_color)
+        runner.add_mover(mover, player)
+        movers.append(mover)
+    return runner, movers
+
+class TestBots:
+    def test_moves_only_when_its_our_turn(self):
+        runner, movers = runner_with_games(3, our_color=RED)
+        asyncio.run(runner.run(syncs=2))
+        assert all(not m.pushed for m in movers)
+        assert all(g.moves == 0 for g in runner.games.values())
+
+    def test_moves_once_per_coin(self):
+        runner, movers = runner_with_games(5)
+
+        async def syncs():
+            await runner.run(syncs=1)
+            # Our moves aren't confirmed, so nothing's queued again.
+            for game in runner.games.values():
+                assert not runner.ready(game)
+
+        asyncio.run(syncs())
+        assert [len(m.pushed) for m in movers] == [1] * 5
+        assert [m.identities for m in movers] == [[f'pk{i}'] for i in range(5)]
+
+    def test_backpressure(self):
+        runner, movers = runner_with_games(20, workers=2, queue_size=2)
+        asyncio.run(runner.run(syncs=1))
+        assert all(len(m.pushed) == 1 for m in movers)
+        assert all(m.most_in_flight == 1 for m in movers)
+
+    def test_failures_are_retried(self):
+        runner, movers = runner_with_games(1)
+        calls = []
+
+        async def fail_once(parent_coins, *move):
+            calls.append(move)
+            if len(calls) == 1:
+                raise AssertionError('push refused')
+            movers[0].pushed.append(move)
+
+        movers[0].make_move = fail_once
+        # Long enough for the failed move to finish before syncing again.
+        runner.sync_seconds = 0.1
+        asyncio.run(runner.run(syncs=2))
+        game = runner.games[coin(1)]
+        assert game.failures == 1
+        assert game.moves == 1
+
+    def test_moves_prepared_in_a_pool_overlap(self):
+        class FakePool:
+            def __init__(self):
+                self.running = 0
+                self.most_running = 0
+                self.chosen = 0
+
+            async def choose(self, board):
+                self.chosen += 1
+                return first_move(tuple(board))
+
+            async def prepare(self, job):
+                self.running += 1
+                self.most_running = max(self.most_running, self.running)
+                await asyncio.sleep(0.01)
+                self.running -= 1
+                return job
+
+        # Moves are chosen in the pool too.
+        runner, movers = runner_with_games(4, workers=4, choose=None, pool=FakePool())
+        for mover in movers:
+            mover.move_job = lambda parent_coins, *move: move
+            mover.push_prepared = lambda parent_coins, move, mover=mover: mover.make_move(parent_coins, *move)
+
+        asyncio.run(runner.run(syncs=1))
+        assert all(len(m.pushed) == 1 for m in movers)
+        assert runner.pool.chosen == 4
+        assert runner.pool.most_running > 1
+
+    def test_wins_are_taken_together(self):
+        runner, movers = runner_with_games(4)
+        # Red is to move in the first two and has no pieces left.
+        for mover in movers[:2]:
+            mover.board = [RED, 0, 0, INITIAL_BOARD[3]]
+            mover.win_bundle = lambda parent_coins, mover=mover: mover.launch_coin_name
+
+        pushes = []
+
+        async def push_claims(bundles):
+            pushes.append(bundles)
+            runner.wallet.game_records.wins_taken.update(bundles)
+            return [True] * len(bundles)
+
+        runner.push_claims = push_claims
+        asyncio.run(runner.run(syncs=2))
+
+        assert pushes == [[coin(1), coin(2)]]
+        assert [g.won for g in runner.games.values()] == [True, True, False, False]
+        assert all(not m.pushed for m in movers[:2])
+
+    def test_mempool_is_watched_after_each_sync(self):
+        watcher = FakeWatcher()
+        runner, movers = runner_with_games(3, watcher=watcher)
+        asyncio.run(runner.run(syncs=2))
+        assert watcher.movers == movers
+        assert watcher.polls == 2
+
+    def test_prepared_reply_to_a_new_coin(self):
+        runner, movers = runner_with_games(1, speculate=True)
+        game = runner.games[coin(1)]
+        game.speculator = FakeSpeculator([coin(9)])
+
+        async def play():
+            await runner.run(syncs=1)
+            # Replies to their answer are prepared once we've moved.
+            assert game.speculator.starts == 1
+
+            # Their move is in a block, and the reply to it is pushed at once.
+            assert movers[0].on_new_coin(SimpleNamespace(name=lambda: coin(8))) is None
+            await movers[0].on_new_coin(SimpleNamespace(name=lambda: coin(9)))
+
+        asyncio.run(play())
+        assert game.speculator.responded == [coin(9)]
+        assert game.moved_from == coin(9)
+        assert game.moves == 2
+        assert game.speculator.starts == 2
+        assert not game.busy
+
+    def test_prepared_reply_to_a_pending_move(self):
+        runner, movers = runner_with_games(1, our_color=RED, speculate=True)
+        game = runner.games[coin(1)]
+        game.speculator = FakeSpeculator([coin(9)])
+        runner.watcher = FakeWatcher([(movers[0], PendingMove(coin(1), b'tx', 0, [], coin(9)))])
+
+        asyncio.run(runner.run(syncs=1))
+        assert game.speculator.responded == [coin(9)]
+        assert game.moved_from == coin(9)
+
+    def test_rate_limit(self):
+        async def take(limiter, count):
+            for _ in range(count):
+                await limiter.acquire()
+
+        limiter = RateLimiter(100.0)
+        start = time.monotonic()
+        asyncio.run(take(limiter, 6))
+        assert time.monotonic() - start >= 0.045
@@ -15,21 +15,62 @@ from clvm.run_program import run_program
 
 from clvm_tools.binutils import disassemble
 
-from chia.clvm.singleton import SINGLETON_LAUNCHER
+from blspy import AugSchemeMPL, G2Element
+
 from chia.consensus.default_constants import DEFAULT_CONSTANTS
+from chia.types.blockchain_format.coin import Coin
 from chia.types.blockchain_format.sized_bytes import bytes32
-
-from cdv.util.load_clvm import load_clvm
-from cdv.test import setup as setup_test
-from cdv.test import CoinWrapper
+from chia.types.coin_spend import CoinSpend
+from chia.types.spend_bundle import SpendBundle
+from chia.util.condition_tools import conditions_dict_for_solution, pkm_pairs_for_conditions_dict
+from chia.wallet.lineage_proof import LineageProof
+from chia.wallet.puzzles.singleton_top_layer import puzzle_for_singleton, solution_for_singleton
 
 from checkers.driver import CheckersMover, INITIAL_BOARD, GAME_MOJO, make_move_sexp
+from checkers.preflight import ILLEGAL_MOVE, STALE_BOARD, SpendRejected
+from checkers.speculate import Speculator
+
+from support.metrics import METRICS
+from support.simulation import game_coins, FUNDING_BLOCKS
 
 def maskFor(x,y):
     return 1 << ((8 * x) + y)
 
-def presentMask(bytesData,x,y):
-    return int_from_bytes(bytesData) & maskFor(x,y)
+def presentMask(mask,x,y):
+    return mask & maskFor(x,y)
+
+def eve_move_spend(mover,coins,move,board):
+    """
+    Spend of a game's eve coin claiming the given board, which make_move
+    would only give if it's the real one.
+    """
+    maybeMove = SExp.to(move).cons(SExp.to([]))
+    tail = [("game", "checkers"), ("board", board), ("launcher", mover.launch_coin_name)]
+    solution = solution_for_singleton(
+        LineageProof(mover.launch_coin_name, None, GAME_MOJO),
+        GAME_MOJO,
+        SExp.to([[], maybeMove, tail])
+    )
+    return CoinSpend(
+        coins[-1]['coin'].coin,
+        puzzle_for_singleton(mover.launch_coin_name, mover.get_coin_puzzle()),
+        solution
+    )
+
+def sign_with(spend,sk):
+    """
+    Sign whatever the spend asks for with sk, whoever it asks for.  A spend
+    whose puzzle fails is left unsigned for the network to refuse.
+    """
+    error, conditions, cost = conditions_dict_for_solution(
+        spend.puzzle_reveal, spend.solution, DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM
+    )
+    if error or conditions is None:
+        return SpendBundle([spend], G2Element())
+
+    pairs = pkm_pairs_for_conditions_dict(conditions, spend.coin.name(), DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA)
+    signature = AugSchemeMPL.aggregate([AugSchemeMPL.sign(sk, msg) for _, msg in pairs])
+    return SpendBundle([spend], signature)
 
 #
 # Theory of operation:
@@ -65,173 +106,212 @@ def presentMask(bytesData,x,y):
 # code to be able to ask the contract what will happen when a move is requested.
 #
 class TestCheckers:
-    @pytest.fixture(scope="function")
-    async def setup(self):
-        inner_puzzle_code = load_clvm("checkers.cl", "checkers.code", search_paths=["checkers/code"])
-
-        network, alice, bob = await setup_test()
-
-        # Whole network value
-        await network.farm_block()
-
-        self.game_state = INITIAL_BOARD
-
-        yield inner_puzzle_code, network, alice, bob
+    # The network fixture (tests/conftest.py) forks one funded simulator
+    # shared by every test, so alice and bob start each test with the coins
+    # they were given there.
 
     # Code cribs a lot from pools code in chia-blockchain, also Quexington's
     # example piggy bank.
     @pytest.mark.asyncio
-    async def test_can_launch(self, setup):
-        inner_puzzle_code, network, alice, bob = setup
-
-        await network.farm_block(farmer=alice)
+    async def test_can_launch(self, inner_puzzle_code, network):
+        network, alice, bob = network
 
-        try:
-            mover = CheckersMover(inner_puzzle_code, alice, bob)
-            launch_coin = await alice.choose_coin(GAME_MOJO)
-            _, launched_coin = await mover.launch_game(launch_coin)
-            assert launched_coin
+        mover = CheckersMover(inner_puzzle_code, alice, bob)
+        launch_coin = await alice.choose_coin(GAME_MOJO)
+        launcher, launched_coin = await mover.launch_game(launch_coin)
+        assert launched_coin
 
-        finally:
-            await network.close()
+        coins = await game_coins(network, launcher)
+        assert [c['coin'].coin.name() for c in coins] == [launcher, launched_coin.name()]
+        assert not coins[-1]['coin'].spent
 
     # Code cribs a lot from pools code in chia-blockchain, also Quexington's
     # example piggy bank.
     @pytest.mark.asyncio
-    async def test_can_move(self, setup):
-        inner_puzzle_code, network, alice, bob = setup
+    async def test_can_move(self, inner_puzzle_code, network):
+        network, alice, bob = network
 
-        await network.farm_block(farmer=alice)
+        mover = CheckersMover(inner_puzzle_code, alice, bob)
+        launch_coin = await alice.choose_coin(GAME_MOJO)
+        launcher, launched_coin = await mover.launch_game(launch_coin)
+        assert launched_coin
 
-        try:
-            mover = CheckersMover(inner_puzzle_code, alice, bob)
-            launch_coin = await alice.choose_coin(GAME_MOJO)
-            _, launched_coin = await mover.launch_game(launch_coin)
-            assert launched_coin
+        coins = await game_coins(network, launcher)
+        assert await mover.make_move(coins, 0,2,1,3)
 
-            move = make_move_sexp(0,2,1,3)
-            maybeMove = SExp.to(move).cons(SExp.to([]))
+        coins = await game_coins(network, launcher)
+        assert len(coins) == 3
+        assert coins[-2]['coin'].coin.name() == launched_coin.name()
+
+    # Can't make invalid move.
+    @pytest.mark.asyncio
+    async def test_cant_make_invalid_move(self, inner_puzzle_code, network):
+        network, alice, bob = network
 
-            simArgs = SExp.to(["simulate", maybeMove, []])
-            cost, result = run_program(
-                launched_coin.puzzle(),
-                simArgs,
-                OPERATOR_LOOKUP
-            )
+        mover = CheckersMover(inner_puzzle_code, alice, bob)
+        launch_coin = await alice.choose_coin(GAME_MOJO)
+        launcher, launched_coin = await mover.launch_game(launch_coin)
+        assert launched_coin
 
-            args = SExp.to([[], maybeMove, [("board", result.rest()), ("launcher", launched_coin.name())]])
-            after_first_move = await alice.spend_coin(
-                launched_coin,
-                push_tx=True,
-                amt=GAME_MOJO,
-                args=args
-            )
+        black_start = 0x205020502050205
+        source_mask = maskFor(0,2)
+        target_mask = maskFor(1,4)
+        black_move = black_start ^ source_mask ^ target_mask
+        fake_board = SExp.to([1, 0, 0xa040a040a040a040, black_move])
 
-            assert 'error' not in after_first_move.result
+        coins = await game_coins(network, launcher)
+        spend = eve_move_spend(mover, coins, make_move_sexp(0,2,1,4), fake_board)
+        after_first_move = await alice.push_tx(sign_with(spend, alice.sk_))
 
-        finally:
-            await network.close()
+        assert 'error' in after_first_move.result
 
     # Wrong player can't move
     @pytest.mark.asyncio
-    async def test_cant_make_invalid_move(self, setup):
-        inner_puzzle_code, network, alice, bob = setup
+    async def test_wrong_person_cant_move(self, inner_puzzle_code, network):
+        network, alice, bob = network
 
-        await network.farm_block(farmer=alice)
+        mover = CheckersMover(inner_puzzle_code, alice, bob)
+        launch_coin = await alice.choose_coin(GAME_MOJO)
+        launcher, launched_coin = await mover.launch_game(launch_coin)
+        assert launched_coin
 
-        try:
-            mover = CheckersMover(inner_puzzle_code, alice, bob)
-            launch_coin = await alice.choose_coin(GAME_MOJO)
-            _, launched_coin = await mover.launch_game(launch_coin)
-            assert launched_coin
+        # A good move for black, but signed by red.
+        coins = await game_coins(network, launcher)
+        spend = eve_move_spend(mover, coins, make_move_sexp(0,2,1,3), INITIAL_BOARD)
+        after_first_move = await bob.push_tx(sign_with(spend, bob.sk_))
 
-            move = make_move_sexp(0,2,1,4)
-            maybeMove = SExp.to(move).cons(SExp.to([]))
+        assert 'error' in after_first_move.result
 
-            black_start = 0x205020502050205
-            source_mask = maskFor(0,2)
-            target_mask = maskFor(1,4)
-            black_move = black_start ^ source_mask ^ target_mask
-            fake_board = SExp.to([1, 0, 0xa040a040a040a040, black_move])
+        # The same spend signed by black goes through.
+        after_first_move = await alice.push_tx(sign_with(spend, alice.sk_))
+        assert 'error' not in after_first_move.result
 
-            args = SExp.to([[], maybeMove, [("board", fake_board), ("launcher", launched_coin.name())]])
-            after_first_move = await bob.spend_coin(
-                launched_coin,
-                push_tx=True,
-                amt=GAME_MOJO,
-                args=args
-            )
+    @pytest.mark.asyncio
+    async def test_can_move_each_player(self, inner_puzzle_code, network):
+        network, alice, bob = network
+
+        runner = CheckersMover(inner_puzzle_code, alice, bob)
+        launch_coin = await alice.choose_coin(GAME_MOJO)
+        launcher, launched_coin = await runner.launch_game(launch_coin)
+        assert launched_coin
+
+        coins = await game_coins(network, launcher)
+        assert await runner.make_move(coins, 0,2,1,3)
+
+        height = network.sim.get_height()
+        await runner.absorb_state(height, network.sim_client)
+        board = runner.get_board()
+        assert not board['blackmove']
+        assert not presentMask(board['black'], 0,2)
+        assert presentMask(board['black'], 1,3)
+
+        coins = await game_coins(network, launcher)
+        assert await runner.make_move(coins, 1,5,2,4)
+
+        height = network.sim.get_height()
+        await runner.absorb_state(height, network.sim_client)
+        board = runner.get_board()
+        assert board['blackmove']
+        assert not presentMask(board['red'], 1,5)
+        assert presentMask(board['red'], 2,4)
 
-            assert 'error' in after_first_move.result
+    @pytest.mark.asyncio
+    async def test_move_runs_its_puzzle_once(self, inner_puzzle_code, network):
+        network, alice, bob = network
 
-        finally:
-            await network.close()
+        runner = CheckersMover(inner_puzzle_code, alice, bob)
+        launch_coin = await alice.choose_coin(GAME_MOJO)
+        launcher, launched_coin = await runner.launch_game(launch_coin)
 
-    # Can't make invalid move.
-    @pytest.mark.asyncio
-    async def test_wrong_person_cant_move(self, setup):
-        inner_puzzle_code, network, alice, bob = setup
+        runs = METRICS.get('clvm', 'move_run').latency.count
+        coins = await game_coins(network, launcher)
+        assert await runner.make_move(coins, 0,2,1,3)
 
-        await network.farm_block(farmer=alice)
+        assert METRICS.get('clvm', 'move_run').latency.count == runs + 1
+        assert set(runner.move_breakdown) == {'board', 'puzzles', 'run', 'sign', 'push', 'cost'}
+        assert runner.move_breakdown['cost'] > 0
 
-        try:
-            mover = CheckersMover(inner_puzzle_code, alice, bob)
-            launch_coin = await alice.choose_coin(GAME_MOJO)
-            _, launched_coin = await mover.launch_game(launch_coin)
-            assert launched_coin
+        coins = await game_coins(network, launcher)
+        assert coins[-1]['coin'].coin == runner.pushed_coin
 
-            move = make_move_sexp(0,2,1,3)
-            maybeMove = SExp.to(move).cons(SExp.to([]))
+    @pytest.mark.asyncio
+    async def test_bad_moves_refused_before_pushing(self, inner_puzzle_code, network):
+        network, alice, bob = network
 
-            simArgs = SExp.to(["simulate", maybeMove, []])
-            cost, result = run_program(
-                launched_coin.puzzle(),
-                simArgs,
-                OPERATOR_LOOKUP
-            )
+        mover = CheckersMover(inner_puzzle_code, alice, bob)
+        launch_coin = await alice.choose_coin(GAME_MOJO)
+        launcher, launched_coin = await mover.launch_game(launch_coin)
 
-            args = SExp.to([[], maybeMove, [("board", result.get_tree_hash()), ("launcher", launched_coin.name())]])
-            after_first_move = await bob.spend_coin(
-                launched_coin,
-                push_tx=True,
-                amt=GAME_MOJO,
-                args=args
-            )
+        coins = await game_coins(network, launcher)
+        with pytest.raises(SpendRejected) as info:
+            await mover.make_move(coins, 0,2,1,4)
+        assert info.value.reason == ILLEGAL_MOVE
 
-            assert 'error' in after_first_move.result
+        assert await mover.make_move(coins, 0,2,1,3)
+        # Our board is still the first one, but the game has moved on.
+        coins = await game_coins(network, launcher)
+        with pytest.raises(SpendRejected) as info:
+            await mover.make_move(coins, 2,2,3,3)
+        assert info.value.reason == STALE_BOARD
 
-        finally:
-            await network.close()
+    @pytest.mark.asyncio
+    async def test_win_not_taken_early(self, inner_puzzle_code, network):
+        network, alice, bob = network
+
+        mover = CheckersMover(inner_puzzle_code, alice, bob)
+        launch_coin = await alice.choose_coin(GAME_MOJO)
+        launcher, launched_coin = await mover.launch_game(launch_coin)
+
+        # checkers.cl would let red take the coin here.
+        coins = await game_coins(network, launcher)
+        assert mover.get_winning_player() is None
+        with pytest.raises(ValueError):
+            mover.win_bundle(coins)
+
+        # A spend of the game naming no move is the win being taken.
+        win = mover.win_solution(LineageProof(launcher, None, GAME_MOJO))
+        payout = Coin(launched_coin.name(), bob.puzzle_hash, GAME_MOJO)
+        mover.take_new_coin(payout, bytes(win))
+        assert mover.claimed
+        assert mover.current_coin_name == payout.name()
 
     @pytest.mark.asyncio
-    async def test_can_move_each_player(self, setup):
-        inner_puzzle_code, network, alice, bob = setup
+    async def test_prepared_reply(self, inner_puzzle_code, network):
+        network, alice, bob = network
+
+        runner = CheckersMover(inner_puzzle_code, alice, bob)
+        launch_coin = await alice.choose_coin(GAME_MOJO)
+        launcher, launched_coin = await runner.launch_game(launch_coin)
 
-        await network.farm_block(farmer=alice)
+        coins = await game_coins(network, launcher)
+        assert await runner.make_move(coins, 0,2,1,3)
 
-        try:
-            runner = CheckersMover(inner_puzzle_code, alice, bob)
-            launch_coin = await alice.choose_coin(GAME_MOJO)
-            launch_coin, launched_coin = await runner.launch_game(launch_coin)
-            assert launched_coin
+        # Alice gets ready for each of bob's seven answers while he thinks.
+        speculator = Speculator(runner)
+        replies = await speculator.start()
+        assert len(replies) == 7
 
-            bare_coin = await runner.make_move(0,2,1,3)
-            assert bare_coin
+        await runner.absorb_state(network.sim.get_height(), network.sim_client)
+        coins = await game_coins(network, launcher)
+        assert await runner.make_move(coins, 1,5,0,4)
 
-            height = network.get_height()
-            await runner.absorb_state(height, network)
-            board = runner.get_board()
-            assert not presentMask(board['black'], 0,2)
-            assert presentMask(board['black'], 1,3)
+        await runner.absorb_state(network.sim.get_height(), network.sim_client)
+        prepared = speculator.reply_for(runner.current_coin_name)
+        assert prepared.opponent_move == (1,5,0,4)
 
-            bare_coin = await runner.make_move(1,5,2,4)
-            assert bare_coin
+        result = await speculator.respond(runner.current_coin_name)
+        assert 'error' not in result.result
 
-            height = network.get_height()
-            await runner.absorb_state(height, network)
-            board = runner.get_board()
-            assert not presentMask(board['red'], 1,5)
-            assert presentMask(board['red'], 2,4)
+        await runner.absorb_state(network.sim.get_height(), network.sim_client)
+        coins = await game_coins(network, launcher)
+        assert coins[-1]['coin'].coin.puzzle_hash == prepared.next_puzzle_hash
+        assert not runner.get_board()['blackmove']
+
+    @pytest.mark.asyncio
+    async def test_games_dont_leak_between_tests(self, inner_puzzle_code, network):
+        network, alice, bob = network
 
-        finally:
-            await network.close()
+        # Whatever other tests launched, forking gives back the funded state:
+        # a pool and farmer reward for each block alice farmed.
+        assert network.sim.get_height() == 2 * FUNDING_BLOCKS - 1
+        assert len(alice.usable_coins) == 2 * FUNDING_BLOCKS
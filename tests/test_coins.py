@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('chia')
+
+from chia.types.blockchain_format.coin import Coin
+from chia.util.ints import uint64
+
+import wallet.coins
+from wallet import tohex
+from wallet.coins import RESERVATION_SECONDS, CoinIndex
+
+PUZZLE_HASH = bytes([9] * 32)
+
+def coin(i, amount):
+    return Coin(bytes([i] * 32), PUZZLE_HASH, uint64(amount))
+
+def transaction(i, additions=[], removals=[]):
+    return SimpleNamespace(name=bytes([200 + i] * 32), additions=additions, removals=removals)
+
+def funded(db, amounts, banned=set()):
+    coins = CoinIndex(db, 'testnet', banned)
+    made = [coin(i + 1, amount) for i, amount in enumerate(amounts)]
+    coins.apply_transactions([transaction(0, additions=made)])
+    return coins, made
+
+class TestCoinIndex:
+    def test_smallest_first(self):
+        coins, made = funded(sqlite3.connect(':memory:'), [500, 100, 300, 50])
+        assert coins.reserve(100) == made[1]
+        assert coins.reserve(100) == made[2]
+        assert coins.reserve(100) == made[0]
+        assert coins.reserve(100) is None
+        assert coins.unreserved() == [made[3]]
+
+    def test_banned(self):
+        db = sqlite3.connect(':memory:')
+        banned = {tohex(coin(2, 100).name())}
+        coins, made = funded(db, [500, 100, 300], banned)
+        assert made[1] not in coins.unreserved()
+        assert coins.reserve(100) == made[2]
+        assert coins.reserve(100) == made[0]
+        assert coins.reserve(1) is None
+
+        # Another process's list is its own.
+        assert CoinIndex(sqlite3.connect(':memory:'), 'testnet').unreserved() == []
+
+    def test_release_and_spent(self):
+        coins, made = funded(sqlite3.connect(':memory:'), [100, 200])
+        assert coins.reserve(100) == made[0]
+        coins.release(made[0].name())
+        assert coins.reserve(100) == made[0]
+
+        coins.spent([made[0].name()])
+        coins.release(made[0].name())
+        assert coins.reserve(100) == made[1]
+        assert coins.reserve(100) is None
+
+    def test_reservations_expire(self, monkeypatch):
+        coins, made = funded(sqlite3.connect(':memory:'), [100])
+        assert coins.reserve(100) == made[0]
+        assert coins.reserve(100) is None
+
+        now = wallet.coins.time.time()
+        monkeypatch.setattr(wallet.coins.time, 'time', lambda: now + RESERVATION_SECONDS + 1)
+        assert coins.reserve(100) == made[0]
+
+    def test_transactions_apply_once(self):
+        coins, made = funded(sqlite3.connect(':memory:'), [100, 200])
+        change = coin(7, 150)
+        spend = transaction(1, additions=[change], removals=[made[1]])
+        assert coins.apply_transactions([spend]) == 1
+        assert coins.unreserved() == [made[0], change]
+
+        # Replaying the history changes nothing, even once coins are spent.
+        coins.spent([change.name()])
+        assert coins.apply_transactions([transaction(0, additions=made), spend]) == 0
+        assert coins.unreserved() == [made[0]]
+
+        # A coin created by a transaction spends its parent.
+        assert coins.apply_transactions([transaction(2, additions=[Coin(made[0].name(), PUZZLE_HASH, uint64(90))])]) == 1
+        assert [c.amount for c in coins.unreserved()] == [90]
+
+    def test_inside_shared_transaction(self):
+        db = sqlite3.connect(':memory:')
+        coins, made = funded(db, [100])
+        db.execute('create table games (launcher text)')
+        db.commit()
+
+        # GameRecords may have written without committing yet.
+        db.execute("insert into games values ('a')")
+        assert db.in_transaction
+        assert coins.reserve(100) == made[0]
+        assert db.execute('select count(*) from games').fetchall() == [(1,)]
+
+    def test_concurrent_processes(self, tmp_path):
+        path = str(tmp_path / 'checkers.db')
+        _, made = funded(sqlite3.connect(path), [100 + i for i in range(40)])
+
+        chosen = []
+        def launch():
+            coins = CoinIndex(sqlite3.connect(path, timeout=30), 'testnet')
+            while True:
+                c = coins.reserve(100)
+                if c is None:
+                    return
+                chosen.append(c.name())
+
+        launchers = [threading.Thread(target=launch) for _ in range(4)]
+        for t in launchers:
+            t.start()
+        for t in launchers:
+            t.join()
+
+        assert sorted(chosen) == sorted(c.name() for c in made)
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from wallet.config import ChiaConfig
+
+CONFIG = '''selected_network: testnet10
+farmer:
+  network_overrides:
+    constants:
+      mainnet:
+        GENESIS_CHALLENGE: ccd5bb71183532bff220ba46c268991a3ff07eb358e8255a65c30a2dce0e5fbb
+      testnet10:
+        AGG_SIG_ME_ADDITIONAL_DATA: ae83525ba8d1dd3f09b277de18ca3e43fc0af20d20c4b3e92ef2a48bd291ccb2
+'''
+
+TESTNET10 = bytes.fromhex('ae83525ba8d1dd3f09b277de18ca3e43fc0af20d20c4b3e92ef2a48bd291ccb2')
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'config').mkdir()
+    (tmp_path / 'config' / 'config.yaml').write_text(CONFIG)
+    return tmp_path
+
+class NoParse(ChiaConfig):
+    def get(self):
+        raise AssertionError('config.yaml was parsed')
+
+class TestConfig:
+    def test_cached_value_needs_no_parse(self, root, tmp_path):
+        cache = str(tmp_path / 'cache.json')
+        first = ChiaConfig(root, cache)
+        first.remember('agg_sig_me_additional_data', TESTNET10.hex())
+
+        assert NoParse(root, cache).agg_sig_me_additional_data() == TESTNET10
+
+    def test_changed_config_is_parsed_again(self, root, tmp_path):
+        cache = str(tmp_path / 'cache.json')
+        ChiaConfig(root, cache).remember('agg_sig_me_additional_data', '00')
+
+        config_file = root / 'config' / 'config.yaml'
+        st = os.stat(config_file)
+        os.utime(config_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+
+        with pytest.raises(AssertionError):
+            NoParse(root, cache).agg_sig_me_additional_data()
+
+    def test_parses_once(self, root, tmp_path):
+        pytest.importorskip('chia.util.config')
+
+        cache = str(tmp_path / 'cache.json')
+        config = ChiaConfig(root, cache)
+        assert config.agg_sig_me_additional_data() == TESTNET10
+        assert config.get() is config.get()
+
+        # The next process reads it from the cache.
+        assert NoParse(root, cache).agg_sig_me_additional_data() == TESTNET10
+
+    def test_importing_the_wallet_reads_no_config(self):
+        pytest.importorskip('chia')
+
+        # A fresh interpreter, since this one may have signed already.
+        check = 'import wallet, wallet.live; assert wallet.AGG_SIG_ME_ADDITIONAL_DATA_ is None'
+        subprocess.run([sys.executable, '-c', check], check=True, cwd=os.path.join(os.path.dirname(__file__), '..'))
+
+    def test_cache_beside_config(self, root, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        config = ChiaConfig(root)
+        config.remember('agg_sig_me_additional_data', TESTNET10.hex())
+
+        assert (root / 'config' / 'checkers-config.json').exists()
+        assert not (tmp_path / 'checkers-config.json').exists()
+        assert NoParse(root).agg_sig_me_additional_data() == TESTNET10
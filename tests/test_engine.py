@@ -0,0 +1,72 @@
+import random
+
+from checkers.engine import (
+    BLACK, RED, INITIAL_BOARD, apply_move, best_move, checker_at, has_legal_move, legal_moves, maskFor, random_game, winner
+)
+from checkers.fuzz import Contract
+
+def board_with(next_color, black=[], red=[], kings=[]):
+    return (
+        next_color,
+        sum(maskFor(x,y) for x, y in kings),
+        sum(maskFor(x,y) for x, y in red),
+        sum(maskFor(x,y) for x, y in black)
+    )
+
+class TestEngine:
+    def test_opening_moves(self):
+        assert sorted(legal_moves(INITIAL_BOARD)) == [
+            (0,2,1,3), (2,2,1,3), (2,2,3,3), (4,2,3,3), (4,2,5,3), (6,2,5,3), (6,2,7,3)
+        ]
+
+    def test_jump_removes_piece(self):
+        board = board_with(BLACK, black=[(2,2)], red=[(3,3)])
+        assert (2,2,4,4) in legal_moves(board)
+        assert apply_move(board,2,2,4,4) == board_with(RED, black=[(4,4)])
+
+    def test_pawns_only_go_forward(self):
+        board = board_with(BLACK, black=[(2,2)], red=[(5,5)])
+        assert apply_move(board,2,2,1,1) is None
+        assert apply_move(board_with(RED, red=[(5,5)]),5,5,6,6) is None
+
+    def test_kings(self):
+        board = board_with(RED, black=[(1,6)], red=[(2,1)])
+        after = apply_move(board,2,1,1,0)
+        assert checker_at(after,1,0) == (True, RED)
+        # A king goes backward.
+        assert apply_move(board_with(RED, red=[(1,0)], kings=[(1,0)]),1,0,2,1) is not None
+
+    def test_refuses_off_board(self):
+        board = board_with(BLACK, black=[(7,1)])
+        assert apply_move(board,7,1,8,2) is None
+        assert apply_move(board,7,1,6,0) is None
+
+    def test_winner(self):
+        assert winner(INITIAL_BOARD) is None
+        assert winner(board_with(RED, black=[(1,1)])) == BLACK
+        # Blocked in counts as lost.
+        assert winner(board_with(BLACK, black=[(0,6)], red=[(1,7)])) == RED
+
+    def test_has_legal_move(self):
+        rng = random.Random(3)
+        board = INITIAL_BOARD
+        for move in random_game(rng, 200):
+            assert has_legal_move(board) == bool(legal_moves(board))
+            board = apply_move(board, *move)
+        assert has_legal_move(board) == bool(legal_moves(board))
+
+    def test_best_move(self):
+        # Takes a piece rather than stepping.
+        board = board_with(BLACK, black=[(2,2), (6,0)], red=[(3,3), (0,6)])
+        assert best_move(board) == (2,2,4,4)
+        # Ends the game when it can.
+        board = board_with(RED, black=[(2,2)], red=[(3,3)])
+        assert winner(apply_move(board, *best_move(board))) == RED
+        assert best_move(board_with(BLACK, red=[(3,3)])) is None
+
+    def test_agrees_with_contract(self):
+        contract = Contract()
+        board = INITIAL_BOARD
+        for move in random_game(random.Random(1), 8):
+            assert contract.simulate(board, move) == apply_move(board, *move)
+            board = apply_move(board, *move)
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from checkers.engine import INITIAL_BOARD
+from checkers.gamerecords import block_height_and_hash
+from checkers.mempool import MempoolWatcher
+from checkers.solution import inspect_solution, move_from_solution
+from support.fakenode import FakeFullNode, SyntheticChain
+
+def played_chain(games=20, blocks=30, moves_per_block=8):
+    node = FakeFullNode()
+    chain = SyntheticChain(node, noise_per_block=3)
+    launchers = chain.launch(games)
+    chain.extend(blocks, moves_per_block)
+    return node, chain, launchers
+
+async def game_trail(node, launcher):
+    """
+    The spends of a game's coins from its launcher, found the way
+    CheckersRunnerWallet.get_parent_coins finds them.
+    """
+    spends = []
+    name = launcher
+    while True:
+        children = await node.get_coin_records_by_parent_ids([name])
+        if not children or not children[0].spent:
+            return spends, children[0] if children else None
+        spends.append(await node.get_puzzle_and_solution(children[0].name, children[0].spent_block_index))
+        name = children[0].name
+
+class PendingMover:
+    def __init__(self, current_coin_name):
+        self.current_coin_name = current_coin_name
+        self.created = None
+
+    def take_pending_spend(self, spent, solution, tx_id, created):
+        self.created = created
+        return created
+
+class TestFakeNode:
+    def test_games_replay_from_spends(self):
+        node, chain, launchers = played_chain()
+
+        for launcher in launchers:
+            spends, newest = asyncio.run(game_trail(node, launcher))
+            game = chain.game(launcher)
+            assert len(spends) == game.ply
+            assert newest.name == game.coin.name()
+
+            board = INITIAL_BOARD
+            for spend in spends:
+                found, atoms = inspect_solution(spend.solution, launcher)
+                assert found == launcher
+                assert move_from_solution(spend.solution) is not None
+                board = tuple(int.from_bytes(a, 'big') for a in atoms)
+            assert board == game.board
+
+    def test_blocks_hold_their_spends(self):
+        node, chain, _ = played_chain()
+
+        records = asyncio.run(node.get_block_records(1, node.height + 1))
+        assert [block_height_and_hash(r)[0] for r in records] == list(range(1, node.height + 1))
+
+        moves = 0
+        for height in range(2, node.height + 1):
+            block = asyncio.run(node.get_block_record_by_height(height))
+            additions, removals = asyncio.run(node.get_additions_and_removals(block.header_hash))
+            assert all(r.spent_block_index == height for r in removals)
+            assert all(a.confirmed_block_index == height for a in additions)
+            moves += sum(1 for a in additions if a.coin.amount == 1)
+        assert moves == chain.moves_made
+
+    def test_rejects_double_spends(self):
+        node, chain, launchers = played_chain(games=1, blocks=0)
+        game = chain.game(launchers[0])
+        spent = game.coin
+        chain.move(game)
+        node.farm_block()
+
+        game.coin = spent
+        with pytest.raises(ValueError):
+            chain.move(game)
+
+    def test_mempool_moves(self):
+        node, chain, launchers = played_chain(games=4, blocks=2)
+        game = chain.game(launchers[0])
+        mover = PendingMover(game.coin.name())
+
+        for other in chain.games:
+            chain.move(other)
+        chain.add_noise()
+
+        watcher = MempoolWatcher(node)
+        watcher.track(mover)
+        asyncio.run(watcher.poll())
+        assert mover.created == game.coin.name()
+
+    def test_latency(self):
+        async def burst(node):
+            await asyncio.gather(*(node.get_blockchain_state() for _ in range(50)))
+
+        node = FakeFullNode(latency=0.01)
+        asyncio.run(burst(node))
+        assert node.calls['get_blockchain_state'] == 50
+
+    def test_syncs_a_mover(self, tmp_path, monkeypatch):
+        pytest.importorskip('chia')
+        from checkers.driver import CheckersMover
+        from checkers.gamerecords import GameRecords
+
+        node, chain, launchers = played_chain()
+        monkeypatch.chdir(tmp_path)
+        mover = CheckersMover(None, None, None, launcher_name=launchers[3])
+        records = GameRecords(1, 'fake', mover, node)
+        records.set_current_block(0)
+        asyncio.run(records.update_to_current_block(0))
+
+        game = chain.game(launchers[3])
+        assert mover.current_coin_name == game.coin.name()
+        assert len(records.history_rows()) == game.ply
+        records.close()
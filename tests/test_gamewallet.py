@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from gamewallet import make_parser, translate_legacy
+
+GAMEWALLET = os.path.join(os.path.dirname(__file__), '..', 'gamewallet.py')
+
+# What the command line may cost to import before a command needs more, in
+# milliseconds.  Python itself and argparse/asyncio take well under this.
+IMPORT_BUDGET_MS = 400
+
+# Modules only commands that talk to the node or sign may load.
+HEAVY_MODULES = ['chia', 'blspy', 'cdv', 'yaml', 'aiohttp', 'checkers.driver', 'wallet.live']
+
+def imports(args, cwd):
+    """
+    (name, cumulative microseconds) of each top level import made running
+    gamewallet.py with args, from python -X importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.abspath(GAMEWALLET)] + args,
+        cwd=cwd, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((name.rstrip(), int(cumulative)))
+    return modules
+
+def loaded(modules, prefix):
+    return [name for name, _ in modules if name.strip() == prefix or name.strip().startswith(prefix + '.')]
+
+class TestCommandLine:
+    def test_legacy_command_lines(self):
+        assert translate_legacy(['--launch', 'ab']) == ['launch', 'ab']
+        assert translate_legacy(['--launch-many', 'ab', 'cd']) == ['launch-many', 'ab', 'cd']
+        assert translate_legacy(['--export-history', 'f']) == ['export-history', 'f']
+        assert translate_legacy(['aa-bb-cc']) == ['show', 'aa-bb-cc']
+        assert translate_legacy(['aa-bb-cc', '0,2:1,3']) == ['move', 'aa-bb-cc', '0,2:1,3']
+        assert translate_legacy(['launch-many', 'ab']) == ['launch-many', 'ab']
+
+    def test_parses_moves(self):
+        args = make_parser().parse_args(['move', 'aa-bb-cc', '0,2:1,3'])
+        assert args.move == (0, 2, 1, 3)
+        with pytest.raises(SystemExit):
+            make_parser().parse_args(['move', 'aa-bb-cc', '0,2'])
+
+    @pytest.mark.parametrize('args', [['--help'], ['export-history', 'games.hist'], ['build-book']])
+    def test_light_commands_import_little(self, args, tmp_path):
+        modules = imports(args, str(tmp_path))
+
+        for prefix in HEAVY_MODULES:
+            assert not loaded(modules, prefix), f'{" ".join(args)} imported {prefix}'
+
+        total = sum(cumulative for name, cumulative in modules if not name.startswith(' '))
+        assert total < IMPORT_BUDGET_MS * 1000, f'imports took {total / 1000:.0f}ms'
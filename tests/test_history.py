@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from checkers.engine import INITIAL_BOARD, apply_move, move_number, random_game
+from checkers.history import HistoryRow, read_history, write_history
+
+def game_rows(seed, plies=30):
+    launcher = bytes([seed]) * 32
+    board = INITIAL_BOARD
+    rows = []
+    for ply, move in enumerate(random_game(random.Random(seed), plies)):
+        board = apply_move(board, *move)
+        coin = bytes([seed, ply]) * 16
+        rows.append(HistoryRow(launcher, ply, move_number(*move), board[0], board[1], board[2], board[3], 1000 + ply, coin))
+    return rows
+
+class TestHistoryFile:
+    def test_round_trip(self, tmp_path):
+        rows = game_rows(1) + game_rows(2)
+        path = str(tmp_path / 'games.hist')
+        write_history(path, rows)
+        assert read_history(path) == rows
+
+    def test_compact(self, tmp_path):
+        rows = sum((game_rows(seed) for seed in range(10)), [])
+        path = tmp_path / 'games.hist'
+        write_history(str(path), rows)
+        # Coin ids don't compress; everything else should mostly vanish.
+        assert path.stat().st_size < len(rows) * 48
+
+    def test_rejects_off_board_masks(self, tmp_path):
+        row = game_rows(1)[0]._replace(black=1 << 66)
+        with pytest.raises(ValueError):
+            write_history(str(tmp_path / 'games.hist'), [row])
+
+    def test_rejects_damaged_files(self, tmp_path):
+        path = tmp_path / 'games.hist'
+        write_history(str(path), game_rows(1))
+        data = path.read_bytes()
+
+        path.write_bytes(data[:len(data) // 2])
+        with pytest.raises(ValueError):
+            read_history(str(path))
+
+        path.write_bytes(b'not a history file')
+        with pytest.raises(ValueError):
+            read_history(str(path))
+
+class TestGameRecordsHistory:
+    def test_export_and_import(self, tmp_path, monkeypatch):
+        from checkers.gamerecords import GameRecords
+
+        (tmp_path / 'a').mkdir()
+        (tmp_path / 'b').mkdir()
+
+        monkeypatch.chdir(tmp_path / 'a')
+        records = GameRecords(1, 'testnet', None, None)
+        launcher = bytes([9]) * 32
+        seen = [
+            (row.coin, row.move, [row.next, row.king, row.red, row.black], row.height)
+            for row in game_rows(9, 6)
+        ]
+        records.record_moves(launcher, seen[:4])
+        # Seen again after a restart: kept once.
+        records.record_moves(launcher, seen[2:])
+        assert records.export_history(str(tmp_path / 'games.hist')) == 6
+        records.close()
+
+        monkeypatch.chdir(tmp_path / 'b')
+        records = GameRecords(1, 'testnet', None, None)
+        assert records.import_history(str(tmp_path / 'games.hist')) == 6
+
+        rows = records.history_rows()
+        assert [r.ply for r in rows] == list(range(6))
+        coin, board = records.get_coin_for_launcher(launcher)
+        assert coin == rows[-1].coin.hex()
+        assert board['red'] == rows[-1].red
+        records.close()
+
+    def test_first_seen_mid_game(self, tmp_path, monkeypatch):
+        from checkers.gamerecords import GameRecords
+
+        monkeypatch.chdir(tmp_path)
+        records = GameRecords(1, 'testnet', None, None)
+        launcher = bytes([9]) * 32
+        rows = game_rows(9, 6)
+        records.record_moves(launcher, [(r.coin, r.move, [r.next, r.king, r.red, r.black], r.height) for r in rows])
+        assert [r.ply for r in records.history_rows()] == list(range(6))
+        records.export_history(str(tmp_path / 'games.hist'))
+        records.db.execute('delete from moves')
+        records.db.commit()
+
+        # Synced from the fourth move on: nothing can be placed in the game.
+        records.record_moves(launcher, [(r.coin, r.move, [r.next, r.king, r.red, r.black], r.height) for r in rows[3:]])
+        assert records.history_rows() == []
+        assert records.build_book(str(tmp_path / 'checkers.book')) == 0
+
+        # Until the history from the start turns up.
+        records.import_history(str(tmp_path / 'games.hist'))
+        assert records.history_rows() == rows
+        records.close()
@@ -0,0 +1,52 @@
+import pytest
+
+blspy = pytest.importorskip('blspy')
+pytest.importorskip('chia')
+
+from blspy import AugSchemeMPL
+
+from chia.wallet.derive_keys import master_sk_to_wallet_sk
+from chia.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
+    calculate_synthetic_public_key,
+    calculate_synthetic_secret_key,
+    DEFAULT_HIDDEN_PUZZLE_HASH,
+)
+
+from wallet.keyring import KeyRing
+
+MASTER_SK = AugSchemeMPL.key_gen(bytes([7] * 32))
+FINGERPRINT = MASTER_SK.get_g1().get_fingerprint()
+
+def keyring():
+    keys = KeyRing()
+    keys.add_master_sk(FINGERPRINT, MASTER_SK)
+    return keys
+
+class TestKeyRing:
+    def test_derive_matches_chia(self):
+        keys = keyring()
+        for index in (0, 1, 999):
+            sk, pk = keys.derive(FINGERPRINT, index)
+            assert sk == master_sk_to_wallet_sk(MASTER_SK, index)
+            assert pk == sk.get_g1()
+            assert keys.sk_for_pk(pk) == sk
+
+    def test_derive_once(self):
+        keys = keyring()
+        assert keys.derive(FINGERPRINT, 3) is keys.derive(FINGERPRINT, 3)
+
+    def test_synthetic_key(self):
+        keys = keyring()
+        sk, pk = keys.derive(FINGERPRINT, 2)
+        synthetic_pk = calculate_synthetic_public_key(pk, DEFAULT_HIDDEN_PUZZLE_HASH)
+        assert keys.sk_for_pk(synthetic_pk) is None
+
+        keys.add(sk, pk)
+        synthetic_sk = keys.sk_for_pk(synthetic_pk)
+        assert synthetic_sk == calculate_synthetic_secret_key(sk, DEFAULT_HIDDEN_PUZZLE_HASH)
+        assert synthetic_sk.get_g1() == synthetic_pk
+        assert keys.sk_for_pk(pk) == sk
+
+    def test_unknown_key(self):
+        keys = keyring()
+        assert keys.sk_for_pk(AugSchemeMPL.key_gen(bytes([8] * 32)).get_g1()) is None
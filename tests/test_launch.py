@@ -0,0 +1,123 @@
+import pytest
+
+pytest.importorskip('chia')
+
+from blspy import AugSchemeMPL, G1Element
+
+from chia.consensus.default_constants import DEFAULT_CONSTANTS
+from chia.util.condition_tools import conditions_dict_for_solution, pkm_pairs_for_conditions_dict
+from chia.wallet.derive_keys import master_sk_to_wallet_sk
+from chia.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import puzzle_for_pk
+
+from cdv.test import CoinWrapper
+from cdv.util.load_clvm import load_clvm
+
+from checkers.driver import CheckersMover, launch_games, GAME_MOJO
+from wallet import AGG_SIG_ME_ADDITIONAL_DATA
+from wallet.live import CheckersRunnerWallet
+from wallet.notme import NotMeWallet
+
+MASTER_SK = AugSchemeMPL.key_gen(bytes([3] * 32))
+FUNDING_INDEX = 5
+GAMES = 4
+
+class FakeWalletRpc:
+    async def get_private_key(self, fingerprint):
+        return {'sk': bytes(MASTER_SK).hex()}
+
+class FakeRecords:
+    def set_self_hash(self, puzzle_hash):
+        pass
+
+class FakeCoins:
+    def __init__(self):
+        self.spent_names = []
+
+    def spent(self, names):
+        self.spent_names += names
+
+    def release(self, name):
+        pass
+
+class FakeNode:
+    def __init__(self):
+        self.pushed = []
+
+    async def push_tx(self, bundle):
+        self.pushed.append(bundle)
+        return {'status': 'SUCCESS'}
+
+def make_wallet():
+    wallet = CheckersRunnerWallet('test', 1)
+    wallet.wallet_rpc_client = FakeWalletRpc()
+    wallet.parent = FakeNode()
+    wallet.public_key_fingerprints = [1]
+    wallet.game_records = FakeRecords()
+    wallet.coins = FakeCoins()
+    return wallet
+
+def check_signature(bundle):
+    pks = []
+    msgs = []
+    for spend in bundle.coin_spends:
+        error, conditions, cost = conditions_dict_for_solution(
+            spend.puzzle_reveal, spend.solution, DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM
+        )
+        assert error is None
+        for pk, msg in pkm_pairs_for_conditions_dict(conditions, spend.coin.name(), AGG_SIG_ME_ADDITIONAL_DATA):
+            pks.append(G1Element.from_bytes(pk))
+            msgs.append(msg)
+
+    return AugSchemeMPL.aggregate_verify(pks, msgs, bundle.aggregated_signature)
+
+class TestBulkLaunch:
+    @pytest.mark.asyncio
+    async def test_launch_games_in_one_bundle(self):
+        inner_puzzle_code = load_clvm("checkers.cl", "checkers.code", search_paths=["checkers/code"])
+        wallet = make_wallet()
+
+        funding_puzzle = puzzle_for_pk(master_sk_to_wallet_sk(MASTER_SK, FUNDING_INDEX).get_g1())
+        funding_coin = CoinWrapper(bytes(32), funding_puzzle.get_tree_hash(), 1000, funding_puzzle)
+
+        movers = []
+        for i in range(GAMES):
+            red = NotMeWallet(master_sk_to_wallet_sk(MASTER_SK, 100 + i).get_g1())
+            movers.append(CheckersMover(inner_puzzle_code, wallet, red))
+
+        launched = await launch_games(wallet, movers, funding_coin)
+
+        assert len(wallet.parent.pushed) == 1
+        bundle = wallet.parent.pushed[0]
+
+        # Every launcher and eve coin is distinct and made by this bundle.
+        launchers = [launcher for launcher, _ in launched]
+        assert len(set(launchers)) == GAMES
+        additions = set(c.name() for c in bundle.additions())
+        for launcher, eve_coin in launched:
+            assert launcher in additions
+            assert eve_coin.name() in additions
+
+        # Only the funding coin leaves the wallet; the rest are made and spent here.
+        assert [c.name() for c in bundle.removals() if c.name() not in additions] == [funding_coin.name()]
+        assert wallet.coins.spent_names[0] == funding_coin.name()
+
+        change = [c for c in bundle.additions() if c.puzzle_hash == wallet.puzzle_hash]
+        assert [c.amount for c in change] == [1000 - GAMES * GAME_MOJO]
+
+        assert check_signature(bundle)
+
+    @pytest.mark.asyncio
+    async def test_funding_coin_too_small(self):
+        inner_puzzle_code = load_clvm("checkers.cl", "checkers.code", search_paths=["checkers/code"])
+        wallet = make_wallet()
+
+        funding_puzzle = puzzle_for_pk(master_sk_to_wallet_sk(MASTER_SK, FUNDING_INDEX).get_g1())
+        funding_coin = CoinWrapper(bytes(32), funding_puzzle.get_tree_hash(), GAMES * GAME_MOJO - 1, funding_puzzle)
+        movers = [
+            CheckersMover(inner_puzzle_code, wallet, NotMeWallet(master_sk_to_wallet_sk(MASTER_SK, 100 + i).get_g1()))
+            for i in range(GAMES)
+        ]
+
+        with pytest.raises(ValueError):
+            await launch_games(wallet, movers, funding_coin)
+        assert wallet.parent.pushed == []
@@ -0,0 +1,102 @@
+import asyncio
+import sqlite3
+
+from checkers.engine import BLACK, INITIAL_BOARD, apply_move
+from checkers.leaderboard import START_RATING, GameResult, Leaderboard, PlayedMove, move_counts, rate
+from checkers.observer import CONTRACT_HEX, GameObserver
+from support.fakenode import FakeFullNode, SyntheticChain
+
+ALICE = bytes([1] * 48)
+BOB = bytes([2] * 48)
+CAROL = bytes([3] * 48)
+
+def absorb(leaderboard, moves=[], results=[]):
+    cursor = leaderboard.db.cursor()
+    leaderboard.absorb(cursor, moves, results)
+    cursor.close()
+    leaderboard.db.commit()
+
+def result(winner, loser, early=False):
+    return GameResult(winner, loser, early, 1)
+
+class TestLeaderboard:
+    def test_ratings(self):
+        assert rate(1500, 1500) == (1516, 1484)
+        better, worse = rate(1700, 1300)
+        assert 1700 < better < 1716 and worse == 1300 - (better - 1700)
+
+        leaderboard = Leaderboard(sqlite3.connect(':memory:'))
+        absorb(leaderboard, results=[result(ALICE, BOB), result(ALICE, CAROL)])
+        absorb(leaderboard, results=[result(BOB, CAROL)])
+
+        alice = leaderboard.player(ALICE)
+        assert (alice.games, alice.wins, alice.losses, alice.win_rate) == (2, 2, 0, 1.0)
+        assert alice.rating > START_RATING
+        assert leaderboard.player(BOB).win_rate == 0.5
+        assert [p.pk for p in leaderboard.top()] == [ALICE, BOB, CAROL]
+        assert [leaderboard.rank(pk) for pk in (ALICE, BOB, CAROL)] == [1, 2, 3]
+        assert leaderboard.player(bytes(48)) is None
+
+    def test_same_as_all_at_once(self):
+        games = [result(ALICE, BOB), result(BOB, CAROL), result(CAROL, ALICE), result(ALICE, CAROL)]
+        apart = Leaderboard(sqlite3.connect(':memory:'))
+        for game in games:
+            absorb(apart, results=[game])
+        together = Leaderboard(sqlite3.connect(':memory:'))
+        absorb(together, results=games)
+
+        assert apart.top() == together.top()
+
+    def test_early_wins_are_not_rated(self):
+        leaderboard = Leaderboard(sqlite3.connect(':memory:'))
+        absorb(leaderboard, results=[result(ALICE, BOB, early=True), result(CAROL, CAROL)])
+
+        alice = leaderboard.player(ALICE)
+        assert (alice.rating, alice.games, alice.early_wins) == (START_RATING, 0, 1)
+        assert leaderboard.player(BOB).early_losses == 1
+        assert leaderboard.player(CAROL) is None
+        assert leaderboard.top() == [] and leaderboard.rank(ALICE) is None
+
+    def test_move_statistics(self):
+        board = INITIAL_BOARD
+        moves = []
+        for move in [(0, 2, 1, 3), (3, 5, 2, 4), (1, 3, 3, 5)]:
+            after = apply_move(board, *move)
+            moves.append(PlayedMove(ALICE if board[0] == BLACK else BOB, board, after))
+            board = after
+
+        assert [move_counts(m) for m in moves] == [(0, 0), (0, 0), (1, 0)]
+        king = (BLACK, 0, 0, 1 << (8 * 1 + 6))
+        crowned = apply_move(king, 1, 6, 0, 7)
+        assert move_counts(PlayedMove(ALICE, king, crowned)) == (0, 1)
+
+        leaderboard = Leaderboard(sqlite3.connect(':memory:'))
+        absorb(leaderboard, moves)
+        alice = leaderboard.player(ALICE)
+        assert (alice.moves, alice.captures, alice.games) == (2, 1, 0)
+        assert leaderboard.player(BOB).moves == 1
+
+    def test_kept_up_by_the_observer(self, tmp_path):
+        node = FakeFullNode()
+        with open(CONTRACT_HEX) as f:
+            chain = SyntheticChain(node, noise_per_block=2, inner_puzzle=bytes.fromhex(f.read().strip()))
+        chain.launch(12)
+        chain.extend(10, 6)
+        for game in chain.games[:6]:
+            chain.take_win(game)
+        node.farm_block()
+
+        watching = GameObserver('test', node, path=str(tmp_path / 'checkers.db'), confirmations=0)
+        watching.batch_blocks = 4
+        asyncio.run(watching.sync())
+        leaderboard = watching.leaderboard
+        kept = leaderboard.top(100, min_games=0)
+
+        moved = sum(p.moves for p in kept)
+        assert moved == chain.moves_made
+        won = sum(p.wins + p.early_wins for p in kept)
+        assert won == len([g for g in chain.games if g.won is not None and g.black_pk != g.red_pk])
+
+        # Only when each player was last seen differs.
+        assert watching.rebuild_leaderboard() == len(kept)
+        assert [p._replace(updated=0) for p in leaderboard.top(100, min_games=0)] == [p._replace(updated=0) for p in kept]
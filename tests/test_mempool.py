@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+
+import pytest
+from clvm.casts import int_to_bytes
+
+from checkers.mempool import MempoolWatcher, PendingMove, coin_name_from_json
+
+def coin_json(parent, puzzle_hash, amount):
+    return {'parent_coin_info': '0x' + parent.hex(), 'puzzle_hash': '0x' + puzzle_hash.hex(), 'amount': amount}
+
+def name(parent, puzzle_hash, amount):
+    return hashlib.sha256(parent + puzzle_hash + int_to_bytes(amount)).digest()
+
+GAME_PARENT = bytes([1]) * 32
+GAME_PUZZLE = bytes([2]) * 32
+GAME_COIN = name(GAME_PARENT, GAME_PUZZLE, 1)
+
+def bundle(spent, solution, additions=[]):
+    return {
+        'spend_bundle': {
+            'coin_solutions': [{'coin': spent, 'puzzle_reveal': '0x80', 'solution': '0x' + solution.hex()}],
+            'aggregated_signature': '0xc0' + '00' * 95
+        },
+        'additions': additions
+    }
+
+class FakeNode:
+    def __init__(self):
+        self.mempool = {}
+        self.fetched = []
+
+    async def get_all_mempool_tx_ids(self):
+        return list(self.mempool)
+
+    async def get_mempool_item_by_tx_id(self, tx_id):
+        self.fetched.append(tx_id)
+        return self.mempool.get(tx_id)
+
+class FakeMover:
+    def __init__(self, current_coin_name):
+        self.current_coin_name = current_coin_name
+        self.pending = None
+
+    def take_pending_spend(self, spent, solution, tx_id, created):
+        self.pending = PendingMove(spent, tx_id, int.from_bytes(solution, 'big'), [], created)
+        return self.pending
+
+class TestMempoolWatcher:
+    def test_coin_names(self):
+        assert coin_name_from_json(coin_json(GAME_PARENT, GAME_PUZZLE, 1)) == GAME_COIN
+        # Amounts with the top bit set gain a zero byte, as in clvm.
+        assert coin_name_from_json(coin_json(GAME_PARENT, GAME_PUZZLE, 200)) == \
+            hashlib.sha256(GAME_PARENT + GAME_PUZZLE + bytes([0, 200])).digest()
+
+    def test_finds_spends_of_our_coin(self):
+        node = FakeNode()
+        mover = FakeMover(GAME_COIN)
+        watcher = MempoolWatcher(node)
+        watcher.track(mover)
+
+        next_puzzle = bytes([3]) * 32
+        node.mempool[b'other'] = bundle(coin_json(bytes(32), GAME_PUZZLE, 1), b'\x01')
+        node.mempool[b'move'] = bundle(
+            coin_json(GAME_PARENT, GAME_PUZZLE, 1), b'\x02',
+            [coin_json(bytes(32), next_puzzle, 5), coin_json(GAME_COIN, next_puzzle, 1)]
+        )
+
+        found = asyncio.run(watcher.poll())
+        assert found == [(mover, PendingMove(GAME_COIN, b'move', 2, [], name(GAME_COIN, next_puzzle, 1)))]
+        assert mover.pending == found[0][1]
+
+    def test_reads_each_bundle_once(self):
+        node = FakeNode()
+        watcher = MempoolWatcher(node)
+        watcher.track(FakeMover(GAME_COIN))
+
+        node.mempool[b'other'] = bundle(coin_json(bytes(32), GAME_PUZZLE, 1), b'\x01')
+        assert asyncio.run(watcher.poll()) == []
+        assert asyncio.run(watcher.poll()) == []
+        assert node.fetched == [b'other']
+
+        # Gone from the mempool and forgotten.
+        del node.mempool[b'other']
+        asyncio.run(watcher.poll())
+        assert watcher.seen_tx_ids == set()
+
+    def test_unfetched_bundles_are_not_seen(self):
+        node = FakeNode()
+        watcher = MempoolWatcher(node)
+        node.mempool[b'move'] = bundle(coin_json(GAME_PARENT, GAME_PUZZLE, 1), b'\x02')
+
+        # Nothing followed yet, so nothing's looked at.
+        assert asyncio.run(watcher.poll()) == []
+        assert watcher.seen_tx_ids == set()
+
+        async def fail(tx_id):
+            raise ConnectionError('node went away')
+
+        watcher.track(FakeMover(GAME_COIN))
+        fetch = node.get_mempool_item_by_tx_id
+        node.get_mempool_item_by_tx_id = fail
+        with pytest.raises(ConnectionError):
+            asyncio.run(watcher.poll())
+        assert watcher.seen_tx_ids == set()
+
+        node.get_mempool_item_by_tx_id = fetch
+        assert [pending.move for _, pending in asyncio.run(watcher.poll())] == [2]
+        assert watcher.seen_tx_ids == {b'move'}
+
+    def test_bundles_for_a_new_coin_are_looked_at_again(self):
+        node = FakeNode()
+        mover = FakeMover(bytes(32))
+        watcher = MempoolWatcher(node)
+        watcher.track(mover)
+
+        # The reply to our move is waiting before we've synced the block with
+        # our move in it.
+        node.mempool[b'reply'] = bundle(coin_json(GAME_PARENT, GAME_PUZZLE, 1), b'\x02')
+        node.mempool[b'other'] = bundle(coin_json(bytes(32), GAME_PUZZLE, 7), b'\x01')
+        assert asyncio.run(watcher.poll()) == []
+        assert watcher.seen_tx_ids == {b'reply', b'other'}
+
+        mover.current_coin_name = GAME_COIN
+        found = asyncio.run(watcher.poll())
+        assert [(p.tx_id, p.move) for _, p in found] == [(b'reply', 2)]
+        assert node.fetched == [b'reply', b'other', b'reply']
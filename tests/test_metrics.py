@@ -0,0 +1,150 @@
+import json
+import os
+
+from clvm_tools.binutils import assemble
+
+from support.metrics import Histogram, Metrics, METRICS, export_metrics, run_program, timed
+
+def parse_prometheus(text):
+    """
+    {(metric, labels): value} and {family: type} from the text format.
+    """
+    samples = {}
+    types = {}
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, family, kind = line.split(' ')
+            types[family] = kind
+            continue
+        name, value = line.rsplit(' ', 1)
+        metric, labels = name.split('{', 1)
+        samples[(metric, labels.rstrip('}'))] = float(value)
+    return samples, types
+
+def sample_metrics():
+    metrics = Metrics()
+    for elapsed in (0.001, 0.002, 0.003, 0.02, 3.0):
+        metrics.observe('full_node', 'get_blockchain_state', elapsed)
+    metrics.observe('full_node', 'push_tx', 0.2, error=True)
+    metrics.observe('clvm', 'simulate', 0.0005, cost=1234)
+    metrics.get('full_node', 'push_tx').bytes_sent += 100
+    return metrics
+
+class TestHistogram:
+    def test_buckets(self):
+        histogram = Histogram([0.1, 1.0])
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        # A value on a bound belongs to that bound's bucket, as le says.
+        assert list(histogram.cumulative()) == [(0.1, 2), (1.0, 3), (float('inf'), 4)]
+        assert histogram.count == 4 and histogram.total == 2.65
+
+    def test_quantiles(self):
+        histogram = Histogram()
+        assert histogram.quantile(0.5) == 0.0
+
+        for _ in range(90):
+            histogram.observe(0.002)
+        for _ in range(9):
+            histogram.observe(0.04)
+        histogram.observe(20.0)
+
+        assert histogram.quantile(0) == 0.0025
+        assert histogram.quantile(0.5) == 0.0025
+        assert histogram.quantile(0.9) == 0.0025
+        assert histogram.quantile(0.95) == 0.05
+        assert histogram.quantile(0.99) == 0.05
+        assert histogram.quantile(1.0) == float('inf')
+
+class TestMetrics:
+    def test_prometheus(self):
+        samples, types = parse_prometheus(sample_metrics().to_prometheus())
+        assert types == {
+            'checkers_call_seconds': 'histogram',
+            'checkers_call_errors_total': 'counter',
+            'checkers_bytes_sent_total': 'counter',
+            'checkers_bytes_received_total': 'counter',
+            'checkers_clvm_cost_total': 'counter',
+        }
+
+        labels = 'kind="full_node",name="get_blockchain_state"'
+        assert samples[('checkers_call_seconds_bucket', labels + ',le="0.001"')] == 1
+        assert samples[('checkers_call_seconds_bucket', labels + ',le="0.025"')] == 4
+        assert samples[('checkers_call_seconds_bucket', labels + ',le="2.5"')] == 4
+        assert samples[('checkers_call_seconds_bucket', labels + ',le="+Inf"')] == 5
+        assert samples[('checkers_call_seconds_count', labels)] == 5
+        assert abs(samples[('checkers_call_seconds_sum', labels)] - 3.026) < 1e-9
+
+        push = 'kind="full_node",name="push_tx"'
+        assert samples[('checkers_call_errors_total', push)] == 1
+        assert samples[('checkers_bytes_sent_total', push)] == 100
+        assert samples[('checkers_clvm_cost_total', 'kind="clvm",name="simulate"')] == 1234
+
+    def test_prometheus_families_are_contiguous(self):
+        lines = sample_metrics().to_prometheus().splitlines()
+        families = []
+        for line in lines:
+            if line.startswith('#'):
+                continue
+            family = line.split('{')[0]
+            if family.startswith('checkers_call_seconds_'):
+                family = 'checkers_call_seconds'
+            if not families or families[-1] != family:
+                families.append(family)
+        assert len(families) == len(set(families))
+
+    def test_json(self):
+        summary = sample_metrics().to_json()
+        assert sorted(summary) == ['clvm', 'full_node']
+        state = summary['full_node']['get_blockchain_state']
+        assert state['count'] == 5 and state['errors'] == 0
+        assert state['buckets']['0.0025'] == 2 and state['buckets']['inf'] == 5
+        assert summary['full_node']['push_tx']['errors'] == 1
+        assert summary['clvm']['simulate']['cost'] == 1234
+        json.dumps(summary)
+
+    def test_report(self):
+        report = sample_metrics().report('full_node').splitlines()
+        assert len(report) == 2
+        assert report[0].startswith('full_node.get_blockchain_state 5 calls')
+        assert '5000ms p99' in report[0]
+
+    def test_export_is_atomic(self, tmp_path):
+        metrics = sample_metrics()
+        prom = str(tmp_path / 'checkers.prom')
+        with open(prom, 'w') as f:
+            f.write('old')
+        metrics.export(prom)
+        with open(prom) as f:
+            assert f.read() == metrics.to_prometheus()
+
+        metrics.export(str(tmp_path / 'checkers.json'))
+        with open(tmp_path / 'checkers.json') as f:
+            assert json.load(f) == json.loads(json.dumps(metrics.to_json()))
+        # Nothing is left beside the files a collector reads.
+        assert sorted(os.listdir(tmp_path)) == ['checkers.json', 'checkers.prom']
+
+    def test_export_metrics_env(self, tmp_path, monkeypatch):
+        path = tmp_path / 'out.json'
+        monkeypatch.delenv('CHECKERS_METRICS', raising=False)
+        export_metrics()
+        assert not path.exists()
+
+        monkeypatch.setenv('CHECKERS_METRICS', str(path))
+        export_metrics()
+        assert path.exists()
+
+    def test_recording(self):
+        before = METRICS.get('clvm', 'test_metrics').latency.count
+        cost, result = run_program('test_metrics', assemble('(+ 2 5)'), assemble('(3 4)'))
+        assert result.as_int() == 7
+        series = METRICS.get('clvm', 'test_metrics')
+        assert series.latency.count == before + 1 and series.cost >= cost > 0
+
+        errors = METRICS.get('test', 'block').errors
+        try:
+            with timed('test', 'block'):
+                raise ValueError('failed')
+        except ValueError:
+            pass
+        assert METRICS.get('test', 'block').errors == errors + 1
@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+from checkers.engine import INITIAL_BOARD, winner
+from checkers.observer import CONTRACT_HEX, GameObserver
+from support.fakenode import FakeFullNode, SyntheticChain
+
+def checkers_program():
+    with open(CONTRACT_HEX) as f:
+        return bytes.fromhex(f.read().strip())
+
+def observed_chain(games=12, blocks=20, moves_per_block=6):
+    node = FakeFullNode()
+    chain = SyntheticChain(node, noise_per_block=3, inner_puzzle=checkers_program())
+    chain.launch(games)
+    chain.extend(blocks, moves_per_block)
+    return node, chain
+
+def observer(tmp_path, node, batch_blocks=7):
+    observer = GameObserver('test', node, path=str(tmp_path / 'checkers.db'), confirmations=0)
+    observer.batch_blocks = batch_blocks
+    return observer
+
+def assert_matches(observer, chain):
+    games = observer.games()
+    assert len(games) == len(chain.games)
+    for game in games:
+        played = chain.game(game.launcher)
+        assert (game.black_pk, game.red_pk) == (played.black_pk, played.red_pk)
+        assert game.board == played.board
+        assert game.plies == played.ply
+        assert game.coin == played.coin.name()
+        assert game.winner == played.won
+
+class TestGameObserver:
+    def test_indexes_every_game(self, tmp_path):
+        node, chain = observed_chain()
+        watching = observer(tmp_path, node)
+
+        assert asyncio.run(watching.sync()) == node.height
+        assert_matches(watching, chain)
+
+        moves = watching.db.execute('select count(*) from observed_moves').fetchall()[0][0]
+        assert moves == chain.moves_made
+
+    def test_moves_outlast_game_records_rollback(self, tmp_path, monkeypatch):
+        from checkers.gamerecords import GameRecords
+
+        node, chain = observed_chain()
+        watching = observer(tmp_path, node)
+        asyncio.run(watching.sync())
+
+        # Our own games share checkers.db and are rolled back on reorgs.
+        monkeypatch.chdir(tmp_path)
+        records = GameRecords(1, 'test', None, node)
+        records.rollback_to(0)
+        records.close()
+
+        moves = watching.db.execute('select count(*) from observed_moves').fetchall()[0][0]
+        assert moves == chain.moves_made
+        assert watching.rebuild_leaderboard() > 0
+
+    def test_games_of_a_player(self, tmp_path):
+        node, chain = observed_chain()
+        watching = observer(tmp_path, node)
+        asyncio.run(watching.sync())
+
+        pk = chain.games[0].black_pk
+        played = [g.launcher for g in chain.games if pk in (g.black_pk, g.red_pk) and g.ply]
+        assert sorted(g.launcher for g in watching.games(pk)) == sorted(played)
+
+    def test_syncs_from_the_checkpoint(self, tmp_path):
+        node, chain = observed_chain()
+        watching = observer(tmp_path, node)
+        asyncio.run(watching.sync())
+        assert watching.checkpoint()[0] == node.height
+
+        chain.launch(3)
+        chain.extend(10, 6)
+        calls = dict(node.calls)
+        asyncio.run(watching.sync())
+
+        assert_matches(watching, chain)
+        # Only the new blocks were read.
+        assert node.calls['get_additions_and_removals'] - calls['get_additions_and_removals'] == 11
+
+    def test_stays_behind_the_peak(self, tmp_path):
+        node, chain = observed_chain()
+        watching = observer(tmp_path, node)
+        watching.confirmations = 5
+
+        assert asyncio.run(watching.sync()) == node.height - 5
+
+    def test_wins(self, tmp_path):
+        node, chain = observed_chain()
+        early = chain.games[0]
+        chain.take_win(early)
+        node.farm_block()
+
+        watching = observer(tmp_path, node)
+        asyncio.run(watching.sync())
+
+        assert_matches(watching, chain)
+        game = watching.game(early.launcher)
+        assert game.winner == 1 - early.board[0]
+        assert game.early == (winner(early.board) is None)
+
+    def test_unmoved_games_have_no_players_yet(self, tmp_path):
+        node = FakeFullNode()
+        chain = SyntheticChain(node, inner_puzzle=checkers_program())
+        launcher, = chain.launch(1)
+
+        watching = observer(tmp_path, node)
+        asyncio.run(watching.sync())
+
+        game = watching.game(launcher)
+        assert game.board == INITIAL_BOARD and game.plies == 0
+        assert game.black_pk is None and game.red_pk is None
+
+    def test_drops_other_puzzles(self, tmp_path):
+        # Without the checkers program, the games' spends reveal nothing.
+        node = FakeFullNode()
+        chain = SyntheticChain(node)
+        chain.launch(4)
+        chain.extend(3, 4)
+
+        watching = observer(tmp_path, node)
+        asyncio.run(watching.sync())
+        assert watching.games() == []
+
+    def test_rolls_back_a_reorg(self, tmp_path):
+        node, chain = observed_chain()
+        watching = observer(tmp_path, node)
+        asyncio.run(watching.sync())
+        ratings = watching.leaderboard.top(100)
+
+        # As if the last 10 blocks indexed had been orphaned: the observer
+        # forks below them and indexes the chain's blocks again.
+        orphaned = node.height - 10
+        watching.db.execute('update observed_blocks set header_hash = ? where height > ?', ('00' * 32, orphaned))
+        watching.db.execute('update observed_sync set header_hash = ?', ('00' * 32,))
+        watching.db.commit()
+
+        calls = node.calls['get_additions_and_removals']
+        assert asyncio.run(watching.sync()) == node.height
+        assert node.calls['get_additions_and_removals'] - calls >= 10
+
+        assert_matches(watching, chain)
+        moves = watching.db.execute('select count(*) from observed_moves').fetchall()[0][0]
+        assert moves == chain.moves_made
+        assert watching.leaderboard.top(100) == ratings
+
+        # Synced again without another rollback.
+        calls = node.calls['get_additions_and_removals']
+        asyncio.run(watching.sync())
+        assert node.calls['get_additions_and_removals'] == calls
+
+    def test_orphaned_checkpoint_without_history(self, tmp_path):
+        node, chain = observed_chain()
+        watching = observer(tmp_path, node)
+        asyncio.run(watching.sync())
+
+        watching.db.execute('delete from observed_blocks')
+        watching.db.execute('update observed_sync set header_hash = ?', ('00' * 32,))
+        watching.db.commit()
+        with pytest.raises(ValueError):
+            asyncio.run(watching.sync())
@@ -0,0 +1,87 @@
+from collections import namedtuple
+
+import pytest
+
+from clvm.casts import int_to_bytes
+
+from checkers.engine import BLACK, INITIAL_BOARD
+from checkers.preflight import (
+    AGG_SIG_ME, AGG_SIG_UNSAFE, BAD_CONDITIONS, BAD_LINEAGE, COIN_SPENT, CREATE_COIN, ILLEGAL_MOVE, OVER_COST,
+    PUZZLE_FAILED, STALE_BOARD, SpendRejected, check_coin, check_conditions, check_lineage, check_move
+)
+from support.fakenode import FakeCoin, FakeCoinRecord
+
+Proof = namedtuple('Proof', ['parent_name', 'inner_puzzle_hash', 'amount'])
+Condition = namedtuple('Condition', ['vars'])
+
+def game(length):
+    """
+    A launcher and length game coins after it, as get_parent_coins gives them.
+    """
+    coin = FakeCoin(bytes([9] * 32), bytes([8] * 32), 1)
+    coins = [coin]
+    for i in range(length):
+        coin = FakeCoin(coin.name(), bytes([i] * 32), 1)
+        coins.append(coin)
+    return [{'coin': FakeCoinRecord(c, 1, 0), 'spend': None} for c in coins]
+
+def rejected(reason, check, *args):
+    with pytest.raises(SpendRejected) as info:
+        check(*args)
+    assert info.value.reason == reason
+    return info.value
+
+SIGNER = bytes([3] * 48)
+NEXT_PH = bytes([4] * 32)
+
+def conditions(signers=[SIGNER], created=[(NEXT_PH, 1)]):
+    return {
+        AGG_SIG_ME: [Condition([pk, b'message']) for pk in signers],
+        CREATE_COIN: [Condition([ph, int_to_bytes(amount)]) for ph, amount in created]
+    }
+
+class TestPreflight:
+    def test_move(self):
+        assert check_move(INITIAL_BOARD, (0,2,1,3))[0] != BLACK
+        assert 'no piece' in rejected(ILLEGAL_MOVE, check_move, INITIAL_BOARD, (1,2,2,3)).detail
+        assert 'other player' in rejected(ILLEGAL_MOVE, check_move, INITIAL_BOARD, (1,5,0,4)).detail
+        assert 'taken' in rejected(ILLEGAL_MOVE, check_move, INITIAL_BOARD, (1,1,0,2)).detail
+
+    def test_lineage(self):
+        coins = game(3)
+        launcher = coins[0]['coin'].coin.name()
+        newest = coins[-1]['coin'].coin
+        parent = coins[-2]['coin'].coin
+        proof = Proof(parent.parent_coin_info, bytes(32), parent.amount)
+
+        check_lineage(coins, launcher, newest.name(), proof)
+        check_lineage(game(1), launcher, None, Proof(launcher, None, 1))
+
+        rejected(BAD_LINEAGE, check_lineage, coins, bytes(32), None, proof)
+        rejected(BAD_LINEAGE, check_lineage, coins[:1] + coins[2:], launcher, None, proof)
+        rejected(BAD_LINEAGE, check_lineage, coins, launcher, None, Proof(launcher, None, 1))
+        rejected(BAD_LINEAGE, check_lineage, coins, launcher, None, Proof(bytes(32), bytes(32), 1))
+        rejected(STALE_BOARD, check_lineage, coins, launcher, parent.name(), proof)
+
+        coins[-1]['coin'].spent = True
+        rejected(COIN_SPENT, check_lineage, coins, launcher, newest.name(), proof)
+
+    def test_coin(self):
+        coin = FakeCoin(bytes(32), NEXT_PH, 1)
+        check_coin(coin, NEXT_PH)
+        rejected(STALE_BOARD, check_coin, coin, bytes(32))
+
+    def test_conditions(self):
+        check_conditions(None, conditions(), 1000, SIGNER, NEXT_PH, 1)
+        check_conditions(None, conditions(), 1000, SIGNER, None, 1)
+
+        rejected(PUZZLE_FAILED, check_conditions, 'clvm raise', None, 0, SIGNER, NEXT_PH, 1)
+        rejected(OVER_COST, check_conditions, None, conditions(), 1000, SIGNER, NEXT_PH, 1, 999)
+        rejected(BAD_CONDITIONS, check_conditions, None, conditions(signers=[]), 1000, SIGNER, NEXT_PH, 1)
+        rejected(BAD_CONDITIONS, check_conditions, None, conditions(), 1000, bytes(48), NEXT_PH, 1)
+        rejected(BAD_CONDITIONS, check_conditions, None, conditions(created=[(bytes(32), 1)]), 1000, SIGNER, NEXT_PH, 1)
+        rejected(BAD_CONDITIONS, check_conditions, None, conditions(created=[(NEXT_PH, 3)]), 1000, SIGNER, NEXT_PH, 1)
+
+        unsafe = conditions()
+        unsafe[AGG_SIG_UNSAFE] = [Condition([SIGNER, b'message'])]
+        rejected(BAD_CONDITIONS, check_conditions, None, unsafe, 1000, SIGNER, NEXT_PH, 1)
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+
+from types import SimpleNamespace
+
+LAUNCHER = bytes([7]) * 32
+
+def block_hash(fork, height):
+    return hashlib.sha256(f'{fork} {height}'.encode()).digest()
+
+class FakeChain:
+    """
+    Just the node RPCs GameRecords uses.  Each block may move our game, given
+    as the coin it creates and the red mask of its board.
+    """
+    def __init__(self):
+        self.blocks = []
+
+    def extend(self, fork, moves):
+        for move in moves:
+            height = len(self.blocks) + 1
+            self.blocks.append(SimpleNamespace(height=height, header_hash=block_hash(fork, height), move=move))
+
+    def reorg(self, height, fork, moves):
+        del self.blocks[height:]
+        self.extend(fork, moves)
+
+    async def get_blockchain_state(self):
+        return {'peak': SimpleNamespace(height=len(self.blocks))}
+
+    async def get_block_records(self, start, end):
+        return [b for b in self.blocks if start <= b.height < end]
+
+class FakeMover:
+    def __init__(self):
+        self.launch_coin_name = LAUNCHER
+        self.current_coin_name = None
+        self.red = 0
+        self.seen_moves = []
+
+    async def absorb_state(self, height, chain, others=()):
+        block = chain.blocks[height - 1]
+        if block.move is not None:
+            coin, red = block.move
+            self.current_coin_name = coin
+            self.red = red
+            self.seen_moves.append((coin, height, [0, 0, red, 0], height))
+        return block.header_hash
+
+    def take_seen_moves(self):
+        moves = self.seen_moves
+        self.seen_moves = []
+        return moves
+
+    def set_current_coin_name(self, coin):
+        self.current_coin_name = bytes.fromhex(coin) if isinstance(coin, str) else coin
+
+    def get_board(self):
+        return {'blackmove': False, 'king': 0, 'red': self.red, 'black': 0}
+
+    def set_board(self, board):
+        self.red = board['red']
+
+def coin(n):
+    return bytes([n]) * 32
+
+def kept_moves(records):
+    # The fake moves aren't from the start of a real game, so they're kept
+    # without a ply and history_rows leaves them out.
+    rows = records.db.execute('select coin from moves order by height').fetchall()
+    return [bytes.fromhex(c) for c, in rows]
+
+def sync(tmp_path, monkeypatch, chain, mover):
+    from checkers.gamerecords import GameRecords
+
+    monkeypatch.chdir(tmp_path)
+    records = GameRecords(1, 'testnet', mover, chain)
+    records.set_current_block(0)
+    asyncio.run(records.update_to_current_block(0))
+    return records
+
+class TestReorg:
+    def test_rolls_back_orphaned_moves(self, tmp_path, monkeypatch):
+        chain = FakeChain()
+        chain.extend('a', [None, (coin(1), 1), None, (coin(2), 2), (coin(3), 3)])
+        mover = FakeMover()
+        records = sync(tmp_path, monkeypatch, chain, mover)
+        assert records.get_coin_for_launcher(LAUNCHER)[0] == coin(3).hex()
+
+        # Blocks 4 and 5 are orphaned; the new chain has another move at 5.
+        chain.reorg(3, 'b', [None, (coin(4), 4), None])
+        asyncio.run(records.update_to_current_block(0))
+
+        found, board = records.get_coin_for_launcher(LAUNCHER)
+        assert found == coin(4).hex()
+        assert board['red'] == 4
+        assert kept_moves(records) == [coin(1), coin(4)]
+        assert records.get_block_hashes(1, 6) == [(h, block_hash('a' if h <= 3 else 'b', h).hex()) for h in range(1, 7)]
+        records.close()
+
+    def test_rolls_back_to_before_the_game(self, tmp_path, monkeypatch):
+        chain = FakeChain()
+        chain.extend('a', [None, None, (coin(1), 1)])
+        mover = FakeMover()
+        records = sync(tmp_path, monkeypatch, chain, mover)
+
+        # The chain forks below our game's first move and never has it.
+        chain.reorg(1, 'b', [None, None, None])
+        mover.current_coin_name = None
+        assert asyncio.run(records.roll_back_reorg(3)) == 1
+        assert records.get_coin_for_launcher(LAUNCHER) is None
+        assert kept_moves(records) == []
+        records.close()
+
+    def test_no_reorg(self, tmp_path, monkeypatch):
+        chain = FakeChain()
+        chain.extend('a', [None, (coin(1), 1)])
+        records = sync(tmp_path, monkeypatch, chain, FakeMover())
+        assert asyncio.run(records.find_fork(2)) is None
+        records.close()
+
+    def test_rolls_back_only_its_network(self, tmp_path, monkeypatch):
+        from checkers.gamerecords import GameRecords
+
+        chain = FakeChain()
+        chain.extend('a', [None, (coin(1), 1), (coin(2), 2)])
+        records = sync(tmp_path, monkeypatch, chain, FakeMover())
+
+        other = GameRecords(1, 'mainnet', None, None)
+        mainnet_move = [(coin(9), 9, [0, 0, 9, 0], 3)]
+        other.record_moves(LAUNCHER, mainnet_move)
+        other.rollback_to(1)
+        assert kept_moves(records) == [coin(1), coin(2)]
+
+        other.record_moves(LAUNCHER, mainnet_move)
+        records.rollback_to(2)
+        assert kept_moves(records) == [coin(1), coin(9)]
+        other.close()
+        records.close()
+
+    def test_moves_from_before_nets(self, tmp_path, monkeypatch):
+        import sqlite3
+        from checkers.gamerecords import GameRecords
+
+        monkeypatch.chdir(tmp_path)
+        db = sqlite3.connect('checkers.db')
+        db.execute(
+            'create table moves (launcher text, ply integer, move integer, next integer, '
+            'king text, red text, black text, height integer, coin text primary key)'
+        )
+        db.execute("insert into moves values (?, 0, 1, 0, '0', '1', '0', 2, ?)", (LAUNCHER.hex(), coin(1).hex()))
+        db.commit()
+        db.close()
+
+        records = GameRecords(1, 'testnet', None, None)
+        assert records.db.execute('select net, coin from moves').fetchall() == [('testnet', coin(1).hex())]
+        records.rollback_to(1)
+        assert kept_moves(records) == []
+        records.close()
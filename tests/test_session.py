@@ -0,0 +1,89 @@
+import asyncio
+import warnings
+
+import pytest
+
+pytest.importorskip('chia')
+
+import aiohttp
+from aiohttp import web
+
+import wallet.session
+from support.metrics import METRICS
+from wallet.session import RpcSession
+
+class LocalClient:
+    """
+    What RpcSession uses of chia's RpcClient, against a plain http server
+    rather than one with the node's TLS certificates.
+    """
+    def __init__(self, url: str):
+        self.url = url
+        self.session = aiohttp.ClientSession()
+        self.closing_task = None
+
+    @classmethod
+    def creator(cls, url: str):
+        async def create(host, port, root_dir, config):
+            return cls(url)
+        return create
+
+    async def fetch(self, path, request_json):
+        async with self.session.post(self.url + path, json=request_json) as response:
+            return await response.json()
+
+    def close(self):
+        self.closing_task = asyncio.create_task(self.session.close())
+
+    async def await_closed(self):
+        if self.closing_task is not None:
+            await self.closing_task
+
+async def serve():
+    async def state(request):
+        return web.json_response({'success': True, 'blockchain_state': {'peak': None}})
+
+    app = web.Application()
+    app.router.add_post('/get_blockchain_state', state)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}/'
+
+async def use_session(monkeypatch, tmp_path):
+    runner, url = await serve()
+    monkeypatch.setattr(wallet.session.FullNodeRpcClient, 'create', LocalClient.creator(url))
+    monkeypatch.setattr(wallet.session.WalletRpcClient, 'create', LocalClient.creator(url))
+
+    session = RpcSession(tmp_path)
+    session.config = {}
+    try:
+        full_node, wallet_client = await session.connect()
+        again = await session.connect()
+        assert again == (full_node, wallet_client)
+        assert full_node.session.connector is session.connector
+        assert wallet_client.session.connector is session.connector
+
+        before = METRICS.get('full_node', 'get_blockchain_state').latency.count
+        for _ in range(3):
+            await full_node.fetch('get_blockchain_state', {})
+        assert METRICS.get('full_node', 'get_blockchain_state').latency.count == before + 3
+        assert METRICS.get('full_node', 'get_blockchain_state').bytes_received > 0
+
+        connector = session.connector
+    finally:
+        await session.close()
+        await runner.cleanup()
+
+    assert connector.closed
+    assert full_node.session.closed and wallet_client.session.closed
+    assert session.connector is None and session.full_node is None
+
+class TestRpcSession:
+    def test_clients_share_a_pool_and_close(self, monkeypatch, tmp_path):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', ResourceWarning)
+            warnings.simplefilter('error', RuntimeWarning)
+            asyncio.run(use_session(monkeypatch, tmp_path))
@@ -0,0 +1,97 @@
+import hashlib
+import io
+
+from clvm import SExp
+from clvm.serialize import sexp_to_stream
+
+from checkers.solution import (
+    atom_at, inspect_launcher_solution, inspect_solution, move_from_solution, skip_sexp, tree_hash, uncurry
+)
+from support.fakenode import curry
+
+LAUNCHER = bytes(range(32))
+BOARD = [1, 0, 0xa040a040a040a040, 0x205020502050205]
+
+def serialize(sexp):
+    f = io.BytesIO()
+    sexp_to_stream(SExp.to(sexp), f)
+    return f.getvalue()
+
+def singleton_solution(extra, move=[0x3010200]):
+    return serialize([[LAUNCHER, [], 1], 1, [[], move, extra]])
+
+def board_atoms(board):
+    return [SExp.to(x).as_atom() for x in board]
+
+class TestInspectSolution:
+    def test_finds_launcher_and_board(self):
+        blob = singleton_solution([("game", "checkers"), ("board", BOARD), ("launcher", LAUNCHER)])
+        assert inspect_solution(blob) == (LAUNCHER, board_atoms(BOARD))
+
+    def test_large_masks(self):
+        board = [0, 0x1234567890abcdef1234, 0, 2**64 - 1]
+        blob = singleton_solution([("launcher", LAUNCHER), ("board", board)])
+        assert inspect_solution(blob) == (LAUNCHER, board_atoms(board))
+
+    def test_skips_other_launchers_board(self):
+        blob = singleton_solution([("board", BOARD), ("launcher", LAUNCHER)])
+        assert inspect_solution(blob, want_launcher=bytes(32)) == (LAUNCHER, None)
+
+    def test_rejects_other_games(self):
+        blob = singleton_solution([("game", "chess"), ("board", BOARD), ("launcher", LAUNCHER)])
+        assert inspect_solution(blob) == (None, None)
+
+    def test_rejects_other_shapes(self):
+        assert inspect_solution(serialize([[], (1, [[51, LAUNCHER, 1]]), []])) == (None, None)
+        assert inspect_solution(serialize([1, 2])) == (None, None)
+        assert inspect_solution(serialize(1)) == (None, None)
+        assert inspect_solution(singleton_solution([])) == (None, None)
+
+    def test_truncated(self):
+        blob = singleton_solution([("board", BOARD), ("launcher", LAUNCHER)])
+        assert inspect_solution(blob[:-20]) == (None, None)
+
+class TestMoveFromSolution:
+    def test_finds_move(self):
+        blob = singleton_solution([("board", BOARD), ("launcher", LAUNCHER)])
+        assert move_from_solution(blob) == SExp.to(0x3010200).as_atom()
+
+    def test_no_move(self):
+        assert move_from_solution(singleton_solution([], move=[])) is None
+        assert move_from_solution(serialize(1)) is None
+
+def sha256tree(sexp):
+    if sexp.listp():
+        return hashlib.sha256(b'\x02' + sha256tree(sexp.first()) + sha256tree(sexp.rest())).digest()
+    return hashlib.sha256(b'\x01' + sexp.as_atom()).digest()
+
+class TestLauncherSolution:
+    def test_finds_eve_coin(self):
+        blob = serialize([LAUNCHER, 1, [("game", "checkers"), ("launcher", LAUNCHER)]])
+        assert inspect_launcher_solution(blob) == (LAUNCHER, 1)
+
+    def test_rejects_other_launchers(self):
+        assert inspect_launcher_solution(serialize([LAUNCHER, 1, [("game", "chess")]])) is None
+        assert inspect_launcher_solution(serialize([LAUNCHER, 1, []])) is None
+        assert inspect_launcher_solution(serialize([b'short', 1, [("game", "checkers")]])) is None
+
+class TestCurried:
+    def test_tree_hash(self):
+        for sexp in [[], 1, [1, 2, (3, 4)], [LAUNCHER, [BOARD, [[]]], b'x' * 300]]:
+            assert tree_hash(serialize(sexp)) == sha256tree(SExp.to(sexp))
+
+    def test_uncurry(self):
+        program = SExp.to([2, 5, [4, 11, 1]])
+        args = [LAUNCHER, BOARD, []]
+        blob = curry(program.as_bin(), [serialize(a) for a in args])
+
+        found, positions = uncurry(blob)
+        assert blob[found:skip_sexp(blob, found)] == program.as_bin()
+        assert tree_hash(blob, found) == sha256tree(program)
+        assert atom_at(blob, positions[0]) == LAUNCHER
+        assert [blob[p:skip_sexp(blob, p)] for p in positions] == [serialize(a) for a in args]
+
+    def test_not_curried(self):
+        assert uncurry(serialize([2, 5, 1])) is None
+        assert uncurry(serialize([2, (1, 5), [4, 1, 1]])) is None
+        assert uncurry(serialize(1)) is None
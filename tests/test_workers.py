@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip('chia')
+
+from checkers.driver import CheckersMover, GAME_MOJO
+from checkers.engine import INITIAL_BOARD
+from checkers.workers import MovePool, choose_move, load_inner_puzzle, prepare_move
+
+from support.simulation import game_coins
+
+class TestWorkers:
+    @pytest.mark.asyncio
+    async def test_prepared_move_is_accepted(self, inner_puzzle_code, network):
+        network, alice, bob = network
+
+        mover = CheckersMover(inner_puzzle_code, alice, bob)
+        launch_coin = await alice.choose_coin(GAME_MOJO)
+        launcher, _ = await mover.launch_game(launch_coin)
+
+        coins = await game_coins(network, launcher)
+        load_inner_puzzle(bytes(inner_puzzle_code))
+        prepared = prepare_move(mover.move_job(coins, 0,2,1,3))
+        # The engine's board was right, so the contract wasn't asked.
+        assert set(prepared.seconds) == {'board', 'puzzles', 'run', 'sign'}
+
+        result = await mover.push_prepared(coins, prepared)
+        assert 'error' not in result.result
+
+        coins = await game_coins(network, launcher)
+        assert coins[-1]['coin'].coin.name() == mover.pushed_coin.name()
+
+    @pytest.mark.asyncio
+    async def test_pool_gives_the_same_bundle(self, inner_puzzle_code, network):
+        network, alice, bob = network
+
+        mover = CheckersMover(inner_puzzle_code, alice, bob)
+        launch_coin = await alice.choose_coin(GAME_MOJO)
+        launcher, _ = await mover.launch_game(launch_coin)
+        coins = await game_coins(network, launcher)
+        job = mover.move_job(coins, 0,2,1,3)
+
+        load_inner_puzzle(bytes(inner_puzzle_code))
+        pool = MovePool(inner_puzzle_code, 1)
+        try:
+            # Signing is deterministic, so the bundles are identical.
+            assert (await pool.prepare(job)).spend_bundle == prepare_move(job).spend_bundle
+            # And it chooses moves as the bot would without it.
+            assert await pool.choose(list(INITIAL_BOARD)) == choose_move(list(INITIAL_BOARD))
+        finally:
+            pool.close()
@@ -1,6 +1,5 @@
 import binascii
 import os
-from wallet.agg_sig_me_additional_data import get_agg_sig_me_additional_data
 
 rpc_host = os.environ['CHIA_RPC_HOST'] if 'CHIA_RPC_HOST' in os.environ \
     else 'localhost'
@@ -9,7 +8,19 @@ full_node_rpc_port = os.environ['CHIA_RPC_PORT'] if 'CHIA_RPC_PORT' in os.enviro
 wallet_rpc_port = os.environ['CHIA_WALLET_PORT'] if 'CHIA_WALLET_PORT' in os.environ \
     else '9256'
 
-AGG_SIG_ME_ADDITIONAL_DATA = get_agg_sig_me_additional_data()
+AGG_SIG_ME_ADDITIONAL_DATA_ = None
+
+def __getattr__(name):
+    # AGG_SIG_ME_ADDITIONAL_DATA is read from the chia config the first time
+    # it's used rather than on import, which everything that only wants
+    # tohex does.
+    global AGG_SIG_ME_ADDITIONAL_DATA_
+    if name == 'AGG_SIG_ME_ADDITIONAL_DATA':
+        if AGG_SIG_ME_ADDITIONAL_DATA_ is None:
+            from wallet.agg_sig_me_additional_data import get_agg_sig_me_additional_data
+            AGG_SIG_ME_ADDITIONAL_DATA_ = get_agg_sig_me_additional_data()
+        return AGG_SIG_ME_ADDITIONAL_DATA_
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 def tohex(b):
     if b is None:
@@ -1,9 +1,7 @@
-import os
 import binascii
 
 from typing import Dict, List, Union
 from pathlib import Path
-from chia.util.config import load_config
 
 
 def plunge_path_in_config_(fname: Path, config: Dict, path: List[str]):
@@ -24,25 +22,13 @@ def plunge_path_in_config_(fname: Path, config: Dict, path: List[str]):
             index += 1
 
 
-def get_agg_sig_me_additional_data(root_path: Union[str, Path] = None) -> bytes:
+def agg_sig_me_additional_data_in(config: Dict, want_file: Path) -> bytes:
     """
-    Loads the correct value for the AGG_SIG_ME_ADDITIONAL_DATA constant
-    and returns it so it can be used conveniently by API consumers.
+    Find the AGG_SIG_ME_ADDITIONAL_DATA constant of the selected network in a
+    loaded config.
 
     Raise exception if not found.
     """
-    if root_path is None:
-        if "CHIA_ROOT" in os.environ:
-            root_path = Path(os.environ["CHIA_ROOT"])
-        else:
-            root_path = Path(os.environ["HOME"]) / ".chia/mainnet"
-    else:
-        root_path = Path(root_path)
-
-    want_file = root_path / "config/config.yaml"
-
-    config = load_config(root_path, "config.yaml", None)
-
     selected_network = plunge_path_in_config_(want_file, config, ["selected_network"])
 
     # if the network has a different AGG_SIG_ME_ADDITIONAL_DATA then use it,
@@ -61,3 +47,17 @@ def get_agg_sig_me_additional_data(root_path: Union[str, Path] = None) -> bytes:
         )
 
     return bytes(binascii.unhexlify(agg_sig_me_additional_data))
+
+
+def get_agg_sig_me_additional_data(root_path: Union[str, Path] = None) -> bytes:
+    """
+    Loads the correct value for the AGG_SIG_ME_ADDITIONAL_DATA constant
+    and returns it so it can be used conveniently by API consumers.
+
+    The config is parsed once per process and the value is cached on disk
+    until config.yaml changes; see wallet.config.
+
+    Raise exception if not found.
+    """
+    from wallet.config import get_chia_config
+    return get_chia_config(root_path).agg_sig_me_additional_data()
@@ -0,0 +1,187 @@
+import time
+from typing import Iterable, List, Optional, Set
+
+from chia.types.blockchain_format.coin import Coin
+from chia.util.ints import uint64
+
+from wallet import tohex, fromhex
+
+# A coin chosen for a spend is held back from other choices, including ones
+# made by other gamewallet.py processes sharing checkers.db, until it's seen
+# spent or this long passes without the spend going through.
+RESERVATION_SECONDS = 600
+
+class CoinIndex:
+    """
+    Our unspent standard coins, kept in checkers.db and indexed by amount so
+    that finding the smallest usable coin for an amount is one index seek.
+
+    The wallet's transaction history is applied one transaction at a time and
+    each transaction only once, so starting up only costs the new ones.  Coins
+    named in BANNED_COINS are never chosen, and chosen coins are reserved so
+    that concurrent launches don't try to spend the same coin.
+    """
+    def __init__(self,db,netname,banned_coins: Set[str] = set()):
+        self.db = db
+        self.netname = netname
+
+        self.run_db("""
+          create table if not exists coins (
+            net text,
+            name text,
+            parent text,
+            puzzle_hash text,
+            amount integer,
+            spent integer default 0,
+            reserved_until real default 0,
+            primary key (net, name)
+          )
+        """)
+        # reserved_until is in the index so that reserved coins are passed over
+        # without reading their rows.
+        self.run_db("drop index if exists coins_by_amount")
+        self.run_db("create index if not exists coins_by_amount_reserved on coins (net, spent, amount, reserved_until)")
+        self.run_db("create table if not exists coin_transactions (net text, name text, primary key (net, name))")
+
+        # BANNED_COINS is this process's own, so it goes in a table of this
+        # connection's rather than in checkers.db.
+        self.run_db("create temp table if not exists banned_coins (net text, name text, primary key (net, name))")
+        self.execute('delete from temp.banned_coins where net = ?', (self.netname,))
+        cursor = self.db.cursor()
+        cursor.executemany(
+            'insert or ignore into temp.banned_coins (net, name) values (?,?)',
+            [(self.netname, name) for name in banned_coins]
+        )
+        cursor.close()
+        self.db.commit()
+
+    def run_db(self,stmt,*params):
+        self.execute(stmt, *params)
+        self.db.commit()
+
+    def execute(self,stmt,*params):
+        cursor = self.db.cursor()
+        cursor.execute(stmt, *params)
+        cursor.close()
+
+    def add(self,coin: Coin):
+        self.execute(
+            'insert or ignore into coins (net, name, parent, puzzle_hash, amount) values (?,?,?,?,?)',
+            (self.netname, tohex(coin.name()), tohex(coin.parent_coin_info), tohex(coin.puzzle_hash), int(coin.amount))
+        )
+
+    def spend(self,name: bytes):
+        """
+        Record that a coin is gone, whether or not we'd seen it created.
+        Changes made by add and spend are committed by the caller.
+        """
+        self.execute(
+            'insert or ignore into coins (net, name, spent) values (?,?,1)',
+            (self.netname, tohex(name))
+        )
+        self.execute(
+            'update coins set spent = 1, reserved_until = 0 where net = ? and name = ?',
+            (self.netname, tohex(name))
+        )
+
+    def has_transaction(self,name: bytes) -> bool:
+        cursor = self.db.cursor()
+        rows = cursor.execute(
+            'select 1 from coin_transactions where net = ? and name = ?',
+            (self.netname, tohex(name))
+        ).fetchall()
+        cursor.close()
+        return len(rows) > 0
+
+    def apply_transactions(self,transactions: Iterable):
+        """
+        Bring the index up to date with the wallet's transaction records.  A
+        coin created by a transaction spends its parent and removals are spent.
+        """
+        applied = 0
+        for t in transactions:
+            if self.has_transaction(t.name):
+                continue
+
+            for a in t.additions:
+                self.spend(a.parent_coin_info)
+                self.add(a)
+
+            for r in t.removals:
+                self.spend(r.name())
+
+            self.execute(
+                'insert or ignore into coin_transactions (net, name) values (?,?)',
+                (self.netname, tohex(t.name))
+            )
+            applied += 1
+
+        self.db.commit()
+        return applied
+
+    def row_to_coin(self,row) -> Coin:
+        parent, puzzle_hash, amount = row
+        return Coin(fromhex(parent), fromhex(puzzle_hash), uint64(amount))
+
+    def reserve(self,amt: uint64) -> Optional[Coin]:
+        """
+        Choose the smallest unreserved coin holding at least amt and reserve it.
+        """
+        now = time.time()
+        cursor = self.db.cursor()
+        # Choosing and reserving is one statement, so another process can't
+        # choose the same coin in between, and it's in a savepoint rather than
+        # a transaction of its own because GameRecords shares the connection.
+        cursor.execute('savepoint reserve_coin')
+        try:
+            rows = cursor.execute(
+                'update coins set reserved_until = ? where net = ? and name = ('
+                '  select name from coins '
+                '  where net = ? and spent = 0 and amount >= ? and reserved_until < ? '
+                '  and name not in (select name from temp.banned_coins where net = ?) '
+                '  order by amount limit 1'
+                ') returning parent, puzzle_hash, amount',
+                (now + RESERVATION_SECONDS, self.netname, self.netname, int(amt), now, self.netname)
+            ).fetchall()
+            cursor.execute('release reserve_coin')
+        except:
+            cursor.execute('rollback to reserve_coin')
+            cursor.execute('release reserve_coin')
+            raise
+        finally:
+            cursor.close()
+        self.db.commit()
+
+        if not rows:
+            return None
+
+        return self.row_to_coin(rows[0])
+
+    def spent(self,names: Iterable[bytes]):
+        for name in names:
+            self.spend(name)
+        self.db.commit()
+
+    def release(self,name: bytes):
+        """
+        Make a reserved coin choosable again, for instance if its spend failed.
+        """
+        self.run_db(
+            'update coins set reserved_until = 0 where net = ? and name = ?',
+            (self.netname, tohex(name))
+        )
+
+    def unreserved(self) -> List[Coin]:
+        """
+        All the coins that could be chosen now, smallest first.
+        """
+        cursor = self.db.cursor()
+        rows = cursor.execute(
+            'select parent, puzzle_hash, amount from coins '
+            'where net = ? and spent = 0 and reserved_until < ? '
+            'and name not in (select name from temp.banned_coins where net = ?) order by amount',
+            (self.netname, time.time(), self.netname)
+        ).fetchall()
+        cursor.close()
+
+        return [self.row_to_coin(r) for r in rows]
@@ -0,0 +1,119 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from wallet.agg_sig_me_additional_data import agg_sig_me_additional_data_in
+
+# Where the constants resolved from config.yaml are kept between runs, so that
+# signing doesn't need the yaml parsed at all while the file is unchanged.
+# They go in CACHE_FILE beside config.yaml unless CHECKERS_CONFIG_CACHE names
+# another file, or is empty to not keep them.
+CACHE_FILE = 'checkers-config.json'
+CACHE_PATH = os.environ.get('CHECKERS_CONFIG_CACHE')
+
+def chia_root() -> Path:
+    if 'CHIA_ROOT' in os.environ:
+        return Path(os.environ['CHIA_ROOT'])
+    else:
+        return Path(os.environ['HOME']) / '.chia/mainnet'
+
+class ChiaConfig:
+    """
+    chia's config.yaml under one root, parsed at most once per process, and
+    the network constants we take from it.
+    """
+    def __init__(self, root_dir: Optional[Path] = None, cache_path: Optional[str] = CACHE_PATH):
+        self.root_dir = root_dir
+        self.cache_path = cache_path
+        self.config = None
+        self.additional_data = None
+
+    def get_root_dir(self) -> Path:
+        if self.root_dir is None:
+            self.root_dir = chia_root()
+        return self.root_dir
+
+    def config_file(self) -> Path:
+        return self.get_root_dir() / 'config' / 'config.yaml'
+
+    def get_cache_path(self) -> str:
+        if self.cache_path is None:
+            self.cache_path = str(self.config_file().parent / CACHE_FILE)
+        return self.cache_path
+
+    def get(self) -> Dict:
+        """
+        The whole config, as chia loads it.
+        """
+        if self.config is None:
+            from chia.util.config import load_config
+            self.config = load_config(self.get_root_dir(), 'config.yaml')
+        return self.config
+
+    def cache_key(self) -> Dict:
+        st = os.stat(self.config_file())
+        return {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+    def read_cache(self) -> Dict:
+        if not self.get_cache_path():
+            return {}
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def cached(self, name: str) -> Optional[str]:
+        entry = self.read_cache().get(str(self.config_file()))
+        if entry is None or entry.get('key') != self.cache_key():
+            return None
+        return entry.get(name)
+
+    def remember(self, name: str, value: str):
+        if not self.get_cache_path():
+            return
+
+        cache = self.read_cache()
+        entry = cache.get(str(self.config_file()))
+        key = self.cache_key()
+        if entry is None or entry.get('key') != key:
+            entry = {'key': key}
+        entry[name] = value
+        cache[str(self.config_file())] = entry
+
+        # Written whole and renamed so another process never reads half.
+        temporary = f'{self.cache_path}.{os.getpid()}'
+        try:
+            with open(temporary, 'w') as f:
+                json.dump(cache, f)
+            os.replace(temporary, self.cache_path)
+        except OSError:
+            # Only a cache.
+            pass
+
+    def agg_sig_me_additional_data(self) -> bytes:
+        """
+        AGG_SIG_ME_ADDITIONAL_DATA for the selected network.
+        """
+        if self.additional_data is None:
+            cached = self.cached('agg_sig_me_additional_data')
+            if cached is not None:
+                self.additional_data = bytes.fromhex(cached)
+            else:
+                self.additional_data = agg_sig_me_additional_data_in(self.get(), self.config_file())
+                self.remember('agg_sig_me_additional_data', self.additional_data.hex())
+
+        return self.additional_data
+
+configs_: Dict[Path, ChiaConfig] = {}
+
+def get_chia_config(root_dir: Optional[Union[str, Path]] = None) -> ChiaConfig:
+    """
+    The config of the given chia root, CHIA_ROOT or ~/.chia/mainnet by
+    default, shared by everything in this process.
+    """
+    root = Path(root_dir) if root_dir is not None else chia_root()
+    if root not in configs_:
+        configs_[root] = ChiaConfig(root)
+    return configs_[root]
@@ -0,0 +1,40 @@
+from chia.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (  # standard_transaction
+    puzzle_for_pk,
+)
+
+class WalletIdentity:
+    """
+    One of a CheckersRunnerWallet's derived keys, as the player of a game.
+
+    A game's puzzle is curried with its players' keys and puzzle hashes, and
+    a move is signed by the one to move.  A bot playing many games from one
+    wallet gives each game the identity it plays as, so that no game has to
+    switch the wallet's own identity to move, and games on different keys can
+    be played at once.  Pushing goes through the wallet.
+    """
+    def __init__(self,wallet,sk,pk):
+        self.wallet = wallet
+        self.sk_ = sk
+        self.pk_ = pk
+        self.puzzle = puzzle_for_pk(pk)
+        self.puzzle_hash = self.puzzle.get_tree_hash()
+
+    def pk(self):
+        return self.pk_
+
+    def sk(self):
+        return self.sk_
+
+    def pk_to_sk(self,pk):
+        if pk == self.pk_:
+            return self.sk_
+        return self.wallet.pk_to_sk(pk)
+
+    def agg_sig_me_additional_data(self):
+        return self.wallet.agg_sig_me_additional_data()
+
+    async def push_tx(self,bundle):
+        return await self.wallet.push_tx(bundle)
+
+    def close(self):
+        pass
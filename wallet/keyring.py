@@ -0,0 +1,69 @@
+from typing import Dict, Optional, Tuple
+
+from blspy import G1Element, PrivateKey
+
+from chia.wallet.derive_keys import master_sk_to_wallet_sk
+from chia.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (  # standard_transaction
+    calculate_synthetic_secret_key,
+    DEFAULT_HIDDEN_PUZZLE_HASH,
+)
+
+class KeyRing:
+    """
+    The secret keys a wallet can sign with, indexed by public key.
+
+    Standard coins are signed with the synthetic key that goes with a derived
+    wallet key, and the game's AGG_SIG_ME conditions are signed with the derived
+    key itself, so both are computed once when an identity is added and signing
+    is then just a lookup.  Master keys and derived keys are also kept so that
+    searching the 1000 derived indices for an identity only pays for the
+    derivation the first time.
+    """
+    def __init__(self):
+        self.master_sks: Dict[int, PrivateKey] = {}
+        self.derived: Dict[Tuple[int, int], Tuple[PrivateKey, G1Element]] = {}
+        self.sks: Dict[bytes, PrivateKey] = {}
+        self.synthetic: Dict[bytes, PrivateKey] = {}
+
+    def has_master_sk(self, fingerprint: int) -> bool:
+        return fingerprint in self.master_sks
+
+    def add_master_sk(self, fingerprint: int, sk: PrivateKey):
+        self.master_sks[fingerprint] = sk
+
+    def master_sk(self, fingerprint: int) -> PrivateKey:
+        return self.master_sks[fingerprint]
+
+    def derive(self, fingerprint: int, index: int) -> Tuple[PrivateKey, G1Element]:
+        """
+        Give the wallet secret key and public key at index under the master key
+        with the given fingerprint, deriving it only once.
+        """
+        key = (fingerprint, index)
+        if key not in self.derived:
+            sk = master_sk_to_wallet_sk(self.master_sks[fingerprint], index)
+            pk = sk.get_g1()
+            self.derived[key] = sk, pk
+            self.sks[bytes(pk)] = sk
+
+        return self.derived[key]
+
+    def add(self, sk: PrivateKey, pk: Optional[G1Element] = None):
+        """
+        Remember an identity we'll sign with, along with the synthetic key that
+        the standard puzzle for it requires.
+        """
+        if pk is None:
+            pk = sk.get_g1()
+
+        pk_bytes = bytes(pk)
+        self.sks[pk_bytes] = sk
+        if pk_bytes in self.synthetic:
+            return
+
+        synthetic_sk = calculate_synthetic_secret_key(sk, DEFAULT_HIDDEN_PUZZLE_HASH)
+        self.synthetic[pk_bytes] = synthetic_sk
+        self.sks[bytes(synthetic_sk.get_g1())] = synthetic_sk
+
+    def sk_for_pk(self, pk: G1Element) -> Optional[PrivateKey]:
+        return self.sks.get(bytes(pk))
@@ -1,5 +1,6 @@
 import asyncio
 import binascii
+import logging
 from blspy import AugSchemeMPL, G1Element, G2Element, PrivateKey
 import os
 from pathlib import Path
@@ -20,7 +21,6 @@ from chia.rpc.rpc_client import RpcClient
 from chia.rpc.full_node_rpc_client import FullNodeRpcClient
 from chia.rpc.wallet_rpc_client import WalletRpcClient
 
-from chia.util.config import load_config, save_config
 from chia.util.hash import std_hash
 from chia.util.ints import uint16, uint64
 
@@ -36,10 +36,18 @@ from cdv.test import SmartCoinWrapper, CoinPairSearch, CoinWrapper, Wallet
 
 from checkers.gamerecords import GameRecords
 from support import SpendResult, FakeCoin, GAME_MOJO, LARGE_NUMBER_OF_BLOCKS
-from wallet import rpc_host, full_node_rpc_port, wallet_rpc_port, AGG_SIG_ME_ADDITIONAL_DATA
+import wallet
+from wallet import rpc_host, full_node_rpc_port, wallet_rpc_port
+from support.metrics import timed
+from wallet.coins import CoinIndex
+from wallet.identity import WalletIdentity
+from wallet.keyring import KeyRing
+from wallet.session import get_session
+
+log = logging.getLogger(__name__)
 
 class CheckersRunnerWallet:
-    def __init__(self,netname,blocks_ago):
+    def __init__(self,netname,blocks_ago,keyring: Optional[KeyRing] = None):
         self.parent = None
         self.blocks_ago = blocks_ago
         self.wallet_rpc_client = None
@@ -52,32 +60,50 @@ class CheckersRunnerWallet:
         self.puzzle = None
         self.puzzle_hash = None
         self.wallet = None
-        self.usable_coins = {}
+        self.coins = None
         self.banned_coins = set(filter(lambda x: len(x) > 0, os.environ['BANNED_COINS'].split())) if 'BANNED_COINS' in os.environ else set()
         self.game_records = None
+        # Shared with any other wallet object in this process so that keys
+        # aren't fetched and derived again when we switch sides.
+        self.keyring = keyring if keyring is not None else KeyRing()
 
     def pk_to_sk(self,pk):
-        print('want pk %s (%s) have %s' % (pk, type(pk), self.pk_))
-        if pk == self.pk_:
-            return self.sk_
-
-        print('primary_sk %s' % self.primary_sk_)
-        try_sk = calculate_synthetic_secret_key(self.sk_, DEFAULT_HIDDEN_PUZZLE_HASH)
-        try_pk = try_sk.get_g1()
-        if pk == try_sk.get_g1():
-            return try_sk
+        log.debug('want pk %s have %s', pk, self.pk_)
+        sk = self.keyring.sk_for_pk(pk)
+        if sk is not None:
+            return sk
 
         # Maybe given a puzzle hash
         if pk == self.puzzle_hash:
-            print('was given a puzzle hash but wanted a pk')
+            log.warning('was given a puzzle hash but wanted a pk')
+
+    def use_identity(self,sk,pk):
+        """
+        Make the given derived key the one we play and sign with.
+        """
+        self.keyring.add(sk, pk)
+
+        self.sk_ = sk
+        self.pk_ = pk
+        self.puzzle = puzzle_for_pk(pk)
+        self.puzzle_hash = self.puzzle.get_tree_hash()
+
+    async def master_sk(self,pkdata):
+        """
+        Get the master secret key for a fingerprint from the wallet once.
+        """
+        if not self.keyring.has_master_sk(pkdata):
+            private_key = await self.wallet_rpc_client.get_private_key(pkdata)
+            sk_data = binascii.unhexlify(private_key['sk'])
+            self.keyring.add_master_sk(pkdata, PrivateKey.from_bytes(sk_data))
+
+        return self.keyring.master_sk(pkdata)
 
     async def puzzle_for_puzzle_hash(self, puzzle_hash):
         for pkdata in self.public_key_fingerprints:
-            private_key = await self.wallet_rpc_client.get_private_key(pkdata)
-            sk_data = binascii.unhexlify(private_key['sk'])
+            await self.master_sk(pkdata)
             for i in range(1000):
-                sk_ = master_sk_to_wallet_sk(PrivateKey.from_bytes(sk_data), i)
-                pk_ = sk_.get_g1()
+                sk_, pk_ = self.keyring.derive(pkdata, i)
                 puzzle_ = puzzle_for_pk(pk_)
                 if puzzle_.get_tree_hash() == puzzle_hash:
                     return puzzle_
@@ -86,48 +112,57 @@ class CheckersRunnerWallet:
         return 0
 
     def close(self):
-        if self.parent:
-            self.parent.close()
-        if self.wallet_rpc_client:
-            self.wallet_rpc_client.close()
+        # The rpc clients belong to the process wide session and are closed
+        # with it.
+        if self.game_records:
+            self.game_records.close()
 
     def pk(self):
         return self.pk_
 
-    async def public_key_matches(self,pk):
+    def agg_sig_me_additional_data(self):
+        # Read when first signing, not when this module is imported.
+        return wallet.AGG_SIG_ME_ADDITIONAL_DATA
+
+    async def derived_key_for_pk(self,pk):
+        """
+        The (sk, pk) of our derived key with public key pk, or None.
+        """
         for pkdata in self.public_key_fingerprints:
-            private_key = await self.wallet_rpc_client.get_private_key(pkdata)
-            sk_data = binascii.unhexlify(private_key['sk'])
+            await self.master_sk(pkdata)
             for i in range(1000):
-                sk_ = master_sk_to_wallet_sk(PrivateKey.from_bytes(sk_data), i)
-                pk_ = sk_.get_g1()
+                sk_, pk_ = self.keyring.derive(pkdata, i)
                 if pk_ == pk:
-                    puzzle = puzzle_for_pk(pk_)
-                    puzzle_hash = puzzle.get_tree_hash()
-                    print(puzzle)
-
-                    self.sk_ = sk_
-                    self.pk_ = pk_
-                    self.puzzle = puzzle
-                    self.puzzle_hash = puzzle_hash
-                    return True
+                    return sk_, pk_
 
-        return False
+        return None
 
-    async def create_rpc_connections(self):
-        root_dir = os.environ['CHIA_ROOT'] if 'CHIA_ROOT' in os.environ \
-            else os.path.join(
-                    os.environ['HOME'], '.chia/mainnet'
-            )
+    async def public_key_matches(self,pk):
+        found = await self.derived_key_for_pk(pk)
+        if found is None:
+            return False
+
+        self.use_identity(*found)
+        log.debug('matched public key %s', self.puzzle_hash)
+        return True
+
+    async def identity_for_pk(self,pk) -> Optional[WalletIdentity]:
+        """
+        Our derived key with public key pk as a WalletIdentity to play a game
+        as, leaving the identity this wallet plays as alone.  None if pk
+        isn't ours.
+        """
+        found = await self.derived_key_for_pk(pk)
+        if found is None:
+            return None
 
-        config = load_config(Path(root_dir), 'config.yaml')
+        sk_, pk_ = found
+        self.keyring.add(sk_, pk_)
+        return WalletIdentity(self, sk_, pk_)
 
-        self.parent = await FullNodeRpcClient.create(
-            rpc_host, uint16(full_node_rpc_port), Path(root_dir), config
-        )
-        self.wallet_rpc_client = await WalletRpcClient.create(
-            rpc_host, uint16(wallet_rpc_port), Path(root_dir), config
-        )
+    async def create_rpc_connections(self):
+        if self.parent is None:
+            self.parent, self.wallet_rpc_client = await get_session().connect()
 
     async def wallet_get_pk(self,pkf_optional: Optional['Number']):
         await self.create_rpc_connections()
@@ -141,18 +176,9 @@ class CheckersRunnerWallet:
         else:
             pkdata = self.public_key_fingerprints[0]
 
-        private_key = await self.wallet_rpc_client.get_private_key(pkdata)
-        sk_data = binascii.unhexlify(private_key['sk'])
-        primary_sk_ = PrivateKey.from_bytes(sk_data)
-        sk_ = master_sk_to_wallet_sk(primary_sk_, 0)
-        pk_ = sk_.get_g1()
-        puzzle = puzzle_for_pk(pk_)
-        puzzle_hash = puzzle.get_tree_hash()
-
-        self.sk_ = sk_
-        self.pk_ = pk_
-        self.puzzle = puzzle
-        self.puzzle_hash = puzzle_hash
+        self.primary_sk_ = await self.master_sk(pkdata)
+        sk_, pk_ = self.keyring.derive(pkdata, 0)
+        self.use_identity(sk_, pk_)
 
         return self.pk_
 
@@ -169,25 +195,18 @@ class CheckersRunnerWallet:
 
         self.public_key_fingerprints = await self.wallet_rpc_client.get_public_keys()
 
-        # Get usable coins
+        # Get usable coins.  The index remembers what it has seen, so only new
+        # transactions are applied.
+        self.coins = CoinIndex(self.game_records.db, self.netname, self.banned_coins)
         wallets = await self.wallet_rpc_client.get_wallets()
         self.wallet = wallets[0]
         transactions = await self.wallet_rpc_client.get_transactions(self.wallet['id'])
-        for t in transactions:
-            for a in t.additions:
-                coin_name = binascii.hexlify(a.name()).decode('utf8')
-                if a.parent_coin_info in self.usable_coins:
-                    del self.usable_coins[a.parent_coin_info]
-
-                self.usable_coins[a.name()] = a
-
-            for r in t.removals:
-                if r.name() in self.usable_coins:
-                    del self.usable_coins[r.name()]
+        applied = self.coins.apply_transactions(transactions)
+        log.debug('applied %d new wallet transactions to the coin index', applied)
 
     async def update(self,mover):
         await self.game_records.update_to_current_block(self.blocks_ago)
-        print(f'update board in db with {mover.launch_coin_name} {mover.current_coin_name} {mover.get_board()}')
+        log.debug('update board in db with %s %s %s', mover.launch_coin_name, mover.current_coin_name, mover.board)
         if mover.current_coin_name is not None:
             self.game_records.remember_coin(
                 mover.launch_coin_name,
@@ -200,45 +219,66 @@ class CheckersRunnerWallet:
         return coin_record
 
     async def select_identity_for_coin(self,coin):
-        print('want puzzle hash %s' % coin.puzzle_hash)
+        log.debug('want puzzle hash %s', coin.puzzle_hash)
         for pkdata in self.public_key_fingerprints:
-            private_key = await self.wallet_rpc_client.get_private_key(pkdata)
-            sk_data = binascii.unhexlify(private_key['sk'])
+            primary_sk = await self.master_sk(pkdata)
             for i in range(1000):
-                primary_sk = PrivateKey.from_bytes(sk_data)
-                sk_ = master_sk_to_wallet_sk(primary_sk, i)
-                pk_ = sk_.get_g1()
+                sk_, pk_ = self.keyring.derive(pkdata, i)
                 puzzle = puzzle_for_pk(pk_)
-                print(i, puzzle)
                 puzzle_hash = puzzle.get_tree_hash()
 
-                print('try puzzle hash %s pk %s' % (puzzle_hash, pk_))
+                log.debug('try %d puzzle hash %s pk %s', i, puzzle_hash, pk_)
                 if puzzle_hash == coin.puzzle_hash:
                     self.primary_sk_ = primary_sk
-                    self.sk_ = sk_
-                    self.pk_ = pk_
-
-                    self.puzzle = puzzle_for_pk(self.pk_)
-                    self.puzzle_hash = self.puzzle.get_tree_hash()
+                    self.use_identity(sk_, pk_)
 
                     self.game_records.set_self_hash(self.puzzle_hash)
-                    print('selected identity %s' % self.puzzle_hash)
-                    print('pk %s' % self.pk_)
-                    print('sk %s' % self.sk_)
+                    log.info('selected identity %s pk %s', self.puzzle_hash, self.pk_)
 
                     return
 
         raise Exception('Could not find a wallet identity that matches the coin')
 
+    async def fresh_identities(self,count):
+        """
+        Give count (pk, puzzle) pairs for derived keys other than the one we
+        play as, ready to sign for.  A bulk launch sends a coin to each so
+        that the coins, and the launchers they create, have distinct names.
+        """
+        pkdata = self.public_key_fingerprints[0]
+        await self.master_sk(pkdata)
+
+        result = []
+        index = 0
+        while len(result) < count:
+            sk_, pk_ = self.keyring.derive(pkdata, index)
+            index += 1
+            if pk_ == self.pk_:
+                continue
+
+            self.keyring.add(sk_, pk_)
+            result.append((pk_, puzzle_for_pk(pk_)))
+
+        return result
+
+    async def sign_spends(self,coin_spends: List[CoinSpend]) -> SpendBundle:
+        with timed('clvm', 'sign_coin_spends'):
+            return await sign_coin_spends(
+                coin_spends,
+                self.pk_to_sk,
+                self.agg_sig_me_additional_data(),
+                DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM,
+            )
+
     def compute_combine_action(
-        self, amt: uint64, actions: List, usable_coins: Dict[bytes32, Coin]
+        self, amt: uint64, actions: List, usable_coins: List[Coin]
     ) -> Optional[List[Coin]]:
         # No one coin is enough, try to find a best fit pair, otherwise combine the two
         # maximum coins.
         searcher = CoinPairSearch(amt)
 
         # Process coins for this round.
-        for k, c in usable_coins.items():
+        for c in usable_coins:
             searcher.process_coin_for_combine_search(c)
 
         max_coins, total = searcher.get_result()
@@ -248,14 +288,22 @@ class CheckersRunnerWallet:
         else:
             return None
 
-    def dont_use(self,coin):
-        return binascii.hexlify(coin[0]).decode('utf8') not in self.banned_coins
-
     async def choose_coin(self, amt):
         """Given an amount requirement, find a coin that contains at least that much chia"""
         start_balance: uint64 = self.balance()
-        usable_coins = dict(filter(self.dont_use, self.usable_coins.items()))
-        coins_to_spend: Optional[List[Coin]] = self.compute_combine_action(amt, [], dict(usable_coins))
+
+        # The usual case: one coin is enough.  It's reserved until spent so
+        # that a concurrent launch won't choose it too.
+        only_coin: Optional[Coin] = self.coins.reserve(amt)
+        if only_coin is not None:
+            return CoinWrapper(
+                only_coin.parent_coin_info,
+                only_coin.puzzle_hash,
+                only_coin.amount,
+                self.puzzle,
+            )
+
+        coins_to_spend: Optional[List[Coin]] = self.compute_combine_action(amt, [], self.coins.unreserved())
 
         # Couldn't find a working combination.
         if coins_to_spend is None:
@@ -294,7 +342,7 @@ class CheckersRunnerWallet:
         blockchain_state = await self.parent.get_blockchain_state()
 
         launcher = await self.parent.get_coin_records_by_names([launch_name])
-        print(f'launcher coin {launcher}')
+        log.debug('launcher coin %s', launcher)
         if len(launcher) > 0:
             result_coin_objects.append({
                 'coin': launcher[0],
@@ -304,9 +352,9 @@ class CheckersRunnerWallet:
             return result_coin_objects
 
         while True:
-            print(f'lookup parent id: {binascii.hexlify(launch_name)}')
+            log.debug('lookup parent id: %s', launch_name)
             result = await self.parent.get_coin_records_by_parent_ids([bytes32(launch_name)])
-            print(result)
+            log.debug('children %s', result)
             if result is None or len(result) == 0:
                 return result_coin_objects
 
@@ -344,7 +392,7 @@ class CheckersRunnerWallet:
             [ConditionOpcode.CREATE_COIN, cw.puzzle_hash(), amt],
         ]
         if amt < found_coin.amount:
-            print(f'spending remaining {amt} to {self.puzzle_hash}')
+            log.debug('spending remaining %d to %s', amt, self.puzzle_hash)
             condition_args.append([ConditionOpcode.CREATE_COIN, self.puzzle_hash, found_coin.amount - amt])
 
         #
@@ -367,29 +415,28 @@ class CheckersRunnerWallet:
         # downstream puzzles are to be used compatibly to any of the chia
         # infrastructure.
         #
-        original_coin_puzzle = self.puzzle_for_puzzle_hash(found_coin.as_coin().puzzle_hash)
-        print(f'original coin puzzle %s' % original_coin_puzzle)
+        original_coin_puzzle = await self.puzzle_for_puzzle_hash(found_coin.as_coin().puzzle_hash)
+        log.debug('original coin puzzle %s', original_coin_puzzle)
         solution_for_coin = CoinSpend(
             found_coin.as_coin(),
             original_coin_puzzle,
             solution
         )
 
-        spend_bundle: SpendBundle = await sign_coin_spends(
-            [solution_for_coin],
-            pk_to_sk,
-            AGG_SIG_ME_ADDITIONAL_DATA,
-            DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM,
-        )
+        with timed('clvm', 'sign_coin_spends'):
+            spend_bundle: SpendBundle = await sign_coin_spends(
+                [solution_for_coin],
+                self.pk_to_sk,
+                self.agg_sig_me_additional_data(),
+                DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM,
+            )
 
-        print('debug spend bundle?')
-        print(spend_bundle.to_json_dict())
-        print(binascii.hexlify(bytes(spend_bundle)))
-        spend_bundle.debug()
-        print('^--- spend_bundle.debug()')
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('spend bundle %s', spend_bundle.to_json_dict())
+            spend_bundle.debug()
 
-        pushed: Dict[str, Union[str, List[Coin]]] = await self.parent.push_tx(spend_bundle)
-        if "error" not in pushed:
+        pushed: SpendResult = await self.push_tx(spend_bundle)
+        if "error" not in pushed.result:
             return cw.custom_coin(found_coin, amt)
         else:
             return None
@@ -398,7 +445,7 @@ class CheckersRunnerWallet:
         """Given a coin object, invoke it on the blockchain, either as a standard
         coin if no arguments are given or with custom arguments in args="""
 
-        print(f'spend coin {coin} (id {binascii.hexlify(coin.name())})')
+        log.debug('spend coin %s (id %s)', coin, coin.name())
 
         amt = uint64(1)
         if "amt" in kwargs:
@@ -426,7 +473,7 @@ class CheckersRunnerWallet:
             else:
                 solution_list = kwargs["custom_conditions"]
 
-            print(f'solution list {solution_list}')
+            log.debug('solution list %s', solution_list)
 
             if "remain" in kwargs:
                 remainer: Union[SmartCoinWrapper, Wallet] = kwargs["remain"]
@@ -457,7 +504,7 @@ class CheckersRunnerWallet:
             delegated_puzzle_solution = Program.to((1, solution_list))
             # Solution is the solution for the old coin.
             solution = Program.to([[], delegated_puzzle_solution, []])
-            print(f'solution {solution}')
+            log.debug('solution %s', solution)
         else:
             delegated_puzzle_solution = Program.to(kwargs["args"])
             solution = delegated_puzzle_solution
@@ -474,37 +521,48 @@ class CheckersRunnerWallet:
             solution,
         )
 
-        def pk_to_sk(pk):
-            print('doing pk to sk on %s' % pk)
-            return self.pk_to_sk(pk)
-
         try:
             sign_coin_spend_args = [
                 [solution_for_coin],
-                pk_to_sk,
-                AGG_SIG_ME_ADDITIONAL_DATA,
+                self.pk_to_sk,
+                self.agg_sig_me_additional_data(),
                 DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM,
             ]
-            print('sign_coin_spend_args', sign_coin_spend_args)
-            spend_bundle: SpendBundle = await sign_coin_spends(
-                *sign_coin_spend_args
-            )
+            log.debug('sign_coin_spend_args %s', sign_coin_spend_args)
+            with timed('clvm', 'sign_coin_spends'):
+                spend_bundle: SpendBundle = await sign_coin_spends(
+                    *sign_coin_spend_args
+                )
 
         except Exception as e:
-            print('exception',e.args)
-            print('our pk is %s' % self.pk_)
-            print('our sk is %s' % self.sk_)
+            log.error('signing failed %s with our pk %s', e.args, self.pk_)
             raise e
 
         if debug:
             spend_bundle.debug()
 
         if pushtx:
-            pushed: Dict[str, Union[str, List[Coin]]] = await self.parent.push_tx(spend_bundle)
-            return SpendResult(pushed)
+            return await self.push_tx(spend_bundle)
         else:
             return spend_bundle
 
     async def push_tx(self,bundle):
-        pushed: Dict[str, Union[str, List[Coin]]] = await self.parent.push_tx(bundle)
+        """
+        Push a spend bundle, keeping the coin index in step: coins it spends
+        are gone if it's accepted and choosable again if it isn't.
+        """
+        spent_names = [cs.coin.name() for cs in bundle.coin_spends]
+        try:
+            pushed: Dict[str, Union[str, List[Coin]]] = await self.parent.push_tx(bundle)
+        except:
+            for name in spent_names:
+                self.coins.release(name)
+            raise
+
+        if 'error' in pushed:
+            for name in spent_names:
+                self.coins.release(name)
+        else:
+            self.coins.spent(spent_names)
+
         return SpendResult(pushed)
@@ -0,0 +1,113 @@
+import os
+import asyncio
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+from chia.rpc.full_node_rpc_client import FullNodeRpcClient
+from chia.rpc.wallet_rpc_client import WalletRpcClient
+from chia.util.ints import uint16
+
+from support.metrics import METRICS, instrument_client, trace_config_for
+from wallet import rpc_host, full_node_rpc_port, wallet_rpc_port
+from wallet.config import chia_root, get_chia_config
+
+# Connections idle for longer than this are dropped by the pool.  A game
+# command issues a burst of requests, so this only needs to span a burst.
+KEEPALIVE_SECONDS = 60
+MAX_CONNECTIONS = 16
+
+class RpcSession:
+    """
+    Owns the full node and wallet RPC clients for a process.
+
+    Chia's RpcClient makes its own aiohttp session, so every client we created
+    used to do its own TLS handshakes.  Here both clients are made once, share
+    one keep-alive connection pool, and record how many requests each RPC
+    method gets, how long they take and how many bytes they move in METRICS.
+    """
+    def __init__(self, root_dir: Optional[Path] = None):
+        self.root_dir = root_dir
+        self.config = None
+        self.connector = None
+        self.full_node = None
+        self.wallet = None
+        self.lock = asyncio.Lock()
+
+    def get_root_dir(self) -> Path:
+        if self.root_dir is None:
+            self.root_dir = chia_root()
+        return self.root_dir
+
+    def get_config(self) -> Dict:
+        # The same parsed config the wallet signs with.
+        if self.config is None:
+            self.config = get_chia_config(self.get_root_dir()).get()
+        return self.config
+
+    async def use_pool(self, client, service: str):
+        """
+        Point a freshly created client at our shared connection pool and
+        instrument the requests it makes.
+        """
+        await client.session.close()
+        client.session = aiohttp.ClientSession(
+            connector=self.connector,
+            connector_owner=False,
+            trace_configs=[trace_config_for(service)]
+        )
+        return instrument_client(client, service)
+
+    async def connect(self) -> Tuple[FullNodeRpcClient, WalletRpcClient]:
+        """
+        Give the shared full node and wallet clients, creating them on first use.
+        """
+        async with self.lock:
+            if self.full_node is None:
+                root_dir = self.get_root_dir()
+                config = self.get_config()
+
+                self.connector = aiohttp.TCPConnector(
+                    limit=MAX_CONNECTIONS,
+                    keepalive_timeout=KEEPALIVE_SECONDS
+                )
+
+                self.full_node = await self.use_pool(await FullNodeRpcClient.create(
+                    rpc_host, uint16(full_node_rpc_port), root_dir, config
+                ), 'full_node')
+                self.wallet = await self.use_pool(await WalletRpcClient.create(
+                    rpc_host, uint16(wallet_rpc_port), root_dir, config
+                ), 'wallet')
+
+        return self.full_node, self.wallet
+
+    def report(self) -> str:
+        return '\n'.join(filter(None, [METRICS.report('full_node'), METRICS.report('wallet')]))
+
+    async def close(self):
+        """
+        Close both clients and then the pool they share, waiting for each so
+        nothing is left to be closed when the loop ends.
+        """
+        for client in (self.full_node, self.wallet):
+            if client:
+                client.close()
+                await client.await_closed()
+        self.full_node = None
+        self.wallet = None
+
+        if self.connector:
+            await self.connector.close()
+            self.connector = None
+
+session_ = None
+
+def get_session() -> RpcSession:
+    """
+    The RPC session shared by everything in this process.
+    """
+    global session_
+    if session_ is None:
+        session_ = RpcSession()
+    return session_
@@ -0,0 +1,28 @@
+from typing import Callable, Dict, List, Optional
+
+from blspy import AugSchemeMPL, G1Element, PrivateKey
+
+from chia.types.coin_spend import CoinSpend
+from chia.types.spend_bundle import SpendBundle
+from chia.util.condition_tools import pkm_pairs_for_conditions_dict
+
+def sign_spend_for_conditions(
+    coin_spend: CoinSpend,
+    conditions: Dict,
+    pk_to_sk: Callable[[G1Element], Optional[PrivateKey]],
+    additional_data: bytes
+) -> SpendBundle:
+    """
+    Sign a spend for the conditions its puzzle already gave, as from
+    conditions_dict_for_solution, rather than running it again as
+    sign_coin_spends does.
+    """
+    signatures: List = []
+    for pk, message in pkm_pairs_for_conditions_dict(conditions, coin_spend.coin.name(), additional_data):
+        sk = pk_to_sk(pk)
+        if sk is None:
+            raise ValueError(f'no secret key for {pk}')
+        assert sk.get_g1() == pk
+        signatures.append(AugSchemeMPL.sign(sk, message))
+
+    return SpendBundle([coin_spend], AugSchemeMPL.aggregate(signatures))